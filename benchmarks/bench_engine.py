@@ -0,0 +1,68 @@
+"""Пропускная способность PollingEngine против локальной заглушки API.
+
+Запуск: python benchmarks/bench_engine.py [--latency 0.05] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Account, PollingEngine  # noqa: E402
+from stubs import PracticumHandler, StubConfig, StubState, serve  # noqa: E402
+
+
+class StubBot:
+    """Бот, который только считает отправленные сообщения."""
+
+    def __init__(self):
+        """Счётчик отправок начинается с нуля."""
+        self.sent = 0
+
+    def send_message(self, chat_id=None, text=None):
+        """Учесть сообщение, никуда его не отправляя."""
+        self.sent += 1
+
+
+def measure(endpoint, accounts, workers, duration):
+    """Число опросов в секунду для заданного количества аккаунтов."""
+    engine = PollingEngine(
+        StubBot(),
+        [Account(f'token-{index}', index) for index in range(accounts)],
+        retry_time=0, workers=workers, endpoint=endpoint,
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(duration, engine.stop)
+        await engine.run()
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return engine.polls / (time.perf_counter() - started)
+
+
+def main():
+    """Замерить опрос для разного числа аккаунтов и вывести таблицу."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument(
+        '--accounts', type=int, nargs='+', default=[1, 10, 100, 1000]
+    )
+    args = parser.parse_args()
+    server = serve(
+        PracticumHandler, StubState(StubConfig(latency=args.latency))
+    )
+    endpoint = f'http://127.0.0.1:{server.server_port}/'
+    print(f'latency={args.latency}s workers={args.workers}')
+    for accounts in args.accounts:
+        rate = measure(endpoint, accounts, args.workers, args.duration)
+        print(f'accounts={accounts:>6} polls/s={rate:>9.1f}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Память и скорость: словари из API против Homework и render_status.
+
+Запуск: python benchmarks/bench_homework.py [--count 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import (CHECK_CHANGE_STATUS, HOMEWORK_VERDICTS,  # noqa: E402
+                      Homework, parse_status)
+
+STATUSES = list(HOMEWORK_VERDICTS)
+
+
+def api_items(count):
+    """Элементы homeworks в том виде, в каком их отдаёт API."""
+    return [
+        {
+            'id': index,
+            'status': STATUSES[index % len(STATUSES)],
+            'homework_name': f'student{index % 500}__hw{index % 20}.zip',
+            'reviewer_comment': 'Всё нравится',
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': 'Итоговый проект',
+        }
+        for index in range(count)
+    ]
+
+
+def parse_status_uncached(homework):
+    """parse_status до кеширования: форматирование на каждый вызов."""
+    status = homework['status']
+    return CHECK_CHANGE_STATUS.format(
+        name=homework['homework_name'], verdict=HOMEWORK_VERDICTS[status]
+    )
+
+
+def memory(build, items):
+    """Прирост памяти в МБ при хранении записей, построенных build."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(items)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return (after - before) / 2 ** 20
+
+
+def rate(function, records, repeat=3):
+    """Вызовов function в секунду (лучший из repeat прогонов)."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for record in records:
+            function(record)
+        best = min(best, time.perf_counter() - started)
+    return len(records) / best
+
+
+def main():
+    """Сравнить память и скорость разбора на count записях."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+    items = api_items(args.count)
+    records = [Homework.from_api(item) for item in items]
+    print(f'records={args.count}')
+    print('memory MB: dict={:.1f} Homework={:.1f}'.format(
+        memory(lambda items: [dict(item) for item in items], items),
+        memory(lambda items: [Homework.from_api(item) for item in items],
+               items),
+    ))
+    print('parse_status/s: uncached dict={:.0f} cached dict={:.0f} '
+          'cached Homework={:.0f}'.format(
+              rate(parse_status_uncached, items),
+              rate(parse_status, items),
+              rate(parse_status, records),
+          ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Нагрузочный прогон бота против локальных заглушек Практикума и Telegram.
+
+Заглушки работают в отдельном процессе, поэтому память и процессор
+процесса бота измеряются без их влияния. Отчёт: опросы в секунду,
+перцентили задержки от изменения статуса до сообщения в Telegram,
+пиковый RSS процесса бота.
+
+Запуск: python benchmarks/bench_load.py --accounts 1000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram  # noqa: E402
+
+import homework  # noqa: E402
+from delivery import TelegramDelivery  # noqa: E402
+from engine import Account, PollingEngine  # noqa: E402
+from stubs import StubConfig, run_stubs  # noqa: E402
+
+STUB_TOKEN = '123456:stub'
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def parse_args(argv=None):
+    """Параметры прогона."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--retry-time', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=homework.POLL_WORKERS)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='задержка ответа API Практикума, с')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов 500 от API Практикума')
+    parser.add_argument('--payload-bytes', type=int, default=0,
+                        help='размер reviewer_comment в каждой работе')
+    parser.add_argument('--change-rate', type=float, default=5,
+                        help='изменений статусов в секунду на все аккаунты')
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0,
+                        help='доля ответов 429 от Telegram')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Провести прогон и вернуть словарь с результатами."""
+    context = multiprocessing.get_context('spawn')
+    ports, stop = context.Queue(), context.Event()
+    config = StubConfig(
+        latency=args.latency, error_rate=args.error_rate,
+        payload_bytes=args.payload_bytes, change_rate=args.change_rate,
+        telegram_latency=args.telegram_latency,
+        telegram_error_rate=args.telegram_error_rate,
+    )
+    stubs = context.Process(target=run_stubs, args=(config, ports, stop))
+    stubs.start()
+    practicum_port, telegram_port = ports.get(timeout=30)
+    try:
+        bot = telegram.Bot(
+            token=STUB_TOKEN,
+            base_url=f'http://127.0.0.1:{telegram_port}/bot',
+        )
+        engine = PollingEngine(
+            bot,
+            [Account(f'token-{index}', index + 1)
+             for index in range(args.accounts)],
+            retry_time=args.retry_time, workers=args.workers,
+            endpoint=f'http://127.0.0.1:{practicum_port}/api/',
+            delivery=TelegramDelivery(bot), stream=args.stream,
+        )
+
+        async def poll():
+            asyncio.get_running_loop().call_later(args.duration, engine.stop)
+            await engine.run()
+
+        started = time.perf_counter()
+        asyncio.run(poll())
+        elapsed = time.perf_counter() - started
+        url = f'http://127.0.0.1:{practicum_port}/stats'
+        with urllib.request.urlopen(url) as response:
+            stats = json.load(response)
+    finally:
+        stop.set()
+        stubs.join(10)
+    latencies = stats.pop('latencies')
+    return {
+        'accounts': args.accounts,
+        'elapsed': elapsed,
+        'polls_per_second': engine.polls / elapsed,
+        'api_requests': stats['requests'],
+        'api_errors': stats['errors'],
+        'status_changes': stats['changes'],
+        'notifications': len(latencies),
+        'telegram_messages': stats['messages'],
+        'telegram_429': stats['telegram_errors'],
+        'latency': {
+            f'p{percent}': percentile(latencies, percent)
+            for percent in PERCENTILES
+        },
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss / 1024,
+    }
+
+
+def report(result):
+    """Вывести результаты прогона."""
+    latency = ' '.join(
+        f'{name}={value:.3f}s' for name, value in result['latency'].items()
+    )
+    print(
+        f"accounts={result['accounts']} "
+        f"polls/s={result['polls_per_second']:.1f} "
+        f"api_requests={result['api_requests']} "
+        f"api_errors={result['api_errors']}\n"
+        f"changes={result['status_changes']} "
+        f"notified={result['notifications']} "
+        f"telegram_messages={result['telegram_messages']} "
+        f"telegram_429={result['telegram_429']}\n"
+        f"latency {latency}\n"
+        f"max_rss={result['max_rss_mb']:.1f}MB"
+    )
+
+
+def main(argv=None):
+    """Нагрузочный прогон с аргументами argv; отчёт - в stdout."""
+    args = parse_args(argv)
+    homework.logger.setLevel(logging.CRITICAL)
+    report(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Прогон цикла опроса на записанном трафике (RECORD_TRAFFIC) без сети.
+
+Ответы API и задержки Telegram берутся из журнала, поэтому прогоны
+на одной записи сравнимы между собой. --speed ускоряет воспроизведение.
+
+Запуск: python benchmarks/bench_replay.py traffic.jsonl --speed 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from delivery import TelegramDelivery  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from recording import (ReplayBot, ReplayClient, load_traffic,  # noqa: E402
+                       recorded_accounts)
+
+
+def parse_args(argv=None):
+    """Параметры прогона."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help='журнал RECORD_TRAFFIC (.jsonl, .gz)')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=None,
+                        help='по умолчанию - длина записи / speed')
+    parser.add_argument('--retry-time', type=float, default=None,
+                        help='по умолчанию - RETRY_TIME / speed')
+    parser.add_argument('--workers', type=int, default=homework.POLL_WORKERS)
+    parser.add_argument('--stream', action='store_true')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Воспроизвести журнал и вернуть словарь с результатами."""
+    traffic = load_traffic(args.path)
+    accounts = recorded_accounts(traffic)
+    client = ReplayClient(traffic, speed=args.speed)
+    span = max(
+        (record['t'] for record in traffic['api']), default=client.first
+    ) - client.first
+    bot = ReplayBot(traffic, speed=args.speed)
+    engine = PollingEngine(
+        bot, accounts, client=client, workers=args.workers,
+        retry_time=(
+            args.retry_time if args.retry_time is not None
+            else homework.RETRY_TIME / args.speed
+        ),
+        delivery=TelegramDelivery(bot), stream=args.stream,
+    )
+    duration = (
+        args.duration if args.duration is not None else span / args.speed
+    )
+
+    async def poll():
+        asyncio.get_running_loop().call_later(duration, engine.stop)
+        await engine.run()
+
+    started = time.perf_counter()
+    asyncio.run(poll())
+    elapsed = time.perf_counter() - started
+    return {
+        'accounts': len(accounts),
+        'elapsed': elapsed,
+        'polls_per_second': engine.polls / elapsed,
+        'replayed': client.served,
+        'not_replayed': client.remaining(),
+        'telegram_messages': bot.sent,
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss / 1024,
+    }
+
+
+def report(result):
+    """Вывести результаты прогона."""
+    print(
+        f"accounts={result['accounts']} elapsed={result['elapsed']:.1f}s "
+        f"polls/s={result['polls_per_second']:.1f}\n"
+        f"replayed={result['replayed']} "
+        f"not_replayed={result['not_replayed']} "
+        f"telegram_messages={result['telegram_messages']}\n"
+        f"max_rss={result['max_rss_mb']:.1f}MB"
+    )
+
+
+def main(argv=None):
+    """Воспроизвести журнал из argv и вывести отчёт."""
+    args = parse_args(argv)
+    homework.logger.setLevel(logging.CRITICAL)
+    report(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Локальные заглушки API Практикума и Bot API Telegram для бенчмарков.
+
+Заглушка Практикума генерирует изменения статусов с заданной
+частотой и запоминает момент каждого изменения; заглушка Telegram
+по тексту уведомления находит изменение и считает задержку от
+изменения статуса до получения сообщения.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+NAME = re.compile(r'"(hw-[^"]+)"')
+
+
+class StubConfig:
+    """Параметры нагрузки заглушек."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, payload_bytes=0,
+                 change_rate=0.0, telegram_latency=0.0,
+                 telegram_error_rate=0.0, retry_after=1, seed=None):
+        """Задержки, доли ошибок и размер ответов заглушек."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload_bytes = payload_bytes
+        self.change_rate = change_rate
+        self.telegram_latency = telegram_latency
+        self.telegram_error_rate = telegram_error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+
+class StubState:
+    """Общее состояние заглушек: изменения статусов и их доставка."""
+
+    def __init__(self, config):
+        """Пустые счётчики заглушек для config."""
+        self.config = config
+        self.lock = threading.Lock()
+        self.tokens = []
+        self.changes = {}
+        self.changed_at = {}
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+        self.messages = 0
+        self.telegram_errors = 0
+        self.sequence = 0
+
+    def add_change(self, now=None):
+        """Изменить статус работы случайного из известных токенов."""
+        now = time.time() if now is None else now
+        with self.lock:
+            if not self.tokens:
+                return
+            token = self.config.random.choice(self.tokens)
+            self.sequence += 1
+            name = f'hw-{self.sequence}'
+            self.changes.setdefault(token, []).append((now, {
+                'id': self.sequence,
+                'homework_name': name,
+                'status': self.config.random.choice(STATUSES),
+                'date_updated': time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ', time.gmtime(now)
+                ),
+                'reviewer_comment': 'x' * self.config.payload_bytes,
+            }))
+            self.changed_at[name] = now
+
+    def answer(self, token, from_date):
+        """Ответ homework_statuses: изменения не раньше from_date."""
+        with self.lock:
+            self.requests += 1
+            if token not in self.changes:
+                self.changes[token] = []
+                self.tokens.append(token)
+            homeworks = [
+                homework for changed, homework
+                in reversed(self.changes[token]) if changed >= from_date
+            ]
+        return {'homeworks': homeworks, 'current_date': int(time.time())}
+
+    def delivered(self, text, now=None):
+        """Учесть доставленное уведомление и его задержку."""
+        now = time.time() if now is None else now
+        match = NAME.search(text or '')
+        with self.lock:
+            self.messages += 1
+            if match:
+                changed = self.changed_at.pop(match.group(1), None)
+                if changed is not None:
+                    self.latencies.append(now - changed)
+
+    def stats(self):
+        """Сводка для отчёта бенчмарка."""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'messages': self.messages,
+                'telegram_errors': self.telegram_errors,
+                'changes': self.sequence,
+                'latencies': list(self.latencies),
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: keep-alive и ответ в JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    state = None
+
+    def reply(self, status, data):
+        """Отправить JSON-ответ."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Заглушки не пишут журнал запросов."""
+
+
+class PracticumHandler(StubHandler):
+    """GET /api/user_api/homework_statuses/ и GET /stats."""
+
+    def do_GET(self):
+        """Ответить как API Практикума с задержкой и ошибками."""
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            self.reply(200, self.state.stats())
+            return
+        config = self.state.config
+        time.sleep(config.latency)
+        if config.random.random() < config.error_rate:
+            with self.state.lock:
+                self.state.errors += 1
+            self.reply(500, {'code': 'stub_error', 'message': 'stub'})
+            return
+        token = self.headers.get('Authorization', '').partition(' ')[2]
+        from_date = float(parse_qs(url.query).get('from_date', ['0'])[0])
+        self.reply(200, self.state.answer(token, from_date))
+
+
+class TelegramHandler(StubHandler):
+    """POST /bot<token>/sendMessage."""
+
+    def do_POST(self):
+        """Принять сообщение или ответить 429 с retry_after."""
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        config = self.state.config
+        time.sleep(config.telegram_latency)
+        if config.random.random() < config.telegram_error_rate:
+            with self.state.lock:
+                self.state.telegram_errors += 1
+            self.reply(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests',
+                'parameters': {'retry_after': config.retry_after},
+            })
+            return
+        self.state.delivered(data.get('text'))
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': self.state.messages,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text'),
+        }})
+
+
+def serve(handler, state, port=0):
+    """Запустить сервер заглушки в фоновом потоке."""
+    handler = type(handler.__name__, (handler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def generate_changes(state, stop):
+    """Порождать изменения статусов с частотой config.change_rate в секунду."""
+    rate = state.config.change_rate
+    while rate and not stop.wait(state.config.random.expovariate(rate)):
+        state.add_change()
+
+
+def run_stubs(config, ports, stop):
+    """Точка входа отдельного процесса заглушек.
+
+    В ports кладётся пара (порт Практикума, порт Telegram); процесс
+    работает, пока не будет установлено событие stop.
+    """
+    state = StubState(config)
+    practicum = serve(PracticumHandler, state)
+    telegram = serve(TelegramHandler, state)
+    changes = threading.Event()
+    threading.Thread(
+        target=generate_changes, args=(state, changes), daemon=True
+    ).start()
+    ports.put((practicum.server_port, telegram.server_port))
+    stop.wait()
+    changes.set()
+    practicum.shutdown()
+    telegram.shutdown()
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from exceptions import CircuitOpenError
+from homework import logger
+from metrics import REGISTRY
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60
+HALF_OPEN_PROBES = 1
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+CIRCUIT_OPENED = ('API Практикума недоступно: {failures} ошибок подряд, '
+                  'запросы приостановлены на {timeout} с')
+CIRCUIT_HALF_OPEN = 'Пробный запрос к API Практикума после паузы'
+CIRCUIT_CLOSED = 'API Практикума снова отвечает, опрос возобновлён'
+CIRCUIT_IS_OPEN = 'Запрос к API Практикума пропущен: цепь разомкнута'
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    'homework_circuit_state',
+    'Состояние предохранителя API: 0 - closed, 1 - open, 2 - half_open'
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'homework_circuit_transitions_total',
+    'Переходы предохранителя API по новому состоянию', ['state']
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    'homework_circuit_rejected_total',
+    'Запросы, отклонённые разомкнутым предохранителем'
+)
+
+
+def upstream_failure(error):
+    """Говорит ли ошибка о сбое самого API, а не одного токена.
+
+    Сбой - это нет соединения, истёк срок, ответ 5xx или 429. Ответы
+    4xx и ошибки code/error в теле относятся к конкретному токену:
+    отозванный токен одного студента не должен блокировать остальных.
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """Предохранитель для запросов к API, общий для всех аккаунтов.
+
+    После threshold ошибок подряд цепь размыкается, и запросы сразу
+    завершаются CircuitOpenError. Через reset_timeout секунд пропускается
+    до probes пробных запросов: успех замыкает цепь, ошибка снова
+    размыкает её на reset_timeout.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, probes=HALF_OPEN_PROBES,
+                 is_failure=upstream_failure, clock=time.monotonic):
+        """Цепь размыкается после threshold сбоев is_failure подряд."""
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive = 0
+        self.opened_at = None
+        self._probing = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set_function(lambda: STATE_VALUES[self.state])
+
+    def _switch(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(state=state)
+        if state == OPEN:
+            self.opened_at = self.clock()
+            logger.warning(CIRCUIT_OPENED.format(
+                failures=self.consecutive, timeout=self.reset_timeout
+            ))
+        elif state == HALF_OPEN:
+            logger.info(CIRCUIT_HALF_OPEN)
+        else:
+            logger.info(CIRCUIT_CLOSED)
+
+    def retry_after(self):
+        """Секунды до следующего пробного запроса (0 - можно сейчас)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0
+            return max(self.opened_at + self.reset_timeout - self.clock(), 0)
+
+    def acquire(self):
+        """Разрешить запрос или бросить CircuitOpenError."""
+        with self._lock:
+            if (self.state == OPEN
+                    and self.clock() - self.opened_at >= self.reset_timeout):
+                self._probing = 0
+                self._switch(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return
+        CIRCUIT_REJECTED.inc()
+        raise CircuitOpenError(CIRCUIT_IS_OPEN)
+
+    def success(self):
+        """Учесть успешный запрос."""
+        with self._lock:
+            self.consecutive = 0
+            if self.state != CLOSED:
+                self._switch(CLOSED)
+
+    def failure(self, error):
+        """Учесть ошибку.
+
+        Ошибки, для которых is_failure ложно, ничего не говорят
+        о доступности API: счётчик и состояние цепи не меняются,
+        освобождается только место пробного запроса.
+        """
+        with self._lock:
+            if not self.is_failure(error):
+                if self.state == HALF_OPEN:
+                    self._probing = max(self._probing - 1, 0)
+                return
+            self.consecutive += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive >= self.threshold
+            ):
+                self._switch(OPEN)
+
+    def call(self, function, *args, **kwargs):
+        """Выполнить запрос под защитой предохранителя."""
+        self.acquire()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as error:
+            self.failure(error)
+            raise
+        self.success()
+        return result
@@ -0,0 +1,179 @@
+from collections import defaultdict, deque
+import threading
+import time
+
+from homework import HOMEWORK_VERDICTS, logger, request_api_answer
+from validation import validate_response
+
+CACHE_TTL = 60 * 60
+HISTORY_SIZE = 20
+
+STATUS_LINE = '"{name}": {verdict}'
+HISTORY_LINE = '{date} "{name}": {verdict}'
+NO_HOMEWORKS_YET = 'Пока нет работ на проверке'
+UNKNOWN_CHAT = 'Этот чат не подписан ни на один аккаунт Практикума'
+REFRESH_FAILED = 'Не удалось обновить статусы: {error}'
+
+
+class CacheEntry:
+    """Последние статусы и история изменений одного аккаунта."""
+
+    __slots__ = ('latest', 'history', 'updated_at', 'complete')
+
+    def __init__(self, history_size):
+        """Пустая запись с историей не длиннее history_size."""
+        self.latest = {}
+        self.history = deque(maxlen=history_size)
+        self.updated_at = 0
+        self.complete = False
+
+
+class StatusCache:
+    """Кеш статусов, который наполняет обычный цикл опроса.
+
+    Запись считается свежей, пока с последнего успешного опроса
+    прошло меньше ttl секунд и в ней есть полная история аккаунта.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, history_size=HISTORY_SIZE,
+                 clock=time.time):
+        """Пустой кеш; записи старше ttl секунд устаревают."""
+        self.ttl = ttl
+        self.history_size = history_size
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, account):
+        entry = self._entries.get(account)
+        if entry is None:
+            entry = self._entries[account] = CacheEntry(self.history_size)
+        return entry
+
+    def touch(self, account):
+        """Отметить успешный опрос аккаунта без изменений."""
+        with self._lock:
+            self._entry(account).updated_at = self.clock()
+
+    def record(self, account, homeworks, complete=False):
+        """Добавить работы из ответа API (самые свежие - первыми)."""
+        with self._lock:
+            entry = self._entry(account)
+            for homework in reversed(homeworks):
+                if entry.latest.get(homework.name) == homework:
+                    continue
+                entry.latest.pop(homework.name, None)
+                entry.latest[homework.name] = homework
+                entry.history.append(homework)
+            entry.updated_at = self.clock()
+            entry.complete = entry.complete or complete
+
+    def is_fresh(self, account):
+        """Можно ли ответить из кеша без запроса к API."""
+        with self._lock:
+            entry = self._entries.get(account)
+            return bool(
+                entry and entry.complete
+                and self.clock() - entry.updated_at < self.ttl
+            )
+
+    def latest(self, account):
+        """Последний статус каждой работы, недавно изменённые - первыми."""
+        with self._lock:
+            entry = self._entries.get(account)
+            return list(reversed(entry.latest.values())) if entry else []
+
+    def history(self, account):
+        """Последние изменения статусов, самые свежие - первыми."""
+        with self._lock:
+            entry = self._entries.get(account)
+            return list(reversed(entry.history)) if entry else []
+
+
+class CommandService:
+    """Ответы на /status и /history из кеша.
+
+    К API обращается только для устаревшей записи и только один раз:
+    параллельные запросы одного аккаунта ждут уже идущее обновление.
+    """
+
+    def __init__(self, engine, cache, accounts=None):
+        """Команды для accounts (по умолчанию - аккаунтов engine).
+
+        Аккаунты, которые engine не опрашивает, обновляются из API
+        по первому запросу, когда их запись в кеше устарела.
+        """
+        self.engine = engine
+        self.cache = cache
+        self.accounts_by_chat = defaultdict(list)
+        if accounts is None:
+            accounts = engine.accounts
+        for account in accounts:
+            self.accounts_by_chat[str(account.chat_id)].append(account)
+        self._locks = defaultdict(threading.Lock)
+
+    def refresh(self, account):
+        """Обновить запись аккаунта полной историей, если она устарела."""
+        with self._locks[account]:
+            if self.cache.is_fresh(account):
+                return
+            response = self.engine.breaker.call(
+                self.engine.policy.call, request_api_answer,
+                self.engine.policy.deadline(), self.engine.client,
+                account.token, 0, self.engine.endpoint
+            )
+            if response is None:
+                self.cache.touch(account)
+                return
+            self.cache.record(
+                account, validate_response(response).homeworks, complete=True
+            )
+
+    def _render(self, chat_id, homeworks_of, line):
+        accounts = self.accounts_by_chat.get(str(chat_id))
+        if not accounts:
+            return UNKNOWN_CHAT
+        lines = []
+        for account in accounts:
+            try:
+                self.refresh(account)
+            except Exception as error:
+                logger.exception(REFRESH_FAILED.format(error=error))
+            for homework in homeworks_of(account):
+                lines.append(line.format(
+                    name=homework.name,
+                    date=homework.date_updated or '',
+                    verdict=HOMEWORK_VERDICTS.get(
+                        homework.status, homework.status
+                    ),
+                ).strip())
+        return '\n'.join(lines) or NO_HOMEWORKS_YET
+
+    def status_text(self, chat_id):
+        """Текст ответа на /status."""
+        return self._render(chat_id, self.cache.latest, STATUS_LINE)
+
+    def history_text(self, chat_id):
+        """Текст ответа на /history."""
+        return self._render(chat_id, self.cache.history, HISTORY_LINE)
+
+    def status(self, update, context):
+        """Обработчик команды /status."""
+        update.message.reply_text(self.status_text(update.effective_chat.id))
+
+    def history(self, update, context):
+        """Обработчик команды /history."""
+        update.message.reply_text(
+            self.history_text(update.effective_chat.id)
+        )
+
+
+def build_updater(token, service):
+    """Updater с long polling и обработчиками /status и /history."""
+    from telegram.ext import CommandHandler, Updater
+    updater = Updater(token=token, use_context=True)
+    updater.dispatcher.add_handler(CommandHandler('status', service.status))
+    updater.dispatcher.add_handler(
+        CommandHandler('history', service.history)
+    )
+    return updater
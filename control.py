@@ -0,0 +1,76 @@
+import os
+import socket
+import socketserver
+import threading
+
+from homework import logger
+
+UNKNOWN_COMMAND = 'неизвестная команда: {command}'
+COMMAND_FAILED = 'Ошибка команды {command}: {error}'
+CONTROL_STARTED = 'Управляющий сокет: {path}'
+OK = 'ok'
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    """Одна строка-команда, в ответ - одна строка результата."""
+
+    def handle(self):
+        """Выполнить команду и ответить."""
+        line = self.rfile.readline().decode('utf-8', 'replace').split()
+        if not line:
+            return
+        command, args = line[0], line[1:]
+        handler = self.server.commands.get(command)
+        if handler is None:
+            answer = UNKNOWN_COMMAND.format(command=command)
+        else:
+            try:
+                answer = handler(*args) or OK
+            except Exception as error:
+                logger.exception(COMMAND_FAILED.format(
+                    command=command, error=error
+                ))
+                answer = str(error)
+        self.wfile.write(f'{answer}\n'.encode())
+
+
+class ControlServer(socketserver.ThreadingMixIn,
+                    socketserver.UnixStreamServer):
+    """Локальный Unix-сокет для команд вроде «опросить сейчас».
+
+    commands - словарь {имя: функция}; функции вызываются в потоке
+    сервера, поэтому сами передают работу в нужный поток.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, commands):
+        """Слушать сокет path; прежний файл сокета удаляется."""
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, ControlHandler)
+        os.chmod(path, 0o600)
+        self.path = path
+        self.commands = commands
+
+    def start(self):
+        """Обслуживать команды в фоновом потоке."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        logger.info(CONTROL_STARTED.format(path=self.path))
+        return self
+
+    def close(self):
+        """Остановить сервер и удалить файл сокета."""
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def send_command(path, command, timeout=5):
+    """Отправить команду в управляющий сокет и вернуть ответ."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(path)
+        client.sendall(f'{command}\n'.encode())
+        return client.makefile(encoding='utf-8').readline().strip()
@@ -0,0 +1,259 @@
+from collections import namedtuple
+from concurrent.futures import Future, wait
+import queue
+import threading
+import time
+
+from homework import ERROR_MESSAGE, deliver_message, logger, telegram
+from metrics import REGISTRY
+
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+QUEUE_SIZE = 10000
+DELIVERY_WORKERS = 8
+MAX_ATTEMPTS = 3
+# Соединения с Bot API сверх числа отправителей: для getUpdates команд.
+SPARE_CONNECTIONS = 2
+
+FLOOD_CONTROL = 'Telegram просит подождать {seconds} с перед отправкой'
+SEND_RETRY = 'Повтор отправки в чат {chat_id}, попытка {attempt}: {error}'
+NOT_SENT = 'Сообщение не отправлено до остановки доставки'
+PARTIAL_BROADCAST = 'Рассылка: не доставлено в {failed} из {count} чатов'
+
+SendResult = namedtuple('SendResult', ['chat_id', 'ok', 'error'])
+
+QUEUED = REGISTRY.gauge(
+    'homework_delivery_queue', 'Сообщения в очереди на отправку'
+)
+DROPPED = REGISTRY.counter(
+    'homework_delivery_dropped_total',
+    'Сообщения, которые не удалось отправить'
+)
+FLOOD_WAITS = REGISTRY.counter(
+    'homework_delivery_retry_after_total', 'Ответы 429 от Telegram'
+)
+BROADCASTS = REGISTRY.counter(
+    'homework_delivery_broadcast_recipients_total',
+    'Получатели рассылок по исходу', ['outcome']
+)
+
+
+def build_bot(token, workers=DELIVERY_WORKERS):
+    """telegram.Bot с пулом keep-alive соединений на всех отправителей.
+
+    По умолчанию Bot держит одно соединение, и параллельные отправки
+    открывают новые на каждый запрос.
+    """
+    from telegram.utils.request import Request
+    return telegram.Bot(token=token, request=Request(
+        con_pool_size=workers + SPARE_CONNECTIONS
+    ))
+
+
+def send_many(bot, chat_ids, message):
+    """Отправить сообщение в несколько чатов напрямую, без очереди.
+
+    Ошибка в одном чате не мешает остальным; возвращает SendResult
+    на каждого получателя.
+    """
+    results = []
+    for chat_id in chat_ids:
+        try:
+            deliver_message(bot, chat_id, message)
+        except Exception as error:
+            logger.exception(ERROR_MESSAGE.format(error=error))
+            results.append(SendResult(chat_id, False, error))
+        else:
+            results.append(SendResult(chat_id, True, None))
+    return results
+
+
+def report_broadcast(results):
+    """Учесть исходы рассылки и предупредить о частичной неудаче."""
+    failed = sum(not result.ok for result in results)
+    BROADCASTS.inc(len(results) - failed, outcome='sent')
+    if failed:
+        BROADCASTS.inc(failed, outcome='failed')
+        logger.warning(PARTIAL_BROADCAST.format(
+            failed=failed, count=len(results)
+        ))
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate событий в секунду, всплеск capacity."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        """Пополнение на rate токенов в секунду, не больше capacity."""
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Занять токен; вернуть, сколько секунд ждать до его появления."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0)
+
+
+class TelegramDelivery:
+    """Очередь исходящих сообщений, которую разбирают потоки-отправители.
+
+    Отправка соблюдает общий лимит бота и лимит на чат, а при ответе
+    429 (RetryAfter) все отправители ждут указанное Telegram время.
+    """
+
+    def __init__(self, bot, workers=DELIVERY_WORKERS, queue_size=QUEUE_SIZE,
+                 global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 sleep=time.sleep):
+        """Очередь на queue_size сообщений и workers потоков отправки."""
+        self.bot = bot
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.sleep = sleep
+        self._chat_buckets = {}
+        self._chat_lock = threading.Lock()
+        self._resume_at = 0
+        self._threads = []
+
+    def start(self):
+        """Запустить потоки-отправители."""
+        QUEUED.set_function(self.queue.qsize)
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, chat_id, message):
+        """Поставить сообщение в очередь.
+
+        Блокирует вызывающего, только если очередь заполнена целиком.
+        Возвращает Future, в котором появится SendResult.
+        """
+        future = Future()
+        self.queue.put((chat_id, message, future))
+        return future
+
+    def broadcast(self, chat_ids, message):
+        """Разослать одно сообщение в несколько чатов.
+
+        Получатели ставятся в очередь по отдельности и отправляются
+        параллельно всеми потоками; неудача в одном чате не задерживает
+        и не повторяет остальные. Возвращает Future на каждый чат.
+        """
+        futures = [self.submit(chat_id, message) for chat_id in chat_ids]
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            report_broadcast([future.result() for future in futures])
+
+        for future in futures:
+            future.add_done_callback(done)
+        return futures
+
+    def send_many(self, chat_ids, message, timeout=None):
+        """broadcast(), дождавшись результата по каждому чату."""
+        chat_ids = list(chat_ids)
+        futures = self.broadcast(chat_ids, message)
+        wait(futures, timeout)
+        return [
+            future.result() if future.done()
+            else SendResult(chat_id, False, TimeoutError(NOT_SENT))
+            for chat_id, future in zip(chat_ids, futures)
+        ]
+
+    def close(self, timeout=None):
+        """Дождаться отправки накопленных сообщений и остановить потоки.
+
+        Возвращает число сообщений, которые не успели уйти за timeout:
+        они убираются из очереди, чтобы отправители, ещё занятые
+        медленной отправкой, не взяли их после ответа «не отправлено».
+        """
+        for _ in self._threads:
+            self.queue.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(
+                None if deadline is None
+                else max(deadline - time.monotonic(), 0)
+            )
+        self._threads = []
+        with self.queue.mutex:
+            items = list(self.queue.queue)
+            self.queue.queue.clear()
+            # Сигналы остановки остаются для ещё живых отправителей.
+            self.queue.queue.extend(item for item in items if item is None)
+            self.queue.not_full.notify_all()
+        pending = [item for item in items if item is not None]
+        for chat_id, _, future in pending:
+            future.set_result(
+                SendResult(chat_id, False, TimeoutError(NOT_SENT))
+            )
+        return len(pending)
+
+    def _chat_bucket(self, chat_id):
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(
+                    self.chat_rate
+                )
+            return bucket
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            chat_id, message, future = item
+            if future.set_running_or_notify_cancel():
+                future.set_result(self._send(chat_id, message))
+
+    def _send(self, chat_id, message):
+        """Отправить сообщение с учётом лимитов и повторами; SendResult."""
+        chat_bucket = self._chat_bucket(chat_id)
+        attempt = 0
+        while True:
+            self.sleep(max(
+                chat_bucket.reserve(),
+                self.global_bucket.reserve(),
+                self._resume_at - time.monotonic(),
+            ))
+            try:
+                deliver_message(self.bot, chat_id, message)
+                return SendResult(chat_id, True, None)
+            except telegram.error.RetryAfter as error:
+                FLOOD_WAITS.inc()
+                logger.warning(FLOOD_CONTROL.format(
+                    seconds=error.retry_after
+                ))
+                self._resume_at = max(
+                    self._resume_at, time.monotonic() + error.retry_after
+                )
+            except telegram.error.NetworkError as error:
+                attempt += 1
+                if attempt == MAX_ATTEMPTS:
+                    DROPPED.inc()
+                    logger.exception(ERROR_MESSAGE.format(error=error))
+                    return SendResult(chat_id, False, error)
+                logger.warning(SEND_RETRY.format(
+                    chat_id=chat_id, attempt=attempt, error=error
+                ))
+            except Exception as error:
+                DROPPED.inc()
+                logger.exception(ERROR_MESSAGE.format(error=error))
+                return SendResult(chat_id, False, error)
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from homework import logger
+from metrics import REGISTRY
+
+DIGEST_WINDOW = 60
+DIGEST_SIZE = 10
+# Предел длины сообщения Telegram.
+MAX_LENGTH = 4096
+
+DIGEST_HEADER = 'Изменения статусов работ ({count}):'
+DIGEST_ITEM = '• {message}'
+DIGEST_FAILED = 'Не удалось отправить сводку в чат {chat_id}: {error}'
+
+DIGEST_FLUSHES = REGISTRY.counter(
+    'homework_digest_flushes_total', 'Отправленные сводки по причине',
+    ['reason']
+)
+DIGEST_MESSAGES = REGISTRY.counter(
+    'homework_digest_messages_total', 'Уведомления, вошедшие в сводки'
+)
+
+
+def render_digest(messages):
+    """Одно сообщение из нескольких уведомлений."""
+    if len(messages) == 1:
+        return messages[0]
+    return '\n'.join([
+        DIGEST_HEADER.format(count=len(messages)),
+        *(DIGEST_ITEM.format(message=message) for message in messages),
+    ])
+
+
+class DigestBuffer:
+    """Копит уведомления по чатам и отправляет их одной сводкой.
+
+    Сводка уходит через window секунд после первого уведомления
+    в буфере чата, сразу по достижении max_size уведомлений или когда
+    следующее не поместится в одно сообщение Telegram. Повторы одного
+    и того же текста в сводку не дублируются. send(chat_id, text) -
+    обычно TelegramDelivery.submit - вызывается вне блокировки буфера.
+    """
+
+    def __init__(self, send, window=DIGEST_WINDOW, max_size=DIGEST_SIZE,
+                 clock=time.monotonic):
+        """Сводки уходят через send не реже раза в window секунд."""
+        self.send = send
+        self.window = window
+        self.max_size = max_size
+        self.clock = clock
+        self._buffers = {}
+        self._due = {}
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """Запустить поток, отправляющий сводки по истечении окна."""
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, chat_id, message):
+        """Добавить уведомление в буфер чата."""
+        ready = []
+        with self._condition:
+            messages = self._buffers.setdefault(chat_id, [])
+            if message in messages:
+                return
+            if messages and len(render_digest(
+                [*messages, message]
+            )) > MAX_LENGTH:
+                ready.append(self._take(chat_id, 'size'))
+                messages = self._buffers.setdefault(chat_id, [])
+            messages.append(message)
+            if len(messages) == 1:
+                self._due[chat_id] = self.clock() + self.window
+                self._condition.notify()
+            if len(messages) >= self.max_size:
+                ready.append(self._take(chat_id, 'size'))
+        self._send(ready)
+
+    def _take(self, chat_id, reason):
+        """Забрать сводку чата из буфера; вызывается под self._condition."""
+        messages = self._buffers.pop(chat_id)
+        del self._due[chat_id]
+        DIGEST_FLUSHES.inc(reason=reason)
+        DIGEST_MESSAGES.inc(len(messages))
+        return chat_id, render_digest(messages)
+
+    def _take_due(self):
+        """Сводки с истёкшим окном и секунды до следующего окна."""
+        now = self.clock()
+        ready = [
+            self._take(chat_id, 'window')
+            for chat_id, due in list(self._due.items()) if due <= now
+        ]
+        if not self._due:
+            return ready, None
+        return ready, max(min(self._due.values()) - now, 0)
+
+    def _send(self, ready):
+        """Отправить сводки вне блокировки."""
+        for chat_id, text in ready:
+            try:
+                self.send(chat_id, text)
+            except Exception as error:
+                logger.exception(DIGEST_FAILED.format(
+                    chat_id=chat_id, error=error
+                ))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                ready, delay = self._take_due()
+                if not ready:
+                    if self._closed:
+                        return
+                    self._condition.wait(delay)
+                    continue
+            self._send(ready)
+
+    def close(self):
+        """Отправить всё накопленное и остановить поток."""
+        with self._condition:
+            self._closed = True
+            ready = [
+                self._take(chat_id, 'shutdown')
+                for chat_id in list(self._buffers)
+            ]
+            self._condition.notify()
+        self._send(ready)
+        if self._thread:
+            self._thread.join()
@@ -0,0 +1,828 @@
+import asyncio
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import count
+import json
+import random
+import signal
+import threading
+import time
+
+from homework import (ENDPOINT, ERROR_MESSAGE, POLL_WORKERS,
+                      RETRY_TIME, deliver_message, logger, parse_status,
+                      request_api_answer)
+from breaker import CircuitBreaker
+from delivery import report_broadcast, send_many
+from exceptions import CircuitOpenError
+from http_client import HTTPClient
+from logs import LazyMessage
+from memory import MemoryTracker
+from metrics import REGISTRY, StageTimer, stage
+from policy import RequestPolicy
+from profiler import PollProfiler
+from scheduler import PollScheduler, next_interval
+from singleflight import SingleFlight
+import startup
+from storage import account_key
+from streaming import stream_api_answer
+from suppression import ErrorSuppressor
+from validation import validate_homework, validate_response
+
+ENGINE_STARTED = 'Запущен опрос {count} аккаунтов в {workers} потоков'
+ENGINE_STOPPED = 'Опрос аккаунтов остановлен'
+NO_ACCOUNTS = 'Не найдено ни одного аккаунта для опроса'
+BAD_ACCOUNT = 'Некорректное описание аккаунта в {path}: {account}'
+STATE_RESTORED = 'Восстановлено состояние {restored} из {count} аккаунтов'
+CHECKPOINT_FAILED = 'Не удалось сохранить состояние аккаунтов: {error}'
+ERROR_SUPPRESSED = 'Повтор ошибки подавлен: {error}'
+SHUTDOWN_SIGNAL = 'Получен сигнал {signal}, завершаем работу'
+POLL_NOW = 'Внеочередной опрос всех аккаунтов'
+NOT_DELIVERED = 'При остановке не доставлено сообщений: {count}'
+INVALID_ITEM = 'Пропущена некорректная работа в ответе API: {error}'
+POLL_FAILED = 'Сбой цикла опроса аккаунта: {error}'
+ALREADY_NOTIFIED = 'Статус {status} работы "{name}" уже отправлялся'
+
+CHECKPOINT_INTERVAL = 5
+SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1, signal.SIGUSR2,
+           signal.SIGPROF)
+# Вместе с сохранением состояния остановка укладывается в 30 секунд,
+# которые Heroku даёт процессу между SIGTERM и SIGKILL.
+STOP_POLLS_TIMEOUT = 5
+SHUTDOWN_TIMEOUT = 15
+SHUTDOWN_BUDGET = STOP_POLLS_TIMEOUT + SHUTDOWN_TIMEOUT
+
+POLLS = REGISTRY.counter(
+    'homework_polls_total', 'Опросы аккаунтов по исходу', ['outcome']
+)
+ACCOUNTS = REGISTRY.gauge('homework_accounts', 'Число опрашиваемых аккаунтов')
+SCHEDULED = REGISTRY.gauge(
+    'homework_scheduled_accounts', 'Аккаунты в очереди планировщика'
+)
+INVALID_ITEMS = REGISTRY.counter(
+    'homework_invalid_items_total', 'Некорректные элементы homeworks'
+)
+
+# recipients - дополнительные чаты (наставники, группы), которые
+# получают уведомления об изменении статуса вместе с chat_id.
+Account = namedtuple(
+    'Account', ['token', 'chat_id', 'recipients'], defaults=((),)
+)
+
+
+def load_accounts(path, token=None, chat_id=None):
+    """Список аккаунтов из JSON-файла или из переменных окружения.
+
+    Файл содержит список объектов с ключами practicum_token и chat_id
+    и необязательным списком recipients.
+    """
+    if not path:
+        return [Account(token, chat_id)]
+    with open(path, encoding='utf-8') as file:
+        raw_accounts = json.load(file)
+    accounts = []
+    for raw in raw_accounts:
+        try:
+            accounts.append(Account(
+                raw['practicum_token'], raw['chat_id'],
+                tuple(raw.get('recipients', ()))
+            ))
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(BAD_ACCOUNT.format(path=path, account=raw))
+    if not accounts:
+        raise ValueError(NO_ACCOUNTS)
+    return accounts
+
+
+def valid_items(answer, deadline, errors, timer):
+    """Корректные работы потокового ответа с их индексами.
+
+    Ошибки проверки складываются в errors. Чтение ответа учитывается
+    в timer как get_api_answer, проверка элементов - как check_response.
+    """
+    items = iter(answer)
+    for index in count():
+        with timer.stage('get_api_answer'):
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+        deadline.check('check_response')
+        with timer.stage('check_response'):
+            homework, error = validate_homework(item, index)
+        if error is not None:
+            errors.append(error)
+        else:
+            yield index, homework
+
+
+def notified_key(homework):
+    """Ключ работы в AccountState.notified: id, а без него название."""
+    return str(homework.id if homework.id is not None else homework.name)
+
+
+class AccountState:
+    """Изменяемое состояние опроса одного аккаунта.
+
+    notified - последний доставленный статус каждой работы:
+    {notified_key: [status, date_updated]}; pending - статусы, которые
+    стоят в очереди доставки. Курсор, notified и pending меняются
+    под lock: их трогают и потоки опроса, и потоки доставки.
+    """
+
+    __slots__ = ('timestamp', 'status', 'active_at', 'errors', 'notified',
+                 'pending', 'lock')
+
+    def __init__(self, timestamp, status=None, active_at=None, errors=0,
+                 notified=None):
+        """Курсор from_date, последний статус и счётчик ошибок."""
+        self.timestamp = timestamp
+        self.status = status
+        self.active_at = active_at
+        self.errors = errors
+        self.notified = notified or {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_row(cls, row):
+        """Состояние из строки CheckpointStore.load (без ключа)."""
+        *fields, notified = row
+        return cls(*fields, json.loads(notified) if notified else None)
+
+    def row(self, key):
+        """Строка для CheckpointStore.save.
+
+        Снимок берётся под lock: notified тем временем может менять
+        поток опроса или доставки.
+        """
+        with self.lock:
+            notified = dict(self.notified)
+            timestamp = self.timestamp
+        notified = notified and json.dumps(notified, ensure_ascii=False)
+        return (key, timestamp, self.status, self.active_at,
+                self.errors, notified or None)
+
+
+class Notices:
+    """Уведомления из одного ответа API до подтверждения доставки.
+
+    Курсор from_date сдвигается на current_date ответа (cursor), только
+    когда доставлены все уведомления (waiting == 0) и ни одно не
+    сорвалось (hold): иначе следующий опрос получит изменение снова.
+    """
+
+    __slots__ = ('waiting', 'hold', 'cursor')
+
+    def __init__(self):
+        """Пока нет ни уведомлений, ни current_date."""
+        self.waiting = 0
+        self.hold = False
+        self.cursor = None
+
+
+class PollingEngine:
+    """Параллельный опрос множества пар (токен Практикума, чат Telegram).
+
+    Блокирующие вызовы API выполняются в пуле потоков, а asyncio
+    только извлекает из PollScheduler аккаунты, которым пора
+    на опрос, и возвращает их в очередь с адаптивным интервалом.
+    """
+
+    def __init__(self, bot, accounts, retry_time=RETRY_TIME,
+                 workers=POLL_WORKERS, client=None, endpoint=ENDPOINT,
+                 store=None, delivery=None, suppressor=None, stream=False,
+                 cache=None, breaker=None, flights=None,
+                 shutdown_timeout=SHUTDOWN_TIMEOUT, policy=None,
+                 digest=None, memory=None, leases=None,
+                 stop_timeout=STOP_POLLS_TIMEOUT):
+        """Не переданные компоненты создаются по умолчанию или выключены."""
+        self.bot = bot
+        self.accounts = list(dict.fromkeys(accounts))
+        self.retry_time = retry_time
+        self.workers = workers
+        self.client = client or HTTPClient(pool_size=workers)
+        self.endpoint = endpoint
+        self.store = store
+        self.delivery = delivery
+        self.suppressor = suppressor or ErrorSuppressor()
+        self.stream = stream
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.flights = flights or SingleFlight()
+        self.shutdown_timeout = shutdown_timeout
+        self.stop_timeout = stop_timeout
+        self.policy = policy or RequestPolicy()
+        self.digest = digest
+        self.memory = memory
+        self.profiler = PollProfiler()
+        self.leases = leases
+        self.keys = {
+            account: account_key(account) for account in self.accounts
+        }
+        self.states = self._restore_states()
+        self.scheduler = PollScheduler()
+        self.polls = 0
+        self._token_due = {}
+        self._dirty = set()
+        self._notified = set()
+        self._stopping = False
+        self._stopped = None
+        self._wakeup = None
+        self._loop = None
+
+    def _restore_states(self):
+        """Состояния аккаунтов из хранилища; новым - текущее время."""
+        now = int(time.time())
+        saved = self.store.load() if self.store else {}
+        states = {}
+        restored = 0
+        for account in self.accounts:
+            row = saved.get(self.keys[account])
+            if row:
+                restored += 1
+                states[account] = AccountState.from_row(row)
+            else:
+                states[account] = AccountState(now)
+        if self.store:
+            logger.info(STATE_RESTORED.format(
+                restored=restored, count=len(self.accounts)
+            ))
+        return states
+
+    async def checkpoint(self):
+        """Сохранить изменившиеся состояния одной транзакцией."""
+        if not self.store or not self._dirty:
+            return
+        dirty = set(self._dirty)
+        self._dirty.clear()
+        loop = asyncio.get_running_loop()
+        try:
+            rows = [
+                self.states[account].row(self.keys[account])
+                for account in dirty
+            ]
+            await loop.run_in_executor(None, self.store.save, rows)
+        except Exception as error:
+            # Несохранённое попадёт в следующую контрольную точку.
+            self._dirty |= dirty
+            logger.exception(CHECKPOINT_FAILED.format(error=error))
+
+    async def _checkpoints(self):
+        """Периодически сбрасывать состояние в хранилище."""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), CHECKPOINT_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            await self.checkpoint()
+
+    async def _renew_once(self):
+        """Продлить аренду аккаунтов.
+
+        Перед продлением состояние сохраняется, чтобы узел, которому
+        отойдут аккаунты, продолжил с того же from_date; состояние
+        полученных аккаунтов, наоборот, перечитывается из хранилища.
+        """
+        await self.checkpoint()
+        gained, _ = await self._loop.run_in_executor(None, self.leases.renew)
+        if gained and self.store:
+            saved = await self._loop.run_in_executor(None, self.store.load)
+            for account in gained:
+                row = saved.get(self.keys[account])
+                if row:
+                    self.states[account] = AccountState.from_row(row)
+
+    async def _renew_leases(self):
+        """Продлевать аренду раз в leases.interval секунд."""
+        if self.leases is None:
+            return
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), self.leases.interval
+                )
+            except asyncio.TimeoutError:
+                await self._renew_once()
+
+    async def _start_services(self):
+        """Запустить доставку и сводки, взять первую аренду аккаунтов."""
+        if self.delivery:
+            self.delivery.start()
+        if self.digest:
+            self.digest.start()
+        if self.leases:
+            await self._renew_once()
+
+    async def _memory_reports(self):
+        """Сравнивать снимки памяти раз в memory.interval секунд."""
+        if self.memory is None:
+            return
+        self.memory.start()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), self.memory.interval
+                )
+            except asyncio.TimeoutError:
+                await self._loop.run_in_executor(
+                    None, self.memory.check, self.polls
+                )
+
+    def memory_report(self):
+        """Рост памяти с прошлого снимка (команда memory)."""
+        if self.memory is None:
+            self.memory = MemoryTracker().start()
+        return self.memory.report(self.polls)
+
+    def dump_heap(self):
+        """Сохранить снимок кучи (SIGUSR2, команда heap).
+
+        Если трассировка не была включена, она включается сейчас,
+        и снимок покажет только выделения после этого момента.
+        """
+        if self.memory is None:
+            self.memory = MemoryTracker().start()
+        return self.memory.dump()
+
+    def poll_account(self, account):
+        """Один цикл опроса аккаунта: та же логика, что и в main().
+
+        Метка from_date сдвигается только при появлении изменений:
+        пока их нет, запрос повторяется без изменений и сервер может
+        ответить 304, тогда разбор ответа пропускается целиком.
+        Все стадии укладываются в общий срок policy.deadline.
+        Возвращает False, если запрос не выполнялся из-за разомкнутого
+        предохранителя.
+        """
+        state = self.states[account]
+        deadline = self.policy.deadline()
+        try:
+            if self.stream or not state.timestamp:
+                self._poll_stream(account, state, deadline)
+            else:
+                self._poll_answer(account, state, deadline)
+            POLLS.inc(outcome='ok')
+            if self.cache:
+                self.cache.touch(account)
+            state.errors = 0
+            self._recovered(account)
+        except CircuitOpenError:
+            POLLS.inc(outcome='circuit_open')
+            return False
+        except Exception as error:
+            POLLS.inc(outcome='error')
+            state.errors += 1
+            error_msg = self.suppressor.on_error(account, error)
+            if error_msg is None:
+                logger.debug(LazyMessage(ERROR_SUPPRESSED, error=error))
+                return True
+            logger.exception(error_msg)
+            self._notify(account, error_msg)
+        return True
+
+    def _poll_answer(self, account, state, deadline):
+        """Опрос с разбором ответа целиком.
+
+        Чаты одного токена с одинаковым from_date получают ответ одного
+        запроса; разбор статуса кешируется, и каждому чату остаётся
+        только отправка.
+        """
+        with stage('get_api_answer'):
+            response = self.flights.do(
+                (account.token, state.timestamp), account, self.breaker.call,
+                self.policy.call, request_api_answer, deadline, self.client,
+                account.token, state.timestamp, self.endpoint
+            )
+        if response is None:
+            return
+        deadline.check('check_response')
+        with stage('check_response'):
+            homeworks, errors = validate_response(response)
+            newest = not errors or validate_homework(
+                response['homeworks'][0]
+            )[1] is None
+        self._rejected(errors, newest)
+        if self.cache and homeworks:
+            self.cache.record(account, homeworks)
+        if homeworks:
+            deadline.check('parse_status')
+            notices = Notices()
+            self._announce(account, state, homeworks, notices)
+            self._settle(
+                account, notices,
+                response.get('current_date', state.timestamp)
+            )
+
+    def _poll_stream(self, account, state, deadline):
+        """Опрос с потоковым разбором: для from_date=0 и больших историй.
+
+        Первая (самая свежая) работа уходит в чат, не дожидаясь конца
+        ответа; остальные только проходят через разбор, а в режиме
+        сводки копятся для _announce. Потоковые ответы не дублируются:
+        проигравший ответ пришлось бы дочитывать.
+
+        Чтение тела ответа учитывается в стадии get_api_answer, а
+        check_response - это только проверка элементов.
+        """
+        timer = StageTimer()
+        try:
+            with timer.stage('get_api_answer'):
+                answer = self.breaker.call(
+                    self.policy.call, stream_api_answer, deadline,
+                    self.client, account.token, state.timestamp,
+                    self.endpoint, hedge=False
+                )
+            if answer is not None:
+                self._read_stream(account, state, deadline, answer, timer)
+        finally:
+            timer.observe()
+
+    def _read_stream(self, account, state, deadline, answer, timer):
+        """Разобрать потоковый ответ и объявить изменения."""
+        changed = False
+        received = []
+        updates = []
+        errors = []
+        notices = Notices()
+        items = valid_items(answer, deadline, errors, timer)
+        for index, homework in items:
+            if index == 0:
+                changed = True
+                if not self.digest:
+                    self._changed(account, state, homework, notices)
+            if changed and self.digest:
+                updates.append(homework)
+            if self.cache:
+                received.append(homework)
+        self._rejected(errors, changed or not errors)
+        if updates:
+            self._announce(account, state, updates, notices)
+        if self.cache:
+            self.cache.record(account, received, complete=not state.timestamp)
+        if changed:
+            self._settle(
+                account, notices,
+                answer.fields.get('current_date', state.timestamp)
+            )
+
+    def _rejected(self, errors, newest):
+        """Учесть некорректные элементы ответа.
+
+        Они пропускаются, не мешая остальным, пока корректна самая
+        свежая работа (newest). Иначе опрос считается неудачным: более
+        старую работу нельзя объявлять новым изменением статуса.
+        """
+        if not errors:
+            return
+        INVALID_ITEMS.inc(len(errors))
+        for error in errors:
+            logger.error(INVALID_ITEM.format(error=error))
+        if not newest:
+            raise ValueError(errors[0])
+
+    def _announce(self, account, state, homeworks, notices):
+        """Уведомить об изменениях из одного ответа (свежие - первыми).
+
+        В режиме сводки в буфер попадает каждая изменившаяся работа,
+        от старых к новым, иначе - только самая свежая. Ответ на
+        from_date=0 - это вся история, а не изменения, поэтому из него
+        берётся только самая свежая работа.
+        """
+        if not self.digest or not state.timestamp:
+            homeworks = homeworks[:1]
+        for homework in reversed(homeworks):
+            self._changed(account, state, homework, notices)
+
+    def _changed(self, account, state, homework, notices):
+        """Уведомить об изменении статуса.
+
+        Статус запоминается в notified, когда сообщение доставлено
+        в чат аккаунта (см. _confirmed). Работа, о статусе которой уже
+        сообщалось, пропускается: API возвращает её повторно, если она
+        изменилась в ту же секунду, что и current_date, или если после
+        перезапуска from_date восстановлен из более раннего сохранения.
+        Статус, который ещё в очереди доставки, тоже не отправляется
+        повторно, но и курсор по этому ответу не сдвигается.
+        """
+        key = notified_key(homework)
+        notified = [homework.status, homework.date_updated]
+        with state.lock:
+            if state.notified.get(key) == notified:
+                logger.debug(LazyMessage(
+                    ALREADY_NOTIFIED, status=homework.status,
+                    name=homework.name
+                ))
+                return
+            if state.pending.get(key) == notified:
+                notices.hold = True
+                return
+            state.pending[key] = notified
+            notices.waiting += 1
+        confirm = partial(self._confirmed, account, key, notified, notices)
+        try:
+            with stage('parse_status'):
+                message = parse_status(homework)
+            sent = self._deliver(account, message)
+        except Exception:
+            confirm(False)
+            raise
+        state.status = homework.status
+        state.active_at = time.time()
+        if isinstance(sent, Future):
+            sent.add_done_callback(
+                lambda future: confirm(future.result().ok)
+            )
+        else:
+            confirm(sent)
+
+    def _deliver(self, account, message):
+        """Отправить уведомление в чат аккаунта и чаты получателей.
+
+        Возвращает Future очереди доставки для чата аккаунта или, без
+        очереди, доставлено ли сообщение. Сводка считается доставленной,
+        как только уведомление попало в её буфер.
+        """
+        if self.digest:
+            for chat_id in (account.chat_id, *account.recipients):
+                self.digest.add(chat_id, message)
+            return True
+        if account.recipients:
+            sent = self.broadcast(
+                (account.chat_id, *account.recipients), message
+            )[0]
+            return sent if isinstance(sent, Future) else sent.ok
+        sent = self.send(account.chat_id, message)
+        return sent if isinstance(sent, Future) else True
+
+    def _confirmed(self, account, key, notified, notices, delivered):
+        """Учесть исход доставки уведомления (в любом потоке).
+
+        Недоставленный статус не попадает в notified и держит курсор:
+        следующий опрос получит его снова и повторит отправку.
+        """
+        state = self.states[account]
+        with state.lock:
+            if state.pending.get(key) == notified:
+                del state.pending[key]
+            if delivered:
+                state.notified[key] = notified
+            else:
+                notices.hold = True
+            notices.waiting -= 1
+        if delivered:
+            self._notified.add(account)
+            self._mark_dirty(account)
+        self._settle(account, notices)
+
+    def _settle(self, account, notices, cursor=None):
+        """Сдвинуть курсор на current_date, когда всё доставлено.
+
+        cursor передаёт опрос, дочитав ответ; исходы доставки приходят
+        через _confirmed, и курсор сдвигает тот, кто окажется последним.
+        """
+        state = self.states[account]
+        with state.lock:
+            if cursor is not None:
+                notices.cursor = cursor
+            if notices.cursor is None or notices.waiting or notices.hold:
+                return
+            state.timestamp = notices.cursor
+        self._mark_dirty(account)
+
+    def _mark_dirty(self, account):
+        """Отметить состояние к сохранению из любого потока."""
+        if self._loop is None or self._loop.is_closed():
+            self._dirty.add(account)
+        else:
+            self._loop.call_soon_threadsafe(self._dirty.add, account)
+
+    def _recovered(self, account):
+        """Сообщить о восстановлении после серии ошибок."""
+        message = self.suppressor.on_success(account)
+        if message is not None:
+            logger.info(message)
+            self._notify(account, message)
+
+    def _notify(self, account, message):
+        """Служебное сообщение в чат: ошибка отправки только логируется."""
+        try:
+            self.send(account.chat_id, message)
+        except Exception as error:
+            logger.exception(ERROR_MESSAGE.format(error=error))
+
+    def send(self, chat_id, message):
+        """Отправить сообщение через очередь доставки или напрямую.
+
+        Через очередь возвращает Future с SendResult.
+        """
+        if self.delivery:
+            return self.delivery.submit(chat_id, message)
+        deliver_message(self.bot, chat_id, message)
+
+    def broadcast(self, chat_ids, message):
+        """Разослать сообщение в несколько чатов.
+
+        Через очередь доставки возвращает Future на каждый чат, без неё
+        отправляет сразу и возвращает список SendResult.
+        """
+        if self.delivery:
+            return self.delivery.broadcast(chat_ids, message)
+        results = send_many(self.bot, chat_ids, message)
+        report_broadcast(results)
+        return results
+
+    async def _poll(self, executor, account):
+        """Опросить аккаунт в пуле потоков и запланировать следующий опрос.
+
+        Непредвиденная ошибка цикла только логируется: аккаунт всё
+        равно возвращается в очередь через retry_time.
+        """
+        due = time.time() + self.retry_time
+        try:
+            due = await self._poll_due(executor, account)
+        except Exception as error:
+            logger.exception(POLL_FAILED.format(error=error))
+        self.scheduler.schedule(account, due)
+        self._wakeup.set()
+        if account in self._notified:
+            # Отправленный статус сохраняется сразу, а не с очередной
+            # контрольной точкой: иначе после падения он ушёл бы снова.
+            self._notified.discard(account)
+            await self.checkpoint()
+
+    async def _poll_due(self, executor, account):
+        """Опросить аккаунт; вернуть время следующего опроса.
+
+        Пока предохранитель разомкнут, аккаунт переносится на момент
+        после паузы со случайным разбросом, чтобы пробные запросы
+        не совпадали с волной отложенных опросов.
+        """
+        if self.leases and not self.leases.owns(account):
+            return time.time() + self.leases.interval
+        polled = await self._loop.run_in_executor(
+            executor, self.profiler.call, self.poll_account, account
+        )
+        now = time.time()
+        if not polled:
+            return (now + self.breaker.retry_after()
+                    + random.random() * self.breaker.reset_timeout)
+        self.polls += 1
+        if startup.mark('first_poll'):
+            logger.info(startup.report())
+        self._dirty.add(account)
+        return self._next_due(account, now)
+
+    def _next_due(self, account, now):
+        """Время следующего опроса, общее для чатов одного токена.
+
+        Чаты, опрошенные одним запросом, планируются на тот же момент,
+        чтобы и следующий их запрос объединился.
+        """
+        shared = self._token_due.get(account.token)
+        if shared and now - shared[1] <= self.flights.linger:
+            return shared[0]
+        due = now + next_interval(self.states[account], now, self.retry_time)
+        self._token_due[account.token] = (due, now)
+        return due
+
+    async def _wait(self, delay):
+        """Ждать delay секунд или до изменения очереди/остановки."""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self):
+        """Остановить опрос; сроки текущих урезаются до stop_timeout."""
+        self._stopping = True
+        self.policy.expire(self.stop_timeout)
+        if self._wakeup is not None:
+            self._wakeup.set()
+            self._stopped.set()
+
+    def poll_now(self):
+        """Опросить все ожидающие аккаунты, не дожидаясь их срока."""
+        logger.info(POLL_NOW)
+        self.scheduler.advance(time.time())
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _threadsafe(self, method):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(method)
+
+    def request_stop(self):
+        """stop() из любого потока (например, из управляющего сокета)."""
+        self._threadsafe(self.stop)
+
+    def request_poll(self):
+        """poll_now() из любого потока."""
+        self._threadsafe(self.poll_now)
+
+    def _on_signal(self, signum):
+        if signum == signal.SIGUSR1:
+            self.poll_now()
+        elif signum == signal.SIGUSR2:
+            self._loop.run_in_executor(None, self.dump_heap)
+        elif signum == signal.SIGPROF:
+            self.profiler.start()
+        else:
+            logger.info(SHUTDOWN_SIGNAL.format(
+                signal=signal.Signals(signum).name
+            ))
+            self.stop()
+
+    def _handle_signals(self, install=True):
+        """SIGTERM/SIGINT - мягкая остановка, SIGUSR1 - опрос сейчас.
+
+        SIGUSR2 сохраняет снимок кучи, SIGPROF профилирует следующие
+        PROFILE_POLLS опросов.
+        """
+        for signum in SIGNALS:
+            if install:
+                self._loop.add_signal_handler(signum, self._on_signal, signum)
+            else:
+                self._loop.remove_signal_handler(signum)
+
+    async def _flush_messages(self):
+        """Отправить накопленные сводки и дослать очередь доставки."""
+        if self.digest:
+            await self._loop.run_in_executor(None, self.digest.close)
+        if self.delivery:
+            pending = await self._loop.run_in_executor(
+                None, self.delivery.close, self.shutdown_timeout
+            )
+            if pending:
+                logger.warning(NOT_DELIVERED.format(count=pending))
+
+    async def _shutdown(self, polls):
+        """Сохранить состояние и дослать сообщения после остановки.
+
+        Текущие опросы ждём не дольше stop_timeout: их сроки уже
+        урезаны stop(). Состояние сохраняется до отправки очереди,
+        чтобы SIGKILL во время досылки не потерял курсоры: статусы
+        из очереди в нём ещё не отмечены доставленными. После досылки
+        сохраняются подтверждённые доставки; не ушедшие сообщения
+        остаются неотмеченными и будут отправлены после перезапуска.
+        """
+        if polls:
+            await asyncio.wait(polls, timeout=self.stop_timeout)
+        self.policy.close()
+        await self.checkpoint()
+        await self._flush_messages()
+        await self.checkpoint()
+        if self.leases:
+            await self._loop.run_in_executor(None, self.leases.release)
+
+    async def run(self, handle_signals=False):
+        """Опрашивать все аккаунты до вызова stop().
+
+        Остановка (см. _shutdown) укладывается в stop_timeout
+        + shutdown_timeout секунд.
+        """
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if handle_signals:
+            self._handle_signals()
+        background = asyncio.gather(
+            self._checkpoints(), self._memory_reports(), self._renew_leases()
+        )
+        await self._start_services()
+        now = time.time()
+        tokens = list(dict.fromkeys(
+            account.token for account in self.accounts
+        ))
+        step = self.retry_time / max(len(tokens), 1)
+        offsets = {token: index * step for index, token in enumerate(tokens)}
+        for account in self.accounts:
+            self.scheduler.schedule(account, now + offsets[account.token])
+        ACCOUNTS.set(len(self.accounts))
+        SCHEDULED.set_function(lambda: len(self.scheduler))
+        logger.info(ENGINE_STARTED.format(
+            count=len(self.accounts), workers=self.workers
+        ))
+        polls = set()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while not self._stopping:
+                now = time.time()
+                for account in self.scheduler.pop_due(now):
+                    task = asyncio.ensure_future(self._poll(executor, account))
+                    polls.add(task)
+                    task.add_done_callback(polls.discard)
+                await self._wait(self.scheduler.delay(now))
+            await self._shutdown(polls)
+        finally:
+            # Зависший запрос не должен задерживать остановку.
+            executor.shutdown(wait=False, cancel_futures=True)
+        await background
+        if handle_signals:
+            self._handle_signals(install=False)
+        logger.info(ENGINE_STOPPED)
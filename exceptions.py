@@ -1,7 +1,20 @@
 class APIResponseStatusCodeError(Exception):
-    pass
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class ServerResponseError(Exception):
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(Exception):
     pass
 
+
+class DeadlineExceeded(TimeoutError):
+    pass
@@ -1,23 +1,59 @@
+from collections import namedtuple
+from functools import lru_cache
 from http import HTTPStatus
 import logging
 import os
-import requests
-import time
+import sys
 
 from dotenv import load_dotenv
-import telegram
 
 from exceptions import APIResponseStatusCodeError, ServerResponseError
+import logs
+import metrics
+import startup
 
-load_dotenv()
+# Тяжёлые зависимости загружаются при первом использовании.
+requests = startup.lazy_import('requests')
+telegram = startup.lazy_import('telegram')
+
+with startup.timed('load_dotenv'):
+    load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('TOKEN_OF_PRACTICUM')
 TELEGRAM_TOKEN = os.getenv('TOKEN_OF_TELEGRAM')
 TELEGRAM_CHAT_ID = os.getenv('ID_OF_CHAT')
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+STATE_DB = os.getenv('STATE_DB', 'homework_state.sqlite3')
 
 RETRY_TIME = 600
+RENDER_CACHE_SIZE = 4096
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 32))
+STREAM_RESPONSES = bool(os.getenv('STREAM_RESPONSES'))
+LOG_FILE = os.getenv('LOG_FILE', __file__ + '.log')
+LOG_JSON = bool(os.getenv('LOG_JSON'))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+COMMANDS = bool(os.getenv('COMMANDS'))
+SHARDS = int(os.getenv('SHARDS', 1))
+CONTROL_SOCKET = os.getenv('CONTROL_SOCKET')
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 60))
+REQUEST_ATTEMPTS = int(os.getenv('REQUEST_ATTEMPTS', 3))
+HEDGE_REQUESTS = bool(os.getenv('HEDGE_REQUESTS'))
+RECORD_TRAFFIC = os.getenv('RECORD_TRAFFIC')
+DIGEST_WINDOW = float(os.getenv('DIGEST_WINDOW', 0))
+DIGEST_SIZE = int(os.getenv('DIGEST_SIZE', 10))
+MEMORY_TRACE = bool(os.getenv('MEMORY_TRACE'))
+MEMORY_INTERVAL = float(os.getenv('MEMORY_INTERVAL', 600))
+HEAP_DUMP_DIR = os.getenv('HEAP_DUMP_DIR', '.')
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+LEASE_DB = os.getenv('LEASE_DB')
+LEASE_TTL = float(os.getenv('LEASE_TTL', 30))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+AUTHORIZATION = 'OAuth {token}'
+REDACTED_AUTHORIZATION = 'OAuth ***'
 FORMAT_OF_LOGS = ('%(asctime)s - %(name)s - %(lineno)s - '
                   '%(levelname)s - %(funcName)s()- %(message)s')
 
@@ -67,54 +103,122 @@ FAIL_SERVER = ('Обнаружена проблема с сервером. '
                )
 BOT_ERROR = 'Проблема с ботом: {error}'
 TOKENS = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
+ACCOUNTS_TOKENS = ['TELEGRAM_TOKEN']
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter(FORMAT_OF_LOGS)
-file_handler = logging.FileHandler(__file__ + '.log')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter(FORMAT_OF_LOGS))
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.INFO)
-stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
-logger.addHandler(file_handler)
+
+
+def configure_logs(path=LOG_FILE):
+    """Писать лог в path (в режиме SHARDS у каждого шарда свой файл)."""
+    return logs.configure(
+        logger, FORMAT_OF_LOGS, path, logging.INFO,
+        json_lines=LOG_JSON, when=LOG_ROTATE_WHEN
+    )
+
+
+log_listener = configure_logs()
 
 
 def send_message(bot, message):
     """Отправка сообщений в telegram-чат."""
-    bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-    logger.info(SUCCESS_MESSAGE.format(message=message))
+    deliver_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def deliver_message(bot, chat_id, message):
+    """Отправка сообщения в произвольный telegram-чат."""
+    with metrics.stage('send_message'):
+        bot.send_message(chat_id=chat_id, text=message)
+    logger.info(logs.LazyMessage(SUCCESS_MESSAGE, message=message))
 
 
 def get_api_answer(current_timestamp):
     """Отпрвка запроса к API-сервису Яндекс.Практикум."""
+    return request_api_answer(requests, PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_api_answer(client, token, current_timestamp, endpoint=ENDPOINT,
+                       timeout=REQUEST_TIMEOUT):
+    """Запрос к API от имени произвольного токена через клиент client.
+
+    client - любой объект с методом get() в духе requests:
+    сам модуль requests или http_client.HTTPClient.
+    timeout - пара (подключение, чтение) в секундах.
+    Возвращает None, если сервер ответил 304 Not Modified.
+    """
+    homework_statuses, params_connection = open_api_answer(
+        client, token, current_timestamp, endpoint, timeout=timeout
+    )
+    if homework_statuses.status_code == HTTPStatus.NOT_MODIFIED:
+        return None
+    homework = decode_answer(homework_statuses, params_connection)
+    check_server_answer(
+        homework, homework_statuses.status_code, params_connection
+    )
+    return homework
+
+
+def open_api_answer(client, token, current_timestamp, endpoint=ENDPOINT,
+                    timeout=REQUEST_TIMEOUT, **kwargs):
+    """Отправить запрос к API; вернуть ответ и параметры запроса."""
     params_connection = {
-        'url': ENDPOINT,
-        'headers': HEADERS,
+        'url': endpoint,
+        'headers': {'Authorization': AUTHORIZATION.format(token=token)},
         'params': {'from_date': current_timestamp}
     }
     try:
-        homework_statuses = requests.get(**params_connection)
+        homework_statuses = client.get(
+            **params_connection, timeout=timeout, **kwargs
+        )
     except requests.exceptions.RequestException as error:
         raise ConnectionError(FAIL_CONNECTION.format(
             error=error,
-            **params_connection
+            **redact(params_connection)
         ))
-    homework = homework_statuses.json()
+    return homework_statuses, params_connection
+
+
+def redact(params_connection):
+    """Параметры запроса для логов и сообщений: без токена."""
+    return {
+        **params_connection,
+        'headers': {
+            **params_connection['headers'],
+            'Authorization': REDACTED_AUTHORIZATION
+        }
+    }
+
+
+def decode_answer(homework_statuses, params_connection):
+    """Тело ответа API как JSON.
+
+    Ответ с кодом ошибки и телом не в JSON (например, HTML-страница
+    502 от балансировщика) - это ошибка кода ответа, а не разбора.
+    """
+    try:
+        return homework_statuses.json()
+    except ValueError:
+        if homework_statuses.status_code == HTTPStatus.OK:
+            raise
+    raise APIResponseStatusCodeError(FAIL_STATUS.format(
+        homework_statuses=homework_statuses.status_code,
+        **redact(params_connection)
+    ), homework_statuses.status_code)
+
+
+def check_server_answer(homework, status_code, params_connection):
+    """Проверка ответа API на ошибки сервера и код ответа."""
     for key in ('error', 'code'):
         if key in homework:
             raise ServerResponseError(FAIL_SERVER.format(
                 server_error=homework.get(key),
-                **params_connection
-            ))
+                **redact(params_connection)
+            ), status_code)
 
-    if homework_statuses.status_code != HTTPStatus.OK:
+    if status_code != HTTPStatus.OK:
         raise APIResponseStatusCodeError(FAIL_STATUS.format(
-            homework_statuses=homework_statuses.status_code,
-            **params_connection
-        ))
-    return homework
+            homework_statuses=status_code,
+            **redact(params_connection)
+        ), status_code)
 
 
 def check_response(response):
@@ -133,10 +237,35 @@ def check_response(response):
     return homeworks
 
 
+class Homework(namedtuple(
+        'Homework', ['id', 'name', 'status', 'date_updated'])):
+    """Компактная запись о домашней работе вместо словаря из API."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, homework):
+        """Запись из элемента списка homeworks ответа API."""
+        return cls(
+            homework.get('id'),
+            homework['homework_name'],
+            homework['status'],
+            homework.get('date_updated'),
+        )
+
+
 def parse_status(homework):
     """Парсинг ответа от API-сервиса Яндекс.Практикум."""
+    if isinstance(homework, Homework):
+        return render_status(homework.name, homework.status)
     name = homework['homework_name']
     status = homework['status']
+    return render_status(name, status)
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_status(name, status):
+    """Текст уведомления для пары (название работы, статус)."""
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(
             UNKNOWN_HOMEWORK.format(status=status)
@@ -147,7 +276,8 @@ def parse_status(homework):
 
 def check_tokens():
     """Проверка переменных окружения."""
-    missed_token = [token for token in TOKENS
+    tokens = ACCOUNTS_TOKENS if ACCOUNTS_FILE else TOKENS
+    missed_token = [token for token in tokens
                     if token not in globals() or not globals()[token]]
     if missed_token:
         logger.critical(NO_TOKEN.format(missed_token))
@@ -155,30 +285,102 @@ def check_tokens():
     return True
 
 
+def run_engine(accounts, commands=COMMANDS, control_socket=CONTROL_SOCKET,
+               command_accounts=None):
+    """Опрашивать accounts в текущем процессе до SIGTERM/SIGINT.
+
+    command_accounts - аккаунты, на команды которых отвечает бот,
+    если их больше, чем опрашивает этот процесс (шард с командами).
+    """
+    # telegram нужен только для первой отправки: грузим его в фоне,
+    # пока выполняется первый опрос.
+    startup.preload('telegram')
+    with startup.timed('import engine'):
+        import asyncio
+        from commands import CommandService, StatusCache, build_updater
+        from control import ControlServer
+        from delivery import TelegramDelivery, build_bot
+        from engine import PollingEngine
+        from storage import CheckpointStore
+    bot = startup.LazyObject(
+        lambda: build_bot(TELEGRAM_TOKEN), 'telegram.Bot'
+    )
+    client = recorder = None
+    if RECORD_TRAFFIC:
+        from http_client import HTTPClient
+        from recording import RecordingBot, RecordingClient, TrafficRecorder
+        recorder = TrafficRecorder(RECORD_TRAFFIC)
+        recorder.accounts(accounts)
+        client = RecordingClient(HTTPClient(POLL_WORKERS), recorder)
+        bot = RecordingBot(bot, recorder)
+    with startup.timed('restore_state'):
+        store = CheckpointStore(STATE_DB) if STATE_DB else None
+        cache = StatusCache() if commands else None
+        delivery = TelegramDelivery(bot)
+        digest = None
+        if DIGEST_WINDOW:
+            from digest import DigestBuffer
+            digest = DigestBuffer(delivery.submit, DIGEST_WINDOW, DIGEST_SIZE)
+        memory = None
+        if MEMORY_TRACE:
+            from memory import MemoryTracker
+            memory = MemoryTracker()
+        leases = None
+        if LEASE_DB:
+            from leases import LeaseManager, LeaseStore
+            leases = LeaseManager(LeaseStore(LEASE_DB), accounts)
+        engine = PollingEngine(
+            bot, accounts, workers=POLL_WORKERS, client=client, store=store,
+            delivery=delivery, stream=STREAM_RESPONSES, cache=cache,
+            digest=digest, memory=memory, leases=leases
+        )
+    updater = None
+    if cache:
+        updater = build_updater(TELEGRAM_TOKEN, CommandService(
+            engine, cache, command_accounts
+        ))
+        updater.start_polling()
+    control = None
+    if control_socket:
+        control = ControlServer(control_socket, {
+            'poll': engine.request_poll, 'stop': engine.request_stop,
+            'heap': engine.dump_heap, 'memory': engine.memory_report,
+            'profile': engine.profiler.start,
+        }).start()
+    try:
+        asyncio.run(engine.run(handle_signals=True))
+    finally:
+        if control:
+            control.close()
+        if updater:
+            updater.stop()
+        if store:
+            store.close()
+        if recorder:
+            recorder.close()
+        if leases:
+            leases.store.close()
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         raise KeyError(TOKENS_PROBLEM)
     logger.debug(TOKENS_CORRECT)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homework = check_response(response)
-            if homework:
-                send_message(bot, parse_status(homework[0]))
-            current_timestamp = response.get('current_date', current_timestamp)
-        except Exception as error:
-            error_msg = BOT_ERROR.format(error=error)
-            logger.exception(error_msg)
-            try:
-                send_message(bot, error_msg)
-            except Exception as error:
-                logger.exception(ERROR_MESSAGE.format(error=error))
-        finally:
-            time.sleep(RETRY_TIME)
+    from engine import load_accounts
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    accounts = load_accounts(ACCOUNTS_FILE, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    if SHARDS > 1:
+        from supervisor import Supervisor
+        Supervisor(accounts, SHARDS, commands=COMMANDS).run(
+            control_socket=CONTROL_SOCKET
+        )
+        return
+    run_engine(accounts)
 
 
 if __name__ == '__main__':
+    # engine импортирует homework: не даём модулю загрузиться второй раз.
+    sys.modules.setdefault('homework', sys.modules[__name__])
     main()
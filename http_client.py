@@ -0,0 +1,61 @@
+from http import HTTPStatus
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_HOSTS = 4
+POOL_SIZE = 32
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class HTTPClient:
+    """Общая requests.Session с пулом keep-alive соединений на хост.
+
+    Для каждой пары (url, Authorization) запоминает ETag и Last-Modified
+    последнего ответа 200 и повторяет запрос с теми же параметрами
+    условно: сервер отвечает 304 без тела, если ничего не изменилось.
+    Интерфейс get() совпадает с requests.get().
+    """
+
+    def __init__(self, pool_size=POOL_SIZE):
+        """Сессия с пулом на pool_size соединений к одному хосту."""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_HOSTS, pool_maxsize=pool_size
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """GET с условными заголовками If-None-Match/If-Modified-Since."""
+        headers = dict(headers or {})
+        key = (url, headers.get('Authorization'))
+        query = tuple(sorted((params or {}).items()))
+        with self._lock:
+            cached = self._validators.get(key)
+        if cached and cached[0] == query:
+            _, etag, last_modified = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        response = self.session.get(
+            url, headers=headers, params=params, **kwargs
+        )
+        if response.status_code == HTTPStatus.OK:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            with self._lock:
+                if etag or last_modified:
+                    self._validators[key] = (query, etag, last_modified)
+                else:
+                    self._validators.pop(key, None)
+        return response
+
+    def close(self):
+        """Закрыть все соединения пула."""
+        self.session.close()
@@ -0,0 +1,211 @@
+import hashlib
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from homework import LEASE_TTL, logger
+from metrics import REGISTRY
+
+# Доля срока аренды, после которой узел сам перестаёт считать её своей:
+# запас на задержку продления и расхождение часов узлов.
+LOCAL_VALIDITY = 2 / 3
+RENEWS_PER_TTL = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+'''
+HEARTBEAT = '''
+INSERT INTO nodes (node, expires) VALUES (?, ?)
+ON CONFLICT(node) DO UPDATE SET expires = excluded.expires
+'''
+CLAIM = '''
+INSERT INTO leases (key, owner, expires) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    owner = excluded.owner,
+    expires = excluded.expires
+'''
+
+LEASES_CHANGED = ('Узел {node}: получено аккаунтов {gained}, отдано {lost}, '
+                  'всего {owned} при {nodes} узлах')
+LEASES_FAILED = 'Не удалось продлить аренду аккаунтов: {error}'
+
+OWNED = REGISTRY.gauge(
+    'homework_leases_owned', 'Токены, арендованные этим узлом'
+)
+NODES = REGISTRY.gauge('homework_lease_nodes', 'Живые узлы по данным аренды')
+
+
+def lease_key(account):
+    """Ключ аренды: чаты одного токена принадлежат одному узлу."""
+    return hashlib.sha256(str(account.token).encode()).hexdigest()
+
+
+def default_node():
+    """Имя узла по умолчанию: хост и pid."""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def preference(node, key):
+    """Вес ключа для узла (rendezvous hashing): узлы предпочитают разные."""
+    return hashlib.md5(f'{node}:{key}'.encode()).digest()
+
+
+class LeaseStore:
+    """Аренды аккаунтов в общем SQLite-файле.
+
+    Подходит для узлов на одной машине или с общим диском; все
+    изменения выполняются под BEGIN IMMEDIATE, то есть одной
+    записывающей транзакцией за раз.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открыть (или создать) общий SQLite-файл аренды."""
+        self.path = path
+        self.clock = clock
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _transaction(self, function, *args):
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = function(self.clock(), *args)
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+            return result
+
+    def heartbeat(self, node, ttl):
+        """Отметить узел живым; вернуть число живых узлов."""
+        return self._transaction(self._heartbeat, node, ttl)
+
+    def _heartbeat(self, now, node, ttl):
+        execute = self._connection.execute
+        execute('DELETE FROM nodes WHERE expires <= ?', (now,))
+        execute(HEARTBEAT, (node, now + ttl))
+        return execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+
+    def claim(self, node, keys, limit, ttl):
+        """Продлить аренды узла и добрать свободные до limit.
+
+        Если узлу принадлежит больше limit ключей (появились новые
+        узлы), лишние освобождаются. Возвращает множество ключей узла.
+        """
+        return self._transaction(self._claim, node, keys, limit, ttl)
+
+    def _claim(self, now, node, keys, limit, ttl):
+        execute = self._connection.execute
+        execute(
+            'UPDATE leases SET expires = ? WHERE owner = ? AND expires > ?',
+            (now + ttl, node, now)
+        )
+        taken = dict(execute(
+            'SELECT key, owner FROM leases WHERE expires > ?', (now,)
+        ).fetchall())
+        ranked = sorted(
+            keys, key=lambda key: preference(node, key), reverse=True
+        )
+        owned = [key for key in ranked if taken.get(key) == node]
+        for key in owned[limit:]:
+            execute('DELETE FROM leases WHERE key = ? AND owner = ?',
+                    (key, node))
+        owned = owned[:limit]
+        for key in ranked:
+            if len(owned) >= limit:
+                break
+            if key not in taken:
+                execute(CLAIM, (key, node, now + ttl))
+                owned.append(key)
+        return set(owned)
+
+    def release(self, node):
+        """Освободить все аренды узла и убрать его из живых."""
+        self._transaction(self._release, node)
+
+    def _release(self, now, node):
+        self._connection.execute('DELETE FROM leases WHERE owner = ?', (node,))
+        self._connection.execute('DELETE FROM nodes WHERE node = ?', (node,))
+
+    def close(self):
+        """Закрыть соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+class LeaseManager:
+    """Какие аккаунты опрашивает этот узел.
+
+    renew() раз в interval секунд продлевает аренды и берёт долю
+    ceil(токены / живые узлы); аккаунты упавшего узла освобождаются
+    через ttl и достаются остальным. Если продлить аренду не удалось,
+    узел перестаёт опрашивать свои аккаунты раньше, чем их смогут
+    забрать другие, поэтому один токен не опрашивают два узла сразу.
+    """
+
+    def __init__(self, store, accounts, node=None, ttl=LEASE_TTL,
+                 clock=time.time):
+        """Аренда accounts узлом node на ttl секунд."""
+        self.store = store
+        self.node = node or default_node()
+        self.ttl = ttl
+        self.interval = ttl / RENEWS_PER_TTL
+        self.clock = clock
+        self.keys = {account: lease_key(account) for account in accounts}
+        self.owned = set()
+        self.valid_until = 0
+
+    def owns(self, account):
+        """Опрашивать ли аккаунт этому узлу."""
+        return (
+            self.keys.get(account) in self.owned
+            and self.clock() < self.valid_until
+        )
+
+    def renew(self):
+        """Продлить аренды; вернуть аккаунты (полученные, отданные)."""
+        started = self.clock()
+        keys = sorted(set(self.keys.values()))
+        try:
+            nodes = self.store.heartbeat(self.node, self.ttl)
+            owned = self.store.claim(
+                self.node, keys, math.ceil(len(keys) / nodes), self.ttl
+            )
+        except Exception as error:
+            logger.exception(LEASES_FAILED.format(error=error))
+            return [], []
+        gained, lost = owned - self.owned, self.owned - owned
+        self.owned = owned
+        self.valid_until = started + self.ttl * LOCAL_VALIDITY
+        OWNED.set(len(owned))
+        NODES.set(nodes)
+        if gained or lost:
+            logger.info(LEASES_CHANGED.format(
+                node=self.node, gained=len(gained), lost=len(lost),
+                owned=len(owned), nodes=nodes
+            ))
+        return (
+            [account for account, key in self.keys.items() if key in gained],
+            [account for account, key in self.keys.items() if key in lost],
+        )
+
+    def release(self):
+        """Отдать все аренды, чтобы другие узлы забрали их сразу."""
+        self.owned = set()
+        self.valid_until = 0
+        self.store.release(self.node)
@@ -0,0 +1,197 @@
+import atexit
+import gzip
+import json
+import logging
+from logging.handlers import (QueueHandler, QueueListener,
+                              RotatingFileHandler, TimedRotatingFileHandler)
+import os
+import queue
+import shutil
+import threading
+
+LOG_MAX_BYTES = 10 * 2 ** 20
+LOG_BACKUPS = 5
+LOG_QUEUE_SIZE = 10000
+
+
+class LazyMessage:
+    """Шаблон str.format, который форматируется только при выводе.
+
+    Если уровень сообщения ниже уровня логгера, запись не создаётся
+    и форматирование не выполняется вовсе.
+    """
+
+    __slots__ = ('template', 'kwargs')
+
+    def __init__(self, template, **kwargs):
+        """Шаблон и аргументы для отложенного format."""
+        self.template = template
+        self.kwargs = kwargs
+
+    def __str__(self):
+        """Отформатированный текст сообщения."""
+        return self.template.format(**self.kwargs)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() вызывает format() до постановки в очередь;
+    здесь вся работа, включая форматирование, достаётся слушателю.
+    Первая запись запускает слушатель, если он ещё не запущен.
+    """
+
+    def __init__(self, queue, listener=None):
+        """Писать в queue; listener запускается первой записью."""
+        super().__init__(queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        """Запись передаётся в очередь как есть."""
+        return record
+
+    def enqueue(self, record):
+        """При переполненной очереди запись теряется, а не ждёт."""
+        if self.listener is not None:
+            self.listener.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.handleError(record)
+
+
+class BackgroundListener(QueueListener):
+    """QueueListener, который можно безопасно остановить повторно.
+
+    Обработчики может создавать factory при запуске: тогда файл лога
+    открывается только перед первой записью.
+    """
+
+    def __init__(self, queue, *handlers, respect_handler_level=False,
+                 factory=None):
+        """Обработчики создаются factory при первом запуске."""
+        super().__init__(
+            queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self.factory = factory
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Запустить слушатель, если он ещё не запущен."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.start()
+
+    def reopen(self, factory):
+        """Остановиться и пересоздать обработчики через factory.
+
+        Накопленные записи дописываются прежними обработчиками, новые,
+        как и прежние, создаются перед первой записью.
+        """
+        self.stop()
+        for handler in self.handlers:
+            handler.close()
+        self.handlers = ()
+        self.factory = factory
+
+    def start(self):
+        """Создать обработчики и запустить поток слушателя."""
+        if self.factory is not None:
+            self.handlers = tuple(self.factory())
+            self.factory = None
+        super().start()
+
+    def stop(self):
+        """Дописать накопленные записи и остановить поток слушателя."""
+        if self._thread is not None:
+            super().stop()
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON."""
+
+    def format(self, record):
+        """Сериализовать запись в JSON."""
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def gzip_rotator(source, destination):
+    """Сжать файл лога при ротации."""
+    with open(source, 'rb') as log, gzip.open(destination, 'wb') as packed:
+        shutil.copyfileobj(log, packed)
+    os.remove(source)
+
+
+def gzip_namer(name):
+    """Имя сжатой копии файла лога."""
+    return name + '.gz'
+
+
+def file_handler(path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                 when=None):
+    """Файловый обработчик с ротацией по размеру или по времени и сжатием."""
+    if when:
+        handler = TimedRotatingFileHandler(
+            path, when=when, backupCount=backups, encoding='utf-8'
+        )
+    else:
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+        )
+    handler.rotator = gzip_rotator
+    handler.namer = gzip_namer
+    return handler
+
+
+def shard_path(path, node):
+    """Файл лога процесса-шарда рядом с общим файлом."""
+    root, extension = os.path.splitext(path)
+    return f'{root}.shard-{node}{extension}'
+
+
+def configure(logger, log_format, path=None, level=logging.INFO,
+              json_lines=False, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+              when=None):
+    """Подключить к logger очередь; запись в файл и поток ведёт слушатель.
+
+    Возвращает QueueListener; он запускается с первой записью
+    и останавливается при выходе из процесса, дописав все накопленные
+    записи. Повторный вызов для того же logger перенастраивает уже
+    подключённый слушатель (например, на другой файл).
+    """
+    def handlers():
+        formatter = JsonFormatter() if json_lines else logging.Formatter(
+            log_format
+        )
+        created = [logging.StreamHandler()]
+        if path:
+            created.append(file_handler(path, max_bytes, backups, when))
+        for handler in created:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+        return created
+
+    logger.setLevel(level)
+    for handler in logger.handlers:
+        if isinstance(handler, DeferredQueueHandler) and handler.listener:
+            handler.listener.reopen(handlers)
+            return handler.listener
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    listener = BackgroundListener(
+        log_queue, respect_handler_level=True, factory=handlers
+    )
+    logger.addHandler(DeferredQueueHandler(log_queue, listener))
+    atexit.register(listener.stop)
+    return listener
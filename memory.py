@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import tracemalloc
+
+from homework import HEAP_DUMP_DIR, MEMORY_INTERVAL, logger
+from metrics import REGISTRY
+
+MEMORY_TOP = 10
+MEMORY_FRAMES = 5
+# Собственные аллокации трассировки и импорта только зашумляют отчёт.
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                 '<frozen importlib._bootstrap_external>', '<unknown>')
+
+MEMORY_REPORT = ('Память: отслеживается {traced:.1f} МиБ ({change:+.1f} '
+                 'за {seconds:.0f} с и {polls} опросов), RSS {rss:.1f} МиБ')
+GROWTH_SITE = 'Рост памяти: {site} {size:+.1f} КиБ, {count:+d} блоков'
+HEAP_DUMPED = 'Снимок кучи сохранён в {path}'
+TRACING_STARTED = 'Трассировка памяти включена ({frames} кадров стека)'
+NO_GROWTH = 'роста памяти нет'
+
+TRACED = REGISTRY.gauge(
+    'homework_memory_traced_bytes', 'Память, отслеживаемая tracemalloc'
+)
+RSS = REGISTRY.gauge('homework_memory_rss_bytes', 'Резидентная память')
+GROWTH = REGISTRY.gauge(
+    'homework_memory_growth_bytes',
+    'Рост памяти между снимками по месту выделения', ['site']
+)
+
+
+def rss_bytes():
+    """Текущий RSS процесса из /proc; 0, если /proc недоступен."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return 0
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def site_name(statistic):
+    """Место выделения: файл и строка самого свежего кадра стека."""
+    frame = statistic.traceback[0]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+class MemoryTracker:
+    """Периодические снимки tracemalloc и отчёт о росте памяти.
+
+    check() сравнивает новый снимок с предыдущим и пишет в лог
+    и в метрики top мест, где память выросла сильнее всего. dump()
+    сохраняет полный снимок на диск для разбора вне процесса
+    (tracemalloc.Snapshot.load).
+    """
+
+    def __init__(self, interval=MEMORY_INTERVAL, top=MEMORY_TOP,
+                 frames=MEMORY_FRAMES, dump_dir=HEAP_DUMP_DIR,
+                 clock=time.monotonic):
+        """Сравнивать снимки не чаще раза в interval секунд."""
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.dump_dir = dump_dir
+        self.clock = clock
+        self.previous = None
+        self.previous_at = None
+        self.previous_traced = 0
+        self.previous_polls = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Включить трассировку и сделать исходный снимок."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info(TRACING_STARTED.format(frames=self.frames))
+        with self._lock:
+            self.previous = self.snapshot()
+            self.previous_at = self.clock()
+            self.previous_traced = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def snapshot(self):
+        """Снимок tracemalloc без служебных аллокаций."""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, filename) for filename in IGNORED_FILES
+        ])
+
+    def check(self, polls=0):
+        """Сравнить с предыдущим снимком; вернуть top растущих мест."""
+        if not tracemalloc.is_tracing():
+            self.start()
+        with self._lock:
+            current = self.snapshot()
+            now = self.clock()
+            growth = [
+                statistic for statistic in current.compare_to(
+                    self.previous, 'lineno'
+                )[:self.top]
+                if statistic.size_diff > 0
+            ]
+            traced = tracemalloc.get_traced_memory()[0]
+            change = traced - self.previous_traced
+            seconds = now - self.previous_at
+            cycles = polls - self.previous_polls
+            self.previous, self.previous_at = current, now
+            self.previous_traced, self.previous_polls = traced, polls
+        rss = rss_bytes()
+        TRACED.set(traced)
+        RSS.set(rss)
+        GROWTH.clear()
+        for statistic in growth:
+            GROWTH.set(statistic.size_diff, site=site_name(statistic))
+        logger.info(MEMORY_REPORT.format(
+            traced=traced / 2 ** 20,
+            change=change / 2 ** 20,
+            seconds=seconds, polls=cycles, rss=rss / 2 ** 20,
+        ))
+        for statistic in growth:
+            logger.info(GROWTH_SITE.format(
+                site=site_name(statistic), size=statistic.size_diff / 1024,
+                count=statistic.count_diff,
+            ))
+        return growth
+
+    def report(self, polls=0):
+        """Текстовый отчёт check() для управляющего сокета."""
+        return '; '.join(
+            GROWTH_SITE.format(
+                site=site_name(statistic), size=statistic.size_diff / 1024,
+                count=statistic.count_diff,
+            )
+            for statistic in self.check(polls)
+        ) or NO_GROWTH
+
+    def dump(self):
+        """Сохранить снимок кучи в dump_dir и вернуть путь к файлу."""
+        if not tracemalloc.is_tracing():
+            self.start()
+        path = os.path.join(
+            self.dump_dir,
+            f'heap-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.tracemalloc'
+        )
+        self.snapshot().dump(path)
+        logger.info(HEAP_DUMPED.format(path=path))
+        return path
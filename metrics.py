@@ -0,0 +1,301 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Общая часть метрик: имя, описание и значения по набору меток."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Метрика name с описанием и списком меток."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def value(self, **labels):
+        """Текущее значение для набора меток (для тестов и отладки)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """Строки экспозиции без заголовков HELP/TYPE."""
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+            for key, value in values
+        ]
+
+    def render(self):
+        """Метрика в текстовом формате Prometheus."""
+        return '\n'.join([
+            f'# HELP {self.name} {_escape(self.documentation)}',
+            f'# TYPE {self.name} {self.kind}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличить счётчик."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Значение, которое может расти и убывать."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Значение задаётся напрямую или функцией set_function."""
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        """Установить значение."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        """Изменить значение на amount."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def clear(self):
+        """Удалить все значения: для меток, набор которых меняется."""
+        with self._lock:
+            self._values.clear()
+
+    def set_function(self, function):
+        """Вычислять значение при каждом чтении (например, длину очереди)."""
+        self._function = function
+
+    def samples(self):
+        """Строки экспозиции; для set_function - одно текущее значение."""
+        if self._function is not None:
+            return [f'{self.name} {_number(self._function())}']
+        return super().samples()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам, сумма и количество."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Гистограмма с верхними границами корзин buckets."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        """Учесть одно наблюдение."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * len(self.buckets), 0.0)
+            )
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def value(self, **labels):
+        """Число наблюдений для набора меток."""
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0))
+        return sum(counts)
+
+    def samples(self):
+        """Накопительные корзины, _sum и _count для каждого набора меток."""
+        with self._lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _labels(
+                    self.labelnames, key, [('le', _number(bound))]
+                )
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых одним эндпоинтом."""
+
+    def __init__(self):
+        """Пустой реестр метрик."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        """Зарегистрировать (или получить уже существующий) счётчик."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Зарегистрировать (или получить уже существующий) gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        """Зарегистрировать (или получить уже существующую) гистограмму."""
+        return self._register(
+            Histogram(name, documentation, labelnames, buckets)
+        )
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'homework_stage_seconds', 'Длительность стадий опроса',
+    ['stage', 'outcome']
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'homework_stage_errors_total', 'Исключения по стадиям опроса',
+    ['stage', 'exception']
+)
+
+
+@contextmanager
+def stage(name):
+    """Измерить стадию опроса: время и исход (ok или имя исключения)."""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception as error:
+        outcome = type(error).__name__
+        STAGE_ERRORS.inc(stage=name, exception=outcome)
+        raise
+    finally:
+        STAGE_SECONDS.observe(
+            time.perf_counter() - started, stage=name, outcome=outcome
+        )
+
+
+class StageTimer:
+    """Время стадий, которые чередуются (потоковый разбор ответа).
+
+    Время каждой стадии набирается по частям, а в STAGE_SECONDS
+    попадает одним наблюдением за цикл в observe(), как и у stage().
+    """
+
+    def __init__(self):
+        """Ни одна стадия ещё не начиналась."""
+        self.seconds = {}
+        self.outcomes = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Добавить время блока к стадии name."""
+        started = time.perf_counter()
+        self.seconds.setdefault(name, 0.0)
+        try:
+            yield
+        except Exception as error:
+            outcome = self.outcomes[name] = type(error).__name__
+            STAGE_ERRORS.inc(stage=name, exception=outcome)
+            raise
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def observe(self):
+        """Записать набранное время стадий."""
+        for name, seconds in self.seconds.items():
+            STAGE_SECONDS.observe(
+                seconds, stage=name, outcome=self.outcomes.get(name, 'ok')
+            )
+
+
+def metrics_handler(registry=REGISTRY):
+    """Обработчик GET /metrics для реестра registry.
+
+    http.server тянет за собой email и прочее, поэтому импортируется
+    только при включённом эндпоинте.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """GET /metrics - экспозиция реестра в формате Prometheus."""
+
+        def do_GET(self):
+            """Отдать метрики."""
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            """Запросы к метрикам не логируются."""
+
+    return MetricsHandler
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """Запустить эндпоинт метрик в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, port), metrics_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,192 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import random
+import threading
+import time
+import weakref
+
+from exceptions import DeadlineExceeded
+from homework import (CONNECT_TIMEOUT, HEDGE_REQUESTS, POLL_DEADLINE,
+                      POLL_WORKERS, READ_TIMEOUT, REQUEST_ATTEMPTS)
+from metrics import REGISTRY
+
+BACKOFF = 0.5
+MAX_BACKOFF = 10
+LATENCY_WINDOW = 500
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+
+DEADLINE_EXCEEDED = 'Истёк срок цикла опроса ({seconds} с) перед {stage}'
+
+RETRIES = REGISTRY.counter(
+    'homework_request_retries_total', 'Повторные запросы к API'
+)
+HEDGES = REGISTRY.counter(
+    'homework_hedged_requests_total',
+    'Дублирующие запросы к API по исходу', ['winner']
+)
+
+
+class Deadline:
+    """Срок одного цикла опроса, общий для всех его стадий."""
+
+    __slots__ = ('seconds', 'expires_at', 'clock', '__weakref__')
+
+    def __init__(self, seconds, clock=time.monotonic):
+        """Срок истекает через seconds секунд по clock."""
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def shorten(self, seconds):
+        """Истечь не позже чем через seconds секунд."""
+        self.expires_at = min(self.expires_at, self.clock() + seconds)
+
+    def remaining(self):
+        """Секунды до истечения срока (не меньше нуля)."""
+        return max(self.expires_at - self.clock(), 0)
+
+    def check(self, stage):
+        """Бросить DeadlineExceeded, если срок уже истёк."""
+        if self.clock() >= self.expires_at:
+            raise DeadlineExceeded(DEADLINE_EXCEEDED.format(
+                seconds=self.seconds, stage=stage
+            ))
+
+    def timeout(self, connect, read):
+        """Тайм-ауты запроса, урезанные до оставшегося срока."""
+        self.check('запросом к API')
+        remaining = self.remaining()
+        return min(connect, remaining), min(read, remaining)
+
+
+def retryable(error):
+    """Имеет ли смысл повторять запрос после этой ошибки.
+
+    Решает код ответа, а не тело: 5xx с JSON-ошибкой в теле
+    (ServerResponseError) повторяется так же, как без неё.
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, ConnectionError)
+
+
+class RequestPolicy:
+    """Тайм-ауты, повторы и хеджирование запросов к API.
+
+    Запрос повторяется до attempts раз с экспоненциальной задержкой,
+    пока хватает срока цикла. С hedge=True, если ответ не пришёл
+    за p95 последних запросов, параллельно отправляется второй,
+    и берётся тот, что ответит первым.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, deadline=POLL_DEADLINE,
+                 attempts=REQUEST_ATTEMPTS, backoff=BACKOFF,
+                 max_backoff=MAX_BACKOFF, hedge=HEDGE_REQUESTS,
+                 hedge_workers=2 * POLL_WORKERS, clock=time.monotonic,
+                 sleep=time.sleep, rand=random.random):
+        """Тайм-ауты, срок цикла, число попыток и хеджирование."""
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline_seconds = deadline
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.rand = rand
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._deadlines = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._hedges = (
+            ThreadPoolExecutor(hedge_workers, thread_name_prefix='hedge')
+            if hedge else None
+        )
+
+    def deadline(self):
+        """Срок для нового цикла опроса."""
+        deadline = Deadline(self.deadline_seconds, self.clock)
+        with self._lock:
+            self._deadlines.add(deadline)
+        return deadline
+
+    def expire(self, seconds):
+        """Урезать сроки текущих циклов до seconds (при остановке).
+
+        Повторы и следующие стадии опроса после этого не начинаются,
+        если не укладываются в оставшееся время.
+        """
+        with self._lock:
+            for deadline in self._deadlines:
+                deadline.shorten(seconds)
+
+    def hedge_delay(self):
+        """Через сколько секунд отправлять дублирующий запрос.
+
+        None - пока не набралось HEDGE_MIN_SAMPLES замеров.
+        """
+        latencies = sorted(self.latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(
+            len(latencies) * HEDGE_PERCENTILE // 100, len(latencies) - 1
+        )
+        return max(latencies[index], HEDGE_MIN_DELAY)
+
+    def call(self, function, deadline, *args, hedge=True):
+        """function(*args, timeout=...) с повторами в пределах deadline."""
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(function, deadline, args, hedge)
+            except Exception as error:
+                attempt += 1
+                if attempt >= self.attempts or not retryable(error):
+                    raise
+                delay = min(
+                    self.backoff * 2 ** (attempt - 1), self.max_backoff
+                ) * (0.5 + self.rand() / 2)
+                if delay >= deadline.remaining():
+                    raise
+                RETRIES.inc()
+                self.sleep(delay)
+
+    def _timed(self, function, deadline, args):
+        started = self.clock()
+        result = function(*args, timeout=deadline.timeout(
+            self.connect_timeout, self.read_timeout
+        ))
+        self.latencies.append(self.clock() - started)
+        return result
+
+    def _attempt(self, function, deadline, args, hedge):
+        delay = self.hedge_delay() if hedge and self._hedges else None
+        if delay is None:
+            return self._timed(function, deadline, args)
+        first = self._hedges.submit(self._timed, function, deadline, args)
+        done, _ = wait([first], min(delay, deadline.remaining()))
+        if done:
+            return first.result()
+        second = self._hedges.submit(self._timed, function, deadline, args)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(
+                pending, deadline.remaining(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                deadline.check('ответом API')
+            for future in done:
+                if future.exception() is None:
+                    HEDGES.inc(winner='hedge' if future is second else 'first')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self):
+        """Остановить пул дублирующих запросов."""
+        if self._hedges:
+            self._hedges.shutdown(wait=False)
@@ -0,0 +1,168 @@
+from collections import Counter
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+
+from homework import PROFILE_DIR, logger
+
+PROFILE_POLLS = 100
+SAMPLE_INTERVAL = 0.005
+PSTATS = 'pstats'
+COLLAPSED = 'collapsed'
+FORMATS = (PSTATS, COLLAPSED)
+
+PROFILE_STARTED = ('Профилирование следующих {polls} опросов ({kind}), '
+                   'результат: {path}')
+PROFILE_SAVED = 'Профиль {polls} опросов сохранён в {path}'
+PROFILE_FAILED = 'Не удалось сохранить профиль в {path}: {error}'
+PROFILE_BUSY = 'профилирование уже идёт: {path}'
+UNKNOWN_FORMAT = 'неизвестный формат профиля {kind}, возможны: {formats}'
+
+
+def frame_name(code):
+    """Кадр в формате collapsed stacks: файл:функция."""
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class PollProfiler:
+    """Профилировщик следующих N опросов, включаемый по команде.
+
+    Пока он выключен, call() стоит одну проверку флага. В формате
+    pstats каждый опрос выполняется под своим cProfile, и профили
+    складываются; в формате collapsed фоновый поток раз в interval
+    секунд снимает стеки потоков, занятых опросом, и результат готов
+    для flamegraph.pl или speedscope.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        """Профили сохраняются в directory, стеки - раз в interval с."""
+        self.directory = directory
+        self.interval = interval
+        self.active = False
+        self.path = None
+        self._lock = threading.Lock()
+
+    def start(self, polls=PROFILE_POLLS, kind=COLLAPSED):
+        """Профилировать следующие polls опросов; вернуть путь к файлу.
+
+        kind - формат результата: collapsed или pstats.
+        """
+        polls, kind = max(int(polls), 1), kind.lower()
+        if kind not in FORMATS:
+            raise ValueError(UNKNOWN_FORMAT.format(
+                kind=kind, formats=', '.join(FORMATS)
+            ))
+        with self._lock:
+            if self.active:
+                return PROFILE_BUSY.format(path=self.path)
+            self.kind = kind
+            self.polls = polls
+            self.remaining = polls
+            self.running = 0
+            self.stats = pstats.Stats()
+            self.stacks = Counter()
+            self.threads = set()
+            self.path = os.path.join(self.directory, 'profile-{}-{}.{}'.format(
+                os.getpid(), time.strftime('%Y%m%d-%H%M%S'), kind
+            ))
+            self.active = True
+            if kind == COLLAPSED:
+                self._done = threading.Event()
+                self._sampler = threading.Thread(
+                    target=self._sample, daemon=True
+                )
+                self._sampler.start()
+        logger.info(PROFILE_STARTED.format(
+            polls=polls, kind=kind, path=self.path
+        ))
+        return self.path
+
+    def call(self, function, *args):
+        """Выполнить опрос, профилируя его, если профилировщик включён."""
+        if not self.active:
+            return function(*args)
+        return self._profiled(function, args)
+
+    def _profiled(self, function, args):
+        with self._lock:
+            profiled = self.active and self.remaining > 0
+            if profiled:
+                self.remaining -= 1
+                self.running += 1
+                if self.kind == COLLAPSED:
+                    self.threads.add(threading.get_ident())
+        if not profiled:
+            return function(*args)
+        try:
+            if self.kind == PSTATS:
+                return self._run_cprofile(function, args)
+            return function(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.threads.discard(threading.get_ident())
+                finished = not self.remaining and not self.running
+            if finished:
+                self._finish()
+
+    def _run_cprofile(self, function, args):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Начиная с Python 3.12 одновременно может работать только
+            # один cProfile: параллельный опрос идёт без профиля.
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self.stats.add(profile)
+
+    def _sample(self):
+        """Снимать стеки потоков, которые сейчас выполняют опрос."""
+        stop = self._profiled.__code__
+        while not self._done.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self.threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and frame.f_code is not stop:
+                    stack.append(frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    with self._lock:
+                        self.stacks[';'.join(reversed(stack))] += 1
+
+    def _finish(self):
+        """Записать результат и выключить профилировщик.
+
+        Вызывается ровно один раз - последним завершившимся опросом.
+        Ошибка записи (например, PROFILE_DIR недоступен) только
+        логируется: она не должна ломать опрос и следующие запуски.
+        """
+        try:
+            if self.kind == COLLAPSED:
+                self._done.set()
+                self._sampler.join()
+                with open(self.path, 'w', encoding='utf-8') as output:
+                    for stack, count in self.stacks.most_common():
+                        output.write(f'{stack} {count}\n')
+            else:
+                self.stats.dump_stats(self.path)
+        except Exception as error:
+            logger.exception(PROFILE_FAILED.format(
+                path=self.path, error=error
+            ))
+        else:
+            logger.info(PROFILE_SAVED.format(
+                polls=self.polls, path=self.path
+            ))
+        finally:
+            self.active = False
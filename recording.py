@@ -0,0 +1,311 @@
+from collections import defaultdict, deque
+import gzip
+import hashlib
+from http import HTTPStatus
+import json
+import threading
+import time
+
+from homework import requests, telegram
+
+PSEUDONYM = 'rec-{digest}'
+PSEUDONYM_PREFIX = 'rec-'
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+CHUNK_SIZE = 16 * 1024
+
+REPLAYED_ERROR = 'Записанная ошибка запроса: {error}'
+
+
+def pseudonym(token):
+    """Стабильная замена токена: одинаковая для записи и воспроизведения."""
+    if str(token).startswith(PSEUDONYM_PREFIX):
+        return token
+    digest = hashlib.sha256(str(token).encode()).hexdigest()[:12]
+    return PSEUDONYM.format(digest=digest)
+
+
+def token_from_headers(headers):
+    """Токен из заголовка Authorization вида 'OAuth <token>'."""
+    return (headers or {}).get('Authorization', '').rpartition(' ')[2]
+
+
+def open_log(path, mode):
+    """Открыть журнал трафика; файлы *.gz сжимаются."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TrafficRecorder:
+    """Журнал запросов к API и Telegram в формате JSON lines.
+
+    Каждая строка - одна запись с полем kind (accounts, api, telegram)
+    и t - секунды от начала записи. Токены заменяются псевдонимами,
+    поэтому журнал можно передавать без доступа к аккаунтам.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        """Дописывать журнал в path (.gz - со сжатием)."""
+        self.path = path
+        self.clock = clock
+        self.started = clock()
+        self._file = open_log(path, 'a')
+        self._lock = threading.Lock()
+
+    def write(self, kind, **fields):
+        """Добавить запись в журнал."""
+        line = json.dumps(
+            {'kind': kind, **fields}, ensure_ascii=False,
+            separators=(',', ':')
+        )
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def accounts(self, accounts):
+        """Записать аккаунты: по ним воспроизведение строит свои."""
+        self.write('accounts', accounts=[
+            [pseudonym(account.token), account.chat_id,
+             list(account.recipients)]
+            for account in accounts
+        ])
+
+    def offset(self):
+        """Секунды от начала записи."""
+        return round(self.clock() - self.started, 4)
+
+    def close(self):
+        """Дописать буфер и закрыть файл."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingClient:
+    """Клиент API, который пишет каждый запрос и ответ в журнал.
+
+    Тело ответа читается целиком даже при stream=True: запись нужна
+    для диагностики и сама по себе не должна влиять на результат.
+    """
+
+    def __init__(self, client, recorder):
+        """Запросы client записываются в recorder."""
+        self.client = client
+        self.recorder = recorder
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """GET через исходный клиент с записью в журнал."""
+        record = {
+            't': self.recorder.offset(),
+            'url': url,
+            'token': pseudonym(token_from_headers(headers)),
+            'params': params or {},
+        }
+        started = self.recorder.clock()
+        try:
+            response = self.client.get(
+                url, headers=headers, params=params, **kwargs
+            )
+            content = response.content
+        except requests.exceptions.RequestException as error:
+            self.recorder.write(
+                'api', **record, error=type(error).__name__,
+                elapsed=round(self.recorder.clock() - started, 4)
+            )
+            raise
+        record.update(
+            status=response.status_code,
+            elapsed=round(self.recorder.clock() - started, 4),
+            headers={
+                key: response.headers[key] for key in RECORDED_HEADERS
+                if key in response.headers
+            },
+        )
+        try:
+            record['json'] = json.loads(content) if content else None
+        except ValueError:
+            record['text'] = content.decode('utf-8', 'replace')
+        self.recorder.write('api', **record)
+        return response
+
+    def close(self):
+        """Закрыть исходный клиент."""
+        close = getattr(self.client, 'close', None)
+        if close:
+            close()
+
+
+class RecordingBot:
+    """Бот, который пишет в журнал каждую отправку и её исход."""
+
+    def __init__(self, bot, recorder):
+        """Отправки bot записываются в recorder."""
+        self.bot = bot
+        self.recorder = recorder
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """send_message исходного бота с записью в журнал."""
+        record = {
+            't': self.recorder.offset(),
+            'chat_id': chat_id,
+            'length': len(text or ''),
+        }
+        started = self.recorder.clock()
+        try:
+            return self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except telegram.error.RetryAfter as error:
+            record.update(error='RetryAfter', retry_after=error.retry_after)
+            raise
+        except telegram.error.TelegramError as error:
+            record['error'] = type(error).__name__
+            raise
+        finally:
+            record['elapsed'] = round(self.recorder.clock() - started, 4)
+            self.recorder.write('telegram', **record)
+
+
+def load_traffic(path):
+    """Записи журнала, сгруппированные по kind."""
+    traffic = defaultdict(list)
+    with open_log(path, 'r') as log:
+        for line in log:
+            if line.strip():
+                record = json.loads(line)
+                traffic[record.pop('kind')].append(record)
+    return traffic
+
+
+def recorded_accounts(traffic):
+    """Аккаунты из журнала: псевдоним токена и чат."""
+    from engine import Account
+    accounts = {}
+    for record in traffic['accounts']:
+        for token, chat_id, *recipients in record['accounts']:
+            accounts[token] = Account(
+                token, chat_id, tuple(recipients[0]) if recipients else ()
+            )
+    return list(accounts.values())
+
+
+class ReplayResponse:
+    """Ответ из журнала с интерфейсом requests.Response."""
+
+    def __init__(self, record):
+        """Ответ из записи журнала record."""
+        self.status_code = record.get('status', HTTPStatus.NOT_MODIFIED)
+        self.headers = record.get('headers', {})
+        if 'json' in record:
+            self.content = json.dumps(record['json']).encode()
+        else:
+            self.content = record.get('text', '').encode()
+
+    def json(self):
+        """Тело ответа как JSON."""
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        """Тело ответа кусками, как при stream=True."""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """Соединения нет - закрывать нечего."""
+
+
+class ReplayClient:
+    """Клиент API, который отвечает записанным трафиком без сети.
+
+    Ответы каждого токена отдаются по порядку, но не раньше, чем они
+    случились при записи: ответ с отметкой t доступен через
+    (t - first) / speed секунд после первого запроса, где first -
+    отметка первого записанного запроса. Пока следующий ответ не наступил,
+    клиент отвечает 304 Not Modified. Задержка ответа тоже делится
+    на speed.
+    """
+
+    def __init__(self, traffic, speed=1.0, clock=time.monotonic,
+                 sleep=time.sleep):
+        """Записи API из traffic, ускоренные в speed раз."""
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.started = None
+        self.served = 0
+        self._queues = defaultdict(deque)
+        records = sorted(traffic['api'], key=lambda item: item['t'])
+        self.first = records[0]['t'] if records else 0
+        for record in records:
+            self._queues[record['token']].append(record)
+        self._lock = threading.Lock()
+
+    def _next(self, token):
+        with self._lock:
+            now = self.clock()
+            if self.started is None:
+                self.started = now
+            queue = self._queues.get(token)
+            if not queue or (
+                queue[0]['t'] - self.first
+            ) / self.speed > now - self.started:
+                return None
+            self.served += 1
+            return queue.popleft()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """Следующий наступивший ответ для токена из заголовков."""
+        record = self._next(pseudonym(token_from_headers(headers)))
+        if record is None:
+            return ReplayResponse({})
+        self.sleep(record['elapsed'] / self.speed)
+        if 'error' in record:
+            raise requests.exceptions.ConnectionError(
+                REPLAYED_ERROR.format(error=record['error'])
+            )
+        return ReplayResponse(record)
+
+    def remaining(self):
+        """Сколько записанных ответов ещё не отдано."""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def close(self):
+        """Совместимость с HTTPClient."""
+
+
+class ReplayBot:
+    """Бот без сети: повторяет задержки и ошибки записанных отправок.
+
+    Когда записанные отправки заканчиваются, по кругу повторяются
+    только успешные, чтобы ошибки записи не размножались.
+    """
+
+    def __init__(self, traffic, speed=1.0, sleep=time.sleep):
+        """Записи Telegram из traffic, ускоренные в speed раз."""
+        self.records = traffic['telegram']
+        self.successes = [
+            record for record in self.records if not record.get('error')
+        ] or [{'elapsed': 0}]
+        self.speed = speed
+        self.sleep = sleep
+        self.sent = 0
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Подождать и ответить так же, как Telegram при записи."""
+        with self._lock:
+            if self._index < len(self.records):
+                record = self.records[self._index]
+            else:
+                record = self.successes[self._index % len(self.successes)]
+            self._index += 1
+        self.sleep(record['elapsed'] / self.speed)
+        error = record.get('error')
+        if error == 'RetryAfter':
+            raise telegram.error.RetryAfter(record['retry_after'])
+        if error == 'TimedOut':
+            raise telegram.error.TimedOut()
+        if error:
+            raise getattr(
+                telegram.error, error, telegram.error.TelegramError
+            )(error)
+        with self._lock:
+            self.sent += 1
@@ -0,0 +1,80 @@
+import heapq
+from itertools import count
+import random
+
+from homework import RETRY_TIME
+
+STATUS_FACTORS = {
+    'reviewing': 0.1,
+    'rejected': 0.5,
+    'approved': 1,
+}
+RECENT_ACTIVITY = 60 * 60
+RECENT_FACTOR = 0.25
+IDLE_AFTER = 7 * 24 * 60 * 60
+IDLE_FACTOR = 6
+MAX_FACTOR = 12
+# Дальше 2 ** errors всё равно упирается в MAX_FACTOR, а с дробным
+# множителем статуса при errors > 1023 float переполняется.
+MAX_ERROR_EXPONENT = 16
+JITTER = 0.1
+
+
+def next_interval(state, now, base=RETRY_TIME, rand=random.random):
+    """Интервал до следующего опроса аккаунта.
+
+    Зависит от последнего статуса (HOMEWORK_VERDICTS), давности
+    последних изменений и числа ошибок подряд; +-JITTER случайного
+    разброса не даёт тысячам аккаунтов опрашиваться синхронно.
+    """
+    interval = base * STATUS_FACTORS.get(state.status, 1)
+    if state.active_at is not None:
+        idle = now - state.active_at
+        if idle < RECENT_ACTIVITY:
+            interval = min(interval, base * RECENT_FACTOR)
+        elif idle > IDLE_AFTER:
+            interval = max(interval, base * IDLE_FACTOR)
+    if state.errors:
+        interval = min(
+            interval * 2 ** min(state.errors, MAX_ERROR_EXPONENT),
+            base * MAX_FACTOR
+        )
+    return interval * (1 + JITTER * (2 * rand() - 1))
+
+
+class PollScheduler:
+    """Очередь аккаунтов с приоритетом по времени следующего опроса."""
+
+    def __init__(self):
+        """Пустая очередь."""
+        self._heap = []
+        self._order = count()
+
+    def __len__(self):
+        """Число аккаунтов в очереди."""
+        return len(self._heap)
+
+    def schedule(self, account, due):
+        """Поставить аккаунт в очередь на момент due."""
+        heapq.heappush(self._heap, (due, next(self._order), account))
+
+    def advance(self, due):
+        """Перенести все аккаунты очереди на момент due, если он раньше."""
+        self._heap = [
+            (min(when, due), order, account)
+            for when, order, account in self._heap
+        ]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now):
+        """Извлечь все аккаунты, время опроса которых наступило."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def delay(self, now):
+        """Секунды до ближайшего опроса или None, если очередь пуста."""
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - now, 0)
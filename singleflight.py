@@ -0,0 +1,88 @@
+from collections import deque
+import threading
+import time
+
+from metrics import REGISTRY
+
+SHARE_WINDOW = 5
+
+COALESCED = REGISTRY.counter(
+    'homework_coalesced_requests_total',
+    'Запросы к API, получившие результат уже выполненного запроса'
+)
+
+
+class Flight:
+    """Один запрос и его результат, общий для всех ожидающих."""
+
+    __slots__ = ('done', 'result', 'error', 'finished_at', 'callers')
+
+    def __init__(self, caller):
+        """Запрос, начатый потоком caller."""
+        self.done = threading.Event()
+        self.callers = {caller}
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """Объединение одинаковых запросов из разных потоков.
+
+    Вызовы do() с одним ключом, пока запрос выполняется, ждут его
+    результата, а не повторяют запрос. Результат (или исключение)
+    отдаётся и тем, кто пришёл в течение linger секунд после
+    завершения: так чаты одного токена, опрошенные почти одновременно,
+    обходятся одним запросом. Повторный вызов от того же caller
+    всегда выполняет новый запрос.
+    """
+
+    def __init__(self, linger=SHARE_WINDOW, clock=time.monotonic):
+        """Результат доступен ещё linger секунд после запроса."""
+        self.linger = linger
+        self.clock = clock
+        self._flights = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def _expired(self, flight, now):
+        return (flight.finished_at is not None
+                and now - flight.finished_at > self.linger)
+
+    def _forget_expired(self, now):
+        while self._finished and self._expired(self._finished[0][1], now):
+            key, flight = self._finished.popleft()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key, caller, function, *args, **kwargs):
+        """Результат function(*args, **kwargs), общий для ключа key."""
+        with self._lock:
+            now = self.clock()
+            self._forget_expired(now)
+            flight = self._flights.get(key)
+            leader = (flight is None or caller in flight.callers
+                      or self._expired(flight, now))
+            if leader:
+                flight = self._flights[key] = Flight(caller)
+            else:
+                flight.callers.add(caller)
+        if leader:
+            try:
+                flight.result = function(*args, **kwargs)
+            except Exception as error:
+                flight.error = error
+            with self._lock:
+                flight.finished_at = self.clock()
+                self._finished.append((key, flight))
+            flight.done.set()
+        else:
+            COALESCED.inc()
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def __len__(self):
+        """Число запомненных запросов."""
+        return len(self._flights)
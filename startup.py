@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+
+from metrics import REGISTRY
+
+IMPORTED = time.perf_counter()
+
+TIMINGS_REPORT = 'Время запуска: {timings}'
+TIMING = '{component} {seconds:.3f} с'
+BACKGROUND = '{name} (в фоне)'
+
+TIMINGS = {}
+_lock = threading.Lock()
+
+STARTUP_SECONDS = REGISTRY.gauge(
+    'homework_startup_seconds',
+    'Длительность этапов запуска и время до первого опроса',
+    ['component']
+)
+
+
+def process_age():
+    """Секунды с запуска процесса; без /proc - с импорта этого модуля."""
+    try:
+        with open('/proc/self/stat') as stat:
+            fields = stat.read().rpartition(')')[2].split()
+        with open('/proc/uptime') as uptime:
+            up = float(uptime.read().split()[0])
+        return up - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.perf_counter() - IMPORTED
+
+
+def record(component, seconds):
+    """Запомнить длительность этапа запуска."""
+    with _lock:
+        TIMINGS[component] = TIMINGS.get(component, 0) + seconds
+        STARTUP_SECONDS.set(TIMINGS[component], component=component)
+
+
+@contextmanager
+def timed(component):
+    """Измерить этап запуска (импорт или инициализацию компонента)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - started)
+
+
+def mark(event):
+    """Отметить первое наступление события, считая от запуска процесса."""
+    with _lock:
+        if event in TIMINGS:
+            return False
+        TIMINGS[event] = process_age()
+        STARTUP_SECONDS.set(TIMINGS[event], component=event)
+        return True
+
+
+def report():
+    """Сводка по этапам запуска в порядке их завершения."""
+    with _lock:
+        timings = list(TIMINGS.items())
+    return TIMINGS_REPORT.format(timings=', '.join(
+        TIMING.format(component=component, seconds=seconds)
+        for component, seconds in timings
+    ))
+
+
+def _import(name, component):
+    if name in sys.modules:
+        return sys.modules[name]
+    with timed(component):
+        return importlib.import_module(name)
+
+
+class LazyModule(types.ModuleType):
+    """Модуль, который импортируется при первом обращении к атрибуту."""
+
+    def __init__(self, name):
+        """Модуль name, который ещё не импортирован."""
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = _import(self.__name__, f'import {self.__name__}')
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attribute):
+        """Атрибут настоящего модуля."""
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        """Атрибут устанавливается в настоящем модуле."""
+        setattr(self._load(), attribute, value)
+
+
+def lazy_import(name):
+    """Отложенный импорт: модуль загрузится при первом использовании."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+class LazyObject:
+    """Объект, который создаётся factory при первом обращении к атрибуту."""
+
+    def __init__(self, factory, component):
+        """Объект создаётся factory; время пишется как component."""
+        self.__dict__['_factory'] = factory
+        self.__dict__['_component'] = component
+        self.__dict__['_object'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        if self._object is None:
+            with self._lock:
+                if self._object is None:
+                    with timed(self._component):
+                        self.__dict__['_object'] = self._factory()
+        return self._object
+
+    def __getattr__(self, attribute):
+        """Атрибут созданного объекта."""
+        return getattr(self._load(), attribute)
+
+
+def preload(*names):
+    """Импортировать модули в фоновом потоке, пока идёт первый опрос."""
+    def load():
+        for name in names:
+            _import(name, BACKGROUND.format(name=f'import {name}'))
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
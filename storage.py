@@ -0,0 +1,79 @@
+import hashlib
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS checkpoints (
+    account TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    status TEXT,
+    active_at REAL,
+    errors INTEGER NOT NULL DEFAULT 0,
+    notified TEXT
+) WITHOUT ROWID
+'''
+# Базы, созданные до появления notified.
+ADD_NOTIFIED = 'ALTER TABLE checkpoints ADD COLUMN notified TEXT'
+UPSERT = '''
+INSERT INTO checkpoints (account, timestamp, status, active_at, errors,
+                         notified)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(account) DO UPDATE SET
+    timestamp = excluded.timestamp,
+    status = excluded.status,
+    active_at = excluded.active_at,
+    errors = excluded.errors,
+    notified = excluded.notified
+'''
+SELECT_ALL = 'SELECT account, timestamp, status, active_at, errors, ' \
+             'notified FROM checkpoints'
+
+
+def account_key(account):
+    """Ключ аккаунта в хранилище: сам токен на диск не попадает."""
+    raw = f'{account.token}:{account.chat_id}'.encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+class CheckpointStore:
+    """SQLite-хранилище курсора from_date и отправленных статусов аккаунтов.
+
+    Записи накапливаются в памяти и сбрасываются одной транзакцией
+    (save), поэтому fsync выполняется раз на пакет, а не на опрос.
+    """
+
+    def __init__(self, path):
+        """Открыть базу path, создав или обновив таблицу."""
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(SCHEMA)
+        columns = {
+            row[1] for row in
+            self._connection.execute('PRAGMA table_info(checkpoints)')
+        }
+        if 'notified' not in columns:
+            self._connection.execute(ADD_NOTIFIED)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Все сохранённые состояния: {ключ: (timestamp, status, ...)}."""
+        with self._lock:
+            rows = self._connection.execute(SELECT_ALL).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def save(self, rows):
+        """Сохранить пакет строк одной транзакцией.
+
+        Строка: (ключ, timestamp, status, active_at, errors, notified).
+        """
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(UPSERT, rows)
+
+    def close(self):
+        """Закрыть соединение с базой."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,160 @@
+import codecs
+from http import HTTPStatus
+import json
+
+from homework import (ENDPOINT, HOMEWORKS_NO_LIST, NO_DICT, NO_HOMEWORKS,
+                      REQUEST_TIMEOUT, check_server_answer, decode_answer,
+                      open_api_answer)
+
+CHUNK_SIZE = 16 * 1024
+COMPACT_AT = 64 * 1024
+UNEXPECTED = 'Ожидался символ {expected!r} в позиции {pos}, получен {got!r}'
+TRUNCATED = 'Ответ API оборвался до окончания JSON'
+
+
+class JSONStream:
+    """Инкрементальный разбор JSON-объекта верхнего уровня.
+
+    Массив homeworks отдаётся по одному элементу, пока байты ещё
+    приходят; в памяти держится только неразобранный хвост буфера.
+    Остальные ключи верхнего уровня попадают в fields.
+    """
+
+    def __init__(self, chunks):
+        """Разбирать JSON из кусков байтов chunks."""
+        self.fields = {}
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Дочитать следующий кусок; False - данных больше нет."""
+        if self._eof:
+            return False
+        if self._pos > COMPACT_AT:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._text.decode(b'', final=True)
+        else:
+            self._buffer += self._text.decode(chunk)
+        return True
+
+    def _peek(self):
+        """Следующий значимый символ (пробелы пропускаются)."""
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in ' \t\r\n'):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                raise json.JSONDecodeError(TRUNCATED, self._buffer, self._pos)
+
+    def _expect(self, *expected):
+        char = self._peek()
+        if char not in expected:
+            raise json.JSONDecodeError(UNEXPECTED.format(
+                expected=''.join(expected), pos=self._pos, got=char
+            ), self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Разобрать одно значение, дочитывая данные при необходимости."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # Число в конце буфера могло прийти не полностью.
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def _items(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',', ']') == ']':
+                return
+
+    def __iter__(self):
+        """Элементы homeworks по мере поступления данных."""
+        if self._peek() != '{':
+            raise TypeError(NO_DICT.format(type(self._value())))
+        self._pos += 1
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'homeworks' and self._peek() == '[':
+                self.fields[key] = []
+                yield from self._items()
+            else:
+                self.fields[key] = self._value()
+            if self._expect(',', '}') == '}':
+                return
+
+
+def stream_api_answer(client, token, current_timestamp, endpoint=ENDPOINT,
+                      timeout=REQUEST_TIMEOUT):
+    """Потоковый вариант request_api_answer.
+
+    Возвращает None при ответе 304, иначе APIAnswerStream: итерация
+    по нему отдаёт домашние работы по одной, а после её окончания
+    ключи верхнего уровня проверяются так же, как в check_response.
+    """
+    homework_statuses, params_connection = open_api_answer(
+        client, token, current_timestamp, endpoint, timeout, stream=True
+    )
+    status_code = homework_statuses.status_code
+    if status_code == HTTPStatus.NOT_MODIFIED:
+        homework_statuses.close()
+        return None
+    if status_code != HTTPStatus.OK:
+        check_server_answer(
+            decode_answer(homework_statuses, params_connection),
+            status_code, params_connection
+        )
+    return APIAnswerStream(homework_statuses, params_connection)
+
+
+class APIAnswerStream(JSONStream):
+    """JSONStream, закрывающий ответ и проверяющий его после разбора."""
+
+    def __init__(self, homework_statuses, params_connection):
+        """Читать тело ответа homework_statuses по кускам."""
+        super().__init__(homework_statuses.iter_content(CHUNK_SIZE))
+        self._response = homework_statuses
+        self._params = params_connection
+
+    def __iter__(self):
+        """Элементы homeworks; в конце - проверки check_response."""
+        try:
+            yield from super().__iter__()
+        finally:
+            self._response.close()
+        check_server_answer(
+            self.fields, self._response.status_code, self._params
+        )
+        if 'homeworks' not in self.fields:
+            raise KeyError(NO_HOMEWORKS)
+        if not isinstance(self.fields['homeworks'], list):
+            raise TypeError(HOMEWORKS_NO_LIST.format(
+                type(self.fields['homeworks'])
+            ))
@@ -0,0 +1,309 @@
+from bisect import bisect
+from collections import defaultdict, deque
+import hashlib
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import signal
+import threading
+import time
+
+from engine import SHUTDOWN_BUDGET
+from homework import logger
+import logs
+from metrics import REGISTRY, start_http_server
+
+VIRTUAL_NODES = 64
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+MAX_RESTARTS = 5
+RESTART_WINDOW = 10 * 60
+# Шарду нужно до SHUTDOWN_BUDGET секунд, чтобы сохранить состояние
+# и дослать сообщения; SIGKILL раньше этого срока их бы потерял.
+STOP_TIMEOUT = SHUTDOWN_BUDGET + 5
+TICK = 1
+
+SHARD_STARTED = 'Запущен шард {node}: {count} аккаунтов, pid {pid}'
+SHARD_DIED = 'Шард {node} завершился с кодом {exitcode}'
+SHARD_RESTART = 'Перезапуск шарда {node} через {delay} с'
+SHARD_EXCLUDED = ('Шард {node} падает {count} раз за {window} с, '
+                  'его аккаунты переданы остальным шардам')
+SHARDS_REBALANCED = 'Аккаунты распределены по шардам: {sizes}'
+SHARDS_STOPPING = 'Остановка шардов'
+
+SHARD_RESTARTS = REGISTRY.counter(
+    'homework_shard_restarts_total', 'Перезапуски процессов-шардов',
+    ['shard']
+)
+SHARD_ACCOUNTS = REGISTRY.gauge(
+    'homework_shard_accounts', 'Аккаунты, закреплённые за шардом', ['shard']
+)
+
+
+def ring_hash(value):
+    """Позиция строки на кольце хешей."""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Кольцо согласованного хеширования с виртуальными узлами.
+
+    При добавлении или удалении узла переезжает только доля ключей
+    этого узла, а не весь набор.
+    """
+
+    def __init__(self, nodes, replicas=VIRTUAL_NODES):
+        """По replicas виртуальных узлов на каждый из nodes."""
+        points = sorted(
+            (ring_hash(f'{node}:{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect(self._hashes, ring_hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+def shard_accounts(accounts, nodes):
+    """Разбить аккаунты по узлам; чаты одного токена попадают в один шард."""
+    ring = HashRing(nodes)
+    shards = {node: [] for node in nodes}
+    for account in accounts:
+        shards[ring.node(str(account.token))].append(account)
+    return shards
+
+
+def shard_metrics_port(port, node):
+    """Порт метрик шарда: следующие за портом супервизора."""
+    return port + 1 + node
+
+
+def run_shard(accounts, node=0, command_accounts=None):
+    """Точка входа процесса-шарда: обычный цикл опроса своих аккаунтов.
+
+    Лог пишется в свой файл шарда, метрики отдаются на своём порту.
+    Обновления Telegram может получать только один процесс: команды
+    обслуживает шард, которому переданы command_accounts.
+    Управляющий сокет обслуживает супервизор.
+    """
+    from homework import (LOG_FILE, METRICS_PORT, configure_logs,
+                          run_engine)
+    configure_logs(logs.shard_path(LOG_FILE, node))
+    if METRICS_PORT:
+        start_http_server(shard_metrics_port(METRICS_PORT, node))
+    run_engine(
+        accounts, commands=command_accounts is not None,
+        control_socket=None, command_accounts=command_accounts
+    )
+
+
+class Supervisor:
+    """Процессы-шарды, каждый опрашивает свою долю аккаунтов.
+
+    Упавший шард перезапускается с растущей задержкой; если он падает
+    чаще max_restarts раз за window секунд, его аккаунты
+    перераспределяются между остальными шардами. Если включены
+    commands, команды всех аккаунтов обслуживает первый непустой шард.
+    """
+
+    def __init__(self, accounts, shards, target=run_shard, context=None,
+                 restart_delay=RESTART_DELAY, max_restarts=MAX_RESTARTS,
+                 window=RESTART_WINDOW, clock=time.monotonic,
+                 commands=False):
+        """Шарды для accounts; процессы запускаются в run()."""
+        self.accounts = list(accounts)
+        self.nodes = list(range(shards))
+        self.target = target
+        self.context = context or multiprocessing.get_context('spawn')
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.window = window
+        self.clock = clock
+        self.commands = commands
+        self.commands_node = None
+        self.workers = {}
+        self.assignment = {}
+        self.pending = {}
+        self.crashes = defaultdict(deque)
+        self._stopping = False
+        self._wakeup, self._notify = multiprocessing.Pipe(duplex=False)
+
+    def rebalance(self):
+        """Пересчитать шарды и перезапустить только изменившиеся."""
+        assignment = shard_accounts(self.accounts, self.nodes)
+        for node in set(self.assignment) - set(assignment):
+            self._stop_worker(node)
+            self.pending.pop(node, None)
+            SHARD_ACCOUNTS.set(0, shard=node)
+        previous = self.commands_node
+        self.commands_node = self._commands_node(assignment)
+        for node, accounts in assignment.items():
+            SHARD_ACCOUNTS.set(len(accounts), shard=node)
+            if accounts == self.assignment.get(node) and (
+                node in self.workers or node in self.pending
+            ) and (node == previous) == (node == self.commands_node):
+                continue
+            self._stop_worker(node)
+            self.pending.pop(node, None)
+            self.assignment[node] = accounts
+            self._start(node)
+        self.assignment = assignment
+        logger.info(SHARDS_REBALANCED.format(sizes={
+            node: len(accounts) for node, accounts in assignment.items()
+        }))
+
+    def _commands_node(self, assignment):
+        """Шард, который обслуживает команды: первый непустой."""
+        if not self.commands:
+            return None
+        return next((node for node in self.nodes if assignment[node]), None)
+
+    def resize(self, shards):
+        """Изменить число шардов."""
+        self.nodes = list(range(shards))
+        self.rebalance()
+
+    def _start(self, node):
+        accounts = self.assignment[node]
+        if not accounts:
+            return
+        command_accounts = (
+            self.accounts if node == self.commands_node else None
+        )
+        process = self.context.Process(
+            target=self.target, args=(accounts, node, command_accounts),
+            name=f'shard-{node}'
+        )
+        process.start()
+        self.workers[node] = process
+        logger.info(SHARD_STARTED.format(
+            node=node, count=len(accounts), pid=process.pid
+        ))
+
+    def _stop_worker(self, node):
+        process = self.workers.pop(node, None)
+        if process is not None:
+            self._terminate([process])
+
+    @staticmethod
+    def _terminate(processes):
+        """SIGTERM всем процессам, затем общий срок на мягкую остановку."""
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    def _crashed(self, node, exitcode):
+        """Запланировать перезапуск или исключить шард из кольца."""
+        logger.error(SHARD_DIED.format(node=node, exitcode=exitcode))
+        now = self.clock()
+        crashes = self.crashes[node]
+        crashes.append(now)
+        while now - crashes[0] > self.window:
+            crashes.popleft()
+        if len(crashes) > self.max_restarts and len(self.nodes) > 1:
+            logger.error(SHARD_EXCLUDED.format(
+                node=node, count=len(crashes), window=self.window
+            ))
+            self.nodes.remove(node)
+            self.rebalance()
+            return
+        delay = min(
+            self.restart_delay * 2 ** (len(crashes) - 1), MAX_RESTART_DELAY
+        )
+        logger.warning(SHARD_RESTART.format(node=node, delay=delay))
+        self.pending[node] = now + delay
+
+    def step(self):
+        """Обработать завершившиеся шарды и запустить те, кому пора.
+
+        Возвращает секунды до следующего запланированного перезапуска.
+        """
+        for node, process in list(self.workers.items()):
+            if not process.is_alive():
+                del self.workers[node]
+                if not self._stopping:
+                    self._crashed(node, process.exitcode)
+        now = self.clock()
+        for node, restart_at in list(self.pending.items()):
+            if restart_at <= now:
+                del self.pending[node]
+                SHARD_RESTARTS.inc(shard=node)
+                self._start(node)
+        if not self.pending:
+            return TICK
+        return max(min(self.pending.values()) - now, 0)
+
+    def run(self, control_socket=None):
+        """Запустить шарды и следить за ними до вызова stop().
+
+        SIGTERM и SIGINT останавливают шарды, SIGUSR1, SIGUSR2 и SIGPROF
+        передаются им как команды «опросить сейчас», «снимок кучи»
+        и «профилировать».
+        """
+        handlers = {
+            signal.SIGTERM: lambda *args: self.stop(),
+            signal.SIGINT: lambda *args: self.stop(),
+            signal.SIGUSR1: lambda *args: self.poll_now(),
+            signal.SIGUSR2: lambda *args: self.dump_heap(),
+            signal.SIGPROF: lambda *args: self.profile(),
+        }
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum, handler in handlers.items():
+                previous[signum] = signal.signal(signum, handler)
+        control = None
+        if control_socket:
+            from control import ControlServer
+            control = ControlServer(control_socket, {
+                'poll': self.poll_now, 'stop': self.stop,
+                'heap': self.dump_heap, 'profile': self.profile,
+            }).start()
+        self.rebalance()
+        try:
+            while not self._stopping:
+                delay = self.step()
+                wait([self._wakeup, *(
+                    process.sentinel for process in self.workers.values()
+                )], min(delay, TICK))
+        finally:
+            self._stopping = True
+            logger.info(SHARDS_STOPPING)
+            self._terminate(list(self.workers.values()))
+            self.workers.clear()
+            if control:
+                control.close()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _signal_workers(self, signum):
+        for process in self.workers.values():
+            if process.pid:
+                os.kill(process.pid, signum)
+
+    def poll_now(self):
+        """Передать всем шардам команду «опросить сейчас»."""
+        self._signal_workers(signal.SIGUSR1)
+
+    def dump_heap(self):
+        """Попросить каждый шард сохранить снимок своей кучи."""
+        self._signal_workers(signal.SIGUSR2)
+
+    def profile(self, *args):
+        """Включить в шардах профилирование по умолчанию (SIGPROF).
+
+        Число опросов и формат задаются только при работе без шардов.
+        """
+        self._signal_workers(signal.SIGPROF)
+
+    def stop(self):
+        """Остановить наблюдение и все шарды."""
+        self._stopping = True
+        self._notify.send_bytes(b'')
@@ -0,0 +1,81 @@
+import re
+import threading
+import time
+
+from homework import BOT_ERROR
+
+ERROR_WINDOW = 60 * 60
+ERROR_REPEATED = ('Проблема с ботом повторяется: {error} '
+                  '({count} раз с {since})')
+ERROR_RECOVERED = 'Работа бота восстановлена после ошибки: {error}'
+SINCE_FORMAT = '%d.%m.%Y %H:%M'
+
+NUMBERS = re.compile(r'\d+(\.\d+)?')
+
+
+def error_key(error):
+    """Тип исключения и текст без чисел (меток времени, кодов, портов)."""
+    return type(error).__name__, NUMBERS.sub('N', str(error))
+
+
+class Incident:
+    """Серия одинаковых ошибок в одной области (например, аккаунте).
+
+    Хранится текст ошибки, а не исключение: оно держало бы в памяти
+    traceback со всеми кадрами стека.
+    """
+
+    __slots__ = ('key', 'error', 'started_at', 'reported_at', 'count')
+
+    def __init__(self, key, error, now):
+        """Инцидент с первой ошибкой error в момент now."""
+        self.key = key
+        self.error = error
+        self.started_at = now
+        self.reported_at = now
+        self.count = 1
+
+
+class ErrorSuppressor:
+    """Подавление повторных сообщений об одной и той же ошибке.
+
+    Первая ошибка сообщается сразу, повторы лишь подсчитываются и
+    раз в window секунд сворачиваются в одну сводку; после первого
+    успешного опроса отправляется одно сообщение о восстановлении.
+    """
+
+    def __init__(self, window=ERROR_WINDOW, clock=time.time):
+        """Сводки о повторах не чаще раза в window секунд."""
+        self.window = window
+        self.clock = clock
+        self._incidents = {}
+        self._lock = threading.Lock()
+
+    def on_error(self, scope, error):
+        """Текст для отправки в чат или None, если ошибку надо подавить."""
+        key = error_key(error)
+        now = self.clock()
+        with self._lock:
+            incident = self._incidents.get(scope)
+            if incident is None or incident.key != key:
+                self._incidents[scope] = Incident(key, str(error), now)
+                return BOT_ERROR.format(error=error)
+            incident.count += 1
+            if now - incident.reported_at < self.window:
+                return None
+            incident.reported_at = now
+            count = incident.count
+        return ERROR_REPEATED.format(
+            error=error, count=count,
+            since=time.strftime(
+                SINCE_FORMAT, time.localtime(incident.started_at)
+            )
+        )
+
+    def on_success(self, scope):
+        """Сообщение о восстановлении, если до этого были ошибки."""
+        with self._lock:
+            incident = self._incidents.pop(scope, None)
+        if incident is None:
+            return None
+        return ERROR_RECOVERED.format(error=incident.error)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'
+))
+
+import bench_load  # noqa: E402
+from stubs import StubConfig, StubState  # noqa: E402
+
+
+def test_stub_state_measures_notification_latency():
+    state = StubState(StubConfig(seed=1))
+    assert state.answer('token', 0)['homeworks'] == []
+    state.add_change(now=100.0)
+    homeworks = state.answer('token', 50)['homeworks']
+    assert len(homeworks) == 1
+    assert state.answer('token', 101)['homeworks'] == [], (
+        'Изменения раньше from_date не должны возвращаться'
+    )
+    name = homeworks[0]['homework_name']
+    state.delivered(f'Изменился статус проверки работы "{name}".', now=101.5)
+    assert state.stats()['latencies'] == [1.5]
+
+
+def test_load_run_smoke():
+    result = bench_load.run(bench_load.parse_args([
+        '--accounts', '20', '--duration', '1', '--retry-time', '0.2',
+        '--change-rate', '20', '--latency', '0',
+    ]))
+    assert result['polls_per_second'] > 0
+    assert result['api_requests'] > 0
+    assert result['notifications'] > 0, (
+        'Изменения статусов должны доходить до заглушки Telegram'
+    )
@@ -0,0 +1,144 @@
+import pytest
+
+import engine
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import CircuitOpenError, ServerResponseError
+from policy import RequestPolicy
+from utils import FakeClient, FakeClock
+
+
+def fail():
+    raise ServerResponseError('boom', 502)
+
+
+def revoked():
+    raise ServerResponseError('not_authenticated', 401)
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock(100.0)
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=clock)
+    for _ in range(2):
+        with pytest.raises(ServerResponseError):
+            breaker.call(fail)
+    assert breaker.state == OPEN, 'После threshold ошибок цепь размыкается'
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+    assert breaker.retry_after() == 10
+    clock.now += 10
+    breaker.acquire()
+    assert breaker.state == HALF_OPEN, 'После паузы цепь полуоткрыта'
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.failure(ServerResponseError('still down', 503))
+    assert breaker.state == OPEN, 'Ошибка пробного запроса снова размыкает цепь'
+    clock.now += 10
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED, 'Успешный пробный запрос замыкает цепь'
+
+
+def test_breaker_ignores_unrelated_errors():
+    breaker = CircuitBreaker(threshold=2)
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}['homeworks'])
+    assert breaker.state == CLOSED, (
+        'Ошибки разбора ответа не должны размыкать цепь'
+    )
+    with pytest.raises(ServerResponseError):
+        breaker.call(fail)
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}['homeworks'])
+    assert breaker.consecutive == 1, (
+        'Посторонняя ошибка не сбрасывает счётчик ошибок API'
+    )
+
+
+def test_unrelated_error_frees_the_probe():
+    clock = FakeClock(100.0)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=clock)
+    with pytest.raises(ServerResponseError):
+        breaker.call(fail)
+    clock.now += 10
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}['homeworks'])
+    assert breaker.state == HALF_OPEN, (
+        'Посторонняя ошибка пробного запроса не замыкает цепь'
+    )
+    assert breaker.call(lambda: 'ok') == 'ok', (
+        'После посторонней ошибки разрешается новый пробный запрос'
+    )
+    assert breaker.state == CLOSED
+
+
+def test_html_error_pages_open_the_circuit():
+    client = FakeClient('<html>502 Bad Gateway</html>', status_code=502)
+    account = engine.Account('token', 1)
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    polling = engine.PollingEngine(
+        None, [account], client=client, breaker=breaker,
+        policy=RequestPolicy(attempts=1)
+    )
+    polling.send = lambda chat_id, message: None
+    polling.states[account].timestamp = 1
+    for _ in range(5):
+        polling.poll_account(account)
+    assert breaker.state == OPEN, (
+        'Ответ 502 с HTML вместо JSON - это отказ API, а не ошибка разбора'
+    )
+    assert len(client.calls) == 2
+
+
+def test_revoked_tokens_do_not_open_the_circuit():
+    client = FakeClient({'code': 'not_authenticated'}, status_code=401)
+    accounts = [engine.Account(f'token-{index}', index) for index in range(6)]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    polling = engine.PollingEngine(
+        None, accounts, client=client, breaker=breaker,
+        policy=RequestPolicy(attempts=1)
+    )
+    polling.send = lambda chat_id, message: None
+    for account in accounts:
+        polling.states[account].timestamp = 1
+        polling.poll_account(account)
+    assert breaker.state == CLOSED, (
+        'Ошибки отдельных токенов не говорят о сбое API и не размыкают цепь'
+    )
+    assert len(client.calls) == len(accounts), (
+        'Аккаунты после отозванных токенов по-прежнему опрашиваются'
+    )
+
+
+def test_bad_token_probe_does_not_reopen_the_circuit():
+    clock = FakeClock(100.0)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=clock)
+    with pytest.raises(ServerResponseError):
+        breaker.call(fail)
+    clock.now += 10
+    with pytest.raises(ServerResponseError):
+        breaker.call(revoked)
+    assert breaker.state == HALF_OPEN, (
+        'Пробный запрос с отозванным токеном не размыкает цепь снова'
+    )
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_engine_fails_fast_while_open():
+    client = FakeClient(error=ConnectionError('down'))
+    accounts = [engine.Account(f'token-{index}', index) for index in range(5)]
+    polling = engine.PollingEngine(
+        None, accounts, client=client,
+        breaker=CircuitBreaker(threshold=2, reset_timeout=60),
+        policy=RequestPolicy(attempts=1)
+    )
+    polling.send = lambda chat_id, message: None
+    results = [polling.poll_account(account) for account in accounts]
+    assert len(client.calls) == 2, (
+        'При разомкнутой цепи запросы к API не выполняются'
+    )
+    assert results == [True, True, False, False, False], (
+        'Быстрый отказ сообщается планировщику для переноса опроса'
+    )
+    assert all(
+        polling.states[account].errors == 0 for account in accounts[2:]
+    ), 'Быстрый отказ не считается ошибкой аккаунта'
@@ -0,0 +1,107 @@
+import threading
+
+import commands
+import engine
+from homework import Homework
+from utils import FakeClient, FakeClock
+
+
+ANSWER = {
+    'homeworks': [
+        {'homework_name': 'hw2', 'status': 'reviewing',
+         'date_updated': '2022-02-02T00:00:00Z'},
+        {'homework_name': 'hw1', 'status': 'approved',
+         'date_updated': '2022-01-01T00:00:00Z'},
+        {'status': 'approved'},
+    ],
+    'current_date': 100,
+}
+
+
+def make_service(client, clock):
+    account = engine.Account('token', 42)
+    polling = engine.PollingEngine(None, [account], client=client)
+    cache = commands.StatusCache(ttl=60, clock=clock)
+    return account, commands.CommandService(polling, cache)
+
+
+def test_status_refreshes_once_when_stale():
+    clock = FakeClock(1000.0)
+    client = FakeClient(ANSWER, delay=0.05)
+    _, service = make_service(client, clock)
+    replies = []
+    threads = [
+        threading.Thread(target=lambda: replies.append(
+            service.status_text(42)
+        ))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(client.calls) == 1, (
+        'Параллельные команды должны вызывать одно обновление кеша'
+    )
+    assert replies[0] == (
+        '"hw2": Работа взята на проверку ревьюером.\n'
+        '"hw1": Работа проверена: ревьюеру всё понравилось. Ура!'
+    ), 'Некорректные работы пропускаются, остальные выводятся'
+    service.history_text(42)
+    assert len(client.calls) == 1, 'Свежий кеш отвечает без запроса к API'
+    clock.now += 61
+    service.status_text(42)
+    assert len(client.calls) == 2, 'Устаревший кеш обновляется запросом к API'
+
+
+def test_poll_cycle_keeps_cache_fresh():
+    clock = FakeClock(1000.0)
+    client = FakeClient(ANSWER)
+    account, service = make_service(client, clock)
+    service.engine.cache = service.cache
+    service.status_text(42)
+    clock.now += 50
+    service.engine.poll_account(account)
+    clock.now += 50
+    client.data = {'homeworks': [], 'current_date': 200}
+    assert service.cache.is_fresh(account), (
+        'Успешный опрос должен продлевать срок жизни кеша'
+    )
+    assert len(client.calls) == 2, 'Команда не должна добавлять запросов к API'
+
+
+def test_history_and_unknown_chat():
+    cache = commands.StatusCache(clock=FakeClock(1000.0))
+    account = engine.Account('token', 42)
+    first = Homework(1, 'hw', 'reviewing', 'd1')
+    second = Homework(1, 'hw', 'approved', 'd2')
+    cache.record(account, [first], complete=True)
+    cache.record(account, [second, first])
+    cache.record(account, [second])
+    assert cache.history(account) == [second, first], (
+        'История хранит изменения без повторов, свежие первыми'
+    )
+    assert cache.latest(account) == [second], (
+        'Для /status остаётся последний статус работы'
+    )
+    service = commands.CommandService(
+        engine.PollingEngine(None, [account], client=FakeClient(ANSWER)),
+        cache
+    )
+    assert service.status_text(7) == commands.UNKNOWN_CHAT, (
+        'Чужой чат получает подсказку, а не чужие статусы'
+    )
+
+
+def test_commands_cover_accounts_of_other_shards():
+    clock = FakeClock(1000.0)
+    client = FakeClient(ANSWER)
+    mine, other = engine.Account('mine', 1), engine.Account('other', 2)
+    polling = engine.PollingEngine(None, [mine], client=client)
+    service = commands.CommandService(
+        polling, commands.StatusCache(clock=clock), [mine, other]
+    )
+    assert '"hw2"' in service.status_text(2), (
+        'Шард с командами отвечает и за аккаунты других шардов'
+    )
+    assert client.calls[0][0] == 'OAuth other'
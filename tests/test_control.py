@@ -0,0 +1,16 @@
+from control import ControlServer, send_command
+
+
+def test_control_socket_runs_commands(tmp_path):
+    path = str(tmp_path / 'control.sock')
+    calls = []
+    server = ControlServer(path, {'poll': lambda: calls.append('poll')})
+    server.start()
+    try:
+        assert send_command(path, 'poll') == 'ok'
+        assert calls == ['poll'], 'Команда poll вызывает свой обработчик'
+        assert 'неизвестная команда' in send_command(path, 'reboot'), (
+            'На неизвестную команду сокет отвечает ошибкой'
+        )
+    finally:
+        server.close()
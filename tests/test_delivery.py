@@ -0,0 +1,150 @@
+import threading
+
+from telegram.error import RetryAfter, TimedOut, Unauthorized
+
+from delivery import (SPARE_CONNECTIONS, TelegramDelivery, TokenBucket,
+                      build_bot, send_many)
+import engine
+from utils import FakeBot, FakeClient, FakeClock
+
+
+def test_token_bucket_spaces_out_bursts():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    delays = [bucket.reserve() for _ in range(4)]
+    assert delays == [0, 0, 0.5, 1.0], (
+        'После исчерпания всплеска токены выдаются с частотой rate'
+    )
+    clock.now = 10
+    assert bucket.reserve() == 0, 'Со временем ведро снова наполняется'
+
+
+def test_delivery_sends_everything_before_close():
+    bot = FakeBot()
+    delivery = TelegramDelivery(
+        bot, workers=4, global_rate=1000, chat_rate=1000,
+        sleep=lambda seconds: None
+    )
+    delivery.start()
+    for index in range(50):
+        delivery.submit(index % 5, str(index))
+    delivery.close()
+    assert sorted(int(text) for _, text in bot.sent) == list(range(50)), (
+        'close() должен дождаться отправки всех сообщений из очереди'
+    )
+
+
+def test_delivery_respects_retry_after_and_retries_timeouts():
+    bot = FakeBot([RetryAfter(3), TimedOut()])
+    pauses = []
+    delivery = TelegramDelivery(
+        bot, workers=1, global_rate=1000, chat_rate=1000,
+        sleep=pauses.append
+    )
+    delivery.start()
+    delivery.submit(1, 'text')
+    delivery.close()
+    assert bot.sent == [(1, 'text')], (
+        'Сообщение должно быть доставлено после 429 и таймаута'
+    )
+    assert max(pauses) > 2, 'После 429 нужно выждать retry_after'
+
+
+class BlockedChatBot(FakeBot):
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if chat_id == 2:
+            raise Unauthorized('bot was blocked by the user')
+        super().send_message(chat_id, text)
+
+
+def test_broadcast_reports_each_recipient():
+    bot = BlockedChatBot()
+    delivery = TelegramDelivery(
+        bot, workers=3, global_rate=1000, chat_rate=1000,
+        sleep=lambda seconds: None
+    )
+    delivery.start()
+    results = delivery.send_many([1, 2, 3], 'text', timeout=5)
+    delivery.close()
+    assert [(result.chat_id, result.ok) for result in results] == [
+        (1, True), (2, False), (3, True)
+    ], 'Результат рассылки сообщается по каждому получателю'
+    assert isinstance(results[1].error, Unauthorized)
+    assert sorted(bot.sent) == [(1, 'text'), (3, 'text')], (
+        'Ошибка в одном чате не мешает доставке в остальные'
+    )
+
+
+def test_send_many_without_queue():
+    results = send_many(BlockedChatBot(), [2, 1], 'text')
+    assert [result.ok for result in results] == [False, True]
+
+
+def test_bot_keeps_connection_pool_for_all_workers():
+    bot = build_bot('123456:token', workers=8)
+    assert bot.request.con_pool_size == 8 + SPARE_CONNECTIONS, (
+        'Пул соединений с Bot API рассчитан на всех отправителей'
+    )
+
+
+class SlowBot(FakeBot):
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.release.wait(5)
+        super().send_message(chat_id, text)
+
+
+def test_close_timeout_does_not_send_abandoned_messages():
+    bot = SlowBot()
+    delivery = TelegramDelivery(
+        bot, workers=1, global_rate=1000, chat_rate=1000,
+        sleep=lambda seconds: None
+    )
+    delivery.start()
+    [worker] = delivery._threads
+    first = delivery.submit(1, 'first')
+    second = delivery.submit(2, 'second')
+    assert delivery.close(timeout=0.1) == 1
+    assert not second.result().ok, 'Неотправленное сообщение отмечено сразу'
+    bot.release.set()
+    worker.join(5)
+    assert not worker.is_alive(), 'Отправитель завершается без ошибок'
+    assert first.result(1).ok, 'Сообщение в работе досылается и отмечается'
+    assert bot.sent == [(1, 'first')], (
+        'Сообщение, признанное неотправленным, не уходит после close()'
+    )
+
+
+def test_undelivered_status_is_sent_again():
+    bot = FakeBot([TimedOut()] * 3)
+    account = engine.Account('token', 1)
+    client = FakeClient({
+        'homeworks': [{'id': 7, 'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 100,
+    })
+    polling = engine.PollingEngine(bot, [account], client=client)
+    state = polling.states[account]
+    state.timestamp = 1
+    for attempt in range(2):
+        polling.delivery = TelegramDelivery(
+            bot, workers=1, global_rate=1000, chat_rate=1000,
+            sleep=lambda seconds: None
+        )
+        polling.delivery.start()
+        polling.poll_account(account)
+        polling.delivery.close()
+        if not attempt:
+            assert bot.sent == [] and state.notified == {}, (
+                'Статус, который не удалось доставить, не запоминается'
+            )
+            assert state.timestamp == 1, (
+                'Курсор не сдвигается, пока уведомление не доставлено'
+            )
+    assert len(bot.sent) == 1, 'Следующий опрос отправляет статус снова'
+    assert state.notified == {'7': ['approved', None]}
+    assert state.timestamp == 100, 'После доставки курсор сдвигается'
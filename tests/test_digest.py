@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+import engine
+from digest import MAX_LENGTH, DigestBuffer, render_digest
+from utils import FakeClient
+
+
+class Sink:
+
+    def __init__(self):
+        self.sent = []
+        self.event = threading.Event()
+
+    def __call__(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        self.event.set()
+
+
+def test_digest_combines_messages_per_chat_after_window():
+    sink = Sink()
+    digest = DigestBuffer(sink, window=0.05).start()
+    digest.add(1, 'first')
+    digest.add(1, 'second')
+    digest.add(1, 'second')
+    digest.add(2, 'other')
+    assert sink.event.wait(2), 'Сводка уходит по истечении окна'
+    digest.close()
+    assert sorted(sink.sent) == [
+        (1, render_digest(['first', 'second'])), (2, 'other')
+    ], 'Одна сводка на чат, повторы не дублируются'
+
+
+def test_digest_flushes_on_size_and_length():
+    sink = Sink()
+    digest = DigestBuffer(sink, window=3600, max_size=3)
+    for index in range(3):
+        digest.add(1, str(index))
+    assert sink.sent == [(1, render_digest(['0', '1', '2']))], (
+        'При max_size уведомлений сводка уходит сразу'
+    )
+    long = 'x' * (MAX_LENGTH // 2)
+    digest.add(2, long + '1')
+    digest.add(2, long + '2')
+    assert sink.sent[-1] == (2, long + '1'), (
+        'Сводка не должна превышать предел длины сообщения Telegram'
+    )
+    digest.close()
+    assert sink.sent[-1] == (2, long + '2'), 'close() досылает остаток'
+
+
+class NamedClient(FakeClient):
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.data = {
+            'homeworks': [{
+                'homework_name': headers['Authorization'],
+                'status': 'approved',
+            }],
+            'current_date': 100,
+        }
+        return super().get(url, headers, params, **kwargs)
+
+
+def test_engine_sends_one_digest_for_a_burst():
+    sink = Sink()
+    accounts = [engine.Account('a', 1), engine.Account('b', 1)]
+    polling = engine.PollingEngine(
+        None, accounts, client=NamedClient(),
+        digest=DigestBuffer(sink, window=3600)
+    )
+    for account in accounts:
+        polling.states[account].timestamp = 1
+        polling.poll_account(account)
+    polling.digest.close()
+    assert len(sink.sent) == 1, (
+        'Несколько изменений в один чат уходят одним сообщением'
+    )
+    assert 'OAuth a' in sink.sent[0][1] and 'OAuth b' in sink.sent[0][1]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_digest_buffers_every_change_in_one_response(stream):
+    sink = Sink()
+    account = engine.Account('token', 1)
+    client = FakeClient({
+        'homeworks': [
+            {'id': 3, 'homework_name': 'hw3', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'rejected'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+        ],
+        'current_date': 100,
+    })
+    polling = engine.PollingEngine(
+        None, [account], client=client, stream=stream,
+        digest=DigestBuffer(sink, window=3600)
+    )
+    polling.states[account].timestamp = 1
+    polling.poll_account(account)
+    polling.digest.close()
+    [(chat_id, text)] = sink.sent
+    assert 0 < text.index('hw1') < text.index('hw2') < text.index('hw3'), (
+        'Все изменения одного ответа попадают в сводку, от старых к новым'
+    )
+    assert polling.states[account].status == 'approved', (
+        'Последним статусом аккаунта остаётся статус самой свежей работы'
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import signal
+import time
+
+import engine
+from utils import FakeBot, FakeClient
+
+
+def test_load_accounts_from_file(tmp_path):
+    path = tmp_path / 'accounts.json'
+    path.write_text(json.dumps([
+        {'practicum_token': 'a', 'chat_id': 1},
+        {'practicum_token': 'b', 'chat_id': 2},
+    ]))
+    accounts = engine.load_accounts(str(path))
+    assert accounts == [engine.Account('a', 1), engine.Account('b', 2)], (
+        'Аккаунты должны читаться из JSON-файла'
+    )
+
+
+def test_load_accounts_from_env():
+    accounts = engine.load_accounts(None, 'token', 42)
+    assert accounts == [engine.Account('token', 42)], (
+        'Без файла используется аккаунт из переменных окружения'
+    )
+
+
+def test_poll_account_sends_to_own_chat():
+    client = FakeClient({
+        'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 100,
+    })
+    bot = FakeBot()
+    accounts = [engine.Account('a', 1), engine.Account('b', 2)]
+    polling = engine.PollingEngine(bot, accounts, client=client)
+    polling.poll_account(accounts[1])
+    assert [chat for chat, _ in bot.sent] == [2], (
+        'Сообщение должно уходить в чат опрошенного аккаунта'
+    )
+    assert client.calls[0][0] == 'OAuth b', (
+        'Запрос должен выполняться с токеном опрошенного аккаунта'
+    )
+    assert polling.states[accounts[1]].timestamp == 100, (
+        'После опроса метка времени берётся из current_date'
+    )
+
+
+def test_run_polls_every_account_until_stopped():
+    client = FakeClient({'homeworks': [], 'current_date': 1})
+    accounts = [engine.Account(str(index), index) for index in range(20)]
+    polling = engine.PollingEngine(
+        FakeBot(), accounts, retry_time=0, client=client
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.2, polling.stop)
+        await polling.run()
+
+    asyncio.run(run())
+    tokens = {authorization for authorization, _ in client.calls}
+    assert tokens == {f'OAuth {index}' for index in range(20)}, (
+        'Движок должен опрашивать все аккаунты'
+    )
+
+
+def test_unexpected_poll_error_keeps_account_scheduled():
+    client = FakeClient({'homeworks': [], 'current_date': 1})
+    accounts = [engine.Account(str(index), index) for index in range(2)]
+    polling = engine.PollingEngine(
+        FakeBot(), accounts, retry_time=0.05, client=client
+    )
+    poll_account = polling.poll_account
+    broken = []
+
+    def flaky_poll(account):
+        if account.token == '0':
+            broken.append(account)
+            raise RuntimeError('boom')
+        return poll_account(account)
+
+    polling.poll_account = flaky_poll
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.3, polling.stop)
+        await polling.run()
+
+    asyncio.run(run())
+    assert len(broken) > 1, (
+        'После непредвиденной ошибки аккаунт возвращается в очередь'
+    )
+    assert len(polling.scheduler) == 2, (
+        'Остановка проходит штатно, аккаунты остаются в очереди'
+    )
+
+
+def test_signals_trigger_poll_now_and_graceful_stop():
+    client = FakeClient({'homeworks': [], 'current_date': 1})
+    accounts = [engine.Account(str(index), index) for index in range(3)]
+    polling = engine.PollingEngine(
+        FakeBot(), accounts, retry_time=1000, client=client
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, os.kill, os.getpid(), signal.SIGUSR1)
+        loop.call_later(0.2, os.kill, os.getpid(), signal.SIGTERM)
+        await polling.run(handle_signals=True)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 2, (
+        'SIGTERM должен останавливать движок без ожидания RETRY_TIME'
+    )
+    tokens = {authorization for authorization, _ in client.calls}
+    assert tokens == {'OAuth 0', 'OAuth 1', 'OAuth 2'}, (
+        'SIGUSR1 запускает опрос всех аккаунтов, не дожидаясь их срока'
+    )
+
+
+def test_status_change_fans_out_to_recipients(tmp_path):
+    path = tmp_path / 'accounts.json'
+    path.write_text(json.dumps([
+        {'practicum_token': 'a', 'chat_id': 1, 'recipients': [10, 11]},
+    ]))
+    [account] = engine.load_accounts(str(path))
+    assert account.recipients == (10, 11)
+    client = FakeClient({
+        'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 100,
+    })
+    bot = FakeBot()
+    engine.PollingEngine(bot, [account], client=client).poll_account(account)
+    assert sorted(chat for chat, _ in bot.sent) == [1, 10, 11], (
+        'Изменение статуса уходит в чат аккаунта и всем получателям'
+    )
+
+
+def test_stuck_poll_does_not_hold_up_stop():
+    client = FakeClient(delay=2)
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(
+        FakeBot(), [account], client=client, stop_timeout=0.1
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.1, polling.stop)
+        await polling.run()
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 1, (
+        'Остановка ждёт текущие опросы не дольше stop_timeout'
+    )
+    assert polling.policy.deadline().remaining() > 1, (
+        'Урезаются только сроки текущих опросов, а не следующих'
+    )
@@ -0,0 +1,68 @@
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+
+import pytest
+
+import homework
+from http_client import HTTPClient
+
+ETAG = '"v1"'
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    ETagHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_request_returns_none_on_304(endpoint):
+    client = HTTPClient()
+    first = homework.request_api_answer(client, 'token', 0, endpoint)
+    second = homework.request_api_answer(client, 'token', 0, endpoint)
+    assert first == {'homeworks': [], 'current_date': 1}, (
+        'Первый запрос должен вернуть разобранный ответ API'
+    )
+    assert second is None, (
+        'При ответе 304 request_api_answer должна вернуть None'
+    )
+    assert ETagHandler.requests_seen[1].get('If-None-Match') == ETAG, (
+        'Повторный запрос должен содержать If-None-Match'
+    )
+
+
+def test_validators_are_per_token_and_params(endpoint):
+    client = HTTPClient()
+    homework.request_api_answer(client, 'token', 0, endpoint)
+    other_token = homework.request_api_answer(client, 'other', 0, endpoint)
+    other_date = homework.request_api_answer(client, 'token', 5, endpoint)
+    assert other_token is not None and other_date is not None, (
+        'ETag одного запроса не должен применяться к другому токену '
+        'или другому from_date'
+    )
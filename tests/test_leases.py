@@ -0,0 +1,76 @@
+import asyncio
+
+import engine
+from leases import LeaseManager, LeaseStore
+from utils import FakeClient, FakeClock
+
+
+ACCOUNTS = [engine.Account(f'token-{index}', index) for index in range(10)]
+
+
+def managers(path, clock, *nodes):
+    store = LeaseStore(str(path), clock=clock)
+    return [
+        LeaseManager(store, ACCOUNTS, node=node, ttl=30, clock=clock)
+        for node in nodes
+    ]
+
+
+def owned(manager):
+    return {account for account in ACCOUNTS if manager.owns(account)}
+
+
+def test_nodes_split_accounts_without_overlap(tmp_path):
+    clock = FakeClock(1000.0)
+    first, second = managers(tmp_path / 'leases.db', clock, 'a', 'b')
+    first.renew()
+    assert owned(first) == set(ACCOUNTS), 'Единственный узел берёт всё'
+    second.renew()
+    first.renew()
+    second.renew()
+    assert len(owned(first)) == len(owned(second)) == 5, (
+        'С появлением второго узла аккаунты делятся поровну'
+    )
+    assert not owned(first) & owned(second), (
+        'Один аккаунт не может принадлежать двум узлам'
+    )
+
+
+def test_failed_node_accounts_are_taken_over(tmp_path):
+    clock = FakeClock(1000.0)
+    first, second = managers(tmp_path / 'leases.db', clock, 'a', 'b')
+    first.renew()
+    second.renew()
+    clock.now += 25
+    assert not owned(first), (
+        'Без продления узел перестаёт опрашивать аккаунты раньше, '
+        'чем их смогут забрать другие'
+    )
+    clock.now += 10
+    second.renew()
+    assert owned(second) == set(ACCOUNTS), (
+        'Аккаунты упавшего узла переходят к живым'
+    )
+
+
+def test_engine_polls_only_leased_accounts(tmp_path):
+    path = tmp_path / 'leases.db'
+    other = LeaseManager(LeaseStore(str(path)), ACCOUNTS, node='other')
+    other.renew()
+    client = FakeClient()
+    polling = engine.PollingEngine(
+        None, ACCOUNTS, retry_time=0, client=client,
+        leases=LeaseManager(LeaseStore(str(path)), ACCOUNTS, node='mine')
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.2, polling.stop)
+        await polling.run()
+
+    asyncio.run(run())
+    assert client.calls == [], 'Чужие аккаунты не опрашиваются'
+    other.release()
+    asyncio.run(run())
+    assert {authorization for authorization, _ in client.calls} == {
+        f'OAuth token-{index}' for index in range(10)
+    }, 'Освобождённые аккаунты забирает другой узел'
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+
+import requests
+
+import homework
+import logs
+
+
+class Exploding:
+
+    def __format__(self, spec):
+        raise AssertionError('Сообщение не должно форматироваться')
+
+
+def make_logger(name, tmp_path, **kwargs):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    listener = logs.configure(
+        logger, '%(message)s', str(tmp_path / 'bot.log'), **kwargs
+    )
+    return logger, listener
+
+
+def test_lazy_message_below_level_is_not_formatted(tmp_path):
+    logger, listener = make_logger('test_lazy', tmp_path)
+    logger.debug(logs.LazyMessage('{value}', value=Exploding()))
+    logger.info(logs.LazyMessage('значение {value}', value=42))
+    listener.stop()
+    assert (tmp_path / 'bot.log').read_text(encoding='utf-8') == (
+        'значение 42\n'
+    )
+
+
+def test_json_lines(tmp_path):
+    logger, listener = make_logger('test_json', tmp_path, json_lines=True)
+    logger.info('привет')
+    listener.stop()
+    entry = json.loads((tmp_path / 'bot.log').read_text(encoding='utf-8'))
+    assert entry['message'] == 'привет' and entry['level'] == 'INFO'
+
+
+def test_rotation_compresses_old_files(tmp_path):
+    logger, listener = make_logger(
+        'test_rotation', tmp_path, max_bytes=100, backups=2
+    )
+    for index in range(50):
+        logger.info('строка номер %s', index)
+    listener.stop()
+    names = sorted(os.listdir(tmp_path))
+    assert 'bot.log.1.gz' in names, (
+        'Старые файлы лога должны сжиматься при ротации'
+    )
+    assert len(names) == 3, 'Хранится не больше backups старых файлов'
+
+
+def test_connection_error_does_not_leak_token(monkeypatch):
+    def broken_get(*args, **kwargs):
+        raise requests.exceptions.ConnectionError('down')
+
+    monkeypatch.setattr(requests, 'get', broken_get)
+    try:
+        homework.request_api_answer(requests, 'secret-token', 0)
+    except ConnectionError as error:
+        assert 'secret-token' not in str(error), (
+            'Токен не должен попадать в текст ошибки'
+        )
+    else:
+        assert False, 'Ожидалась ошибка подключения'
+
+
+def test_log_file_is_opened_on_first_record(tmp_path):
+    logger, listener = make_logger('test_deferred_open', tmp_path)
+    assert not (tmp_path / 'bot.log').exists(), (
+        'Файл лога не должен открываться при настройке логгера'
+    )
+    logger.info('первая запись')
+    listener.stop()
+    assert 'первая запись' in (tmp_path / 'bot.log').read_text(
+        encoding='utf-8'
+    ), 'Первая запись запускает слушатель и попадает в файл'
+
+
+def test_shard_reconfigures_its_own_log_file(tmp_path):
+    logger, listener = make_logger('test_shard_log', tmp_path)
+    logger.info('супервизор')
+    path = logs.shard_path(str(tmp_path / 'bot.log'), 1)
+    assert path == str(tmp_path / 'bot.shard-1.log')
+    assert logs.configure(logger, '%(message)s', path) is listener, (
+        'Повторная настройка переиспользует слушатель, а не дублирует его'
+    )
+    logger.info('шард')
+    listener.stop()
+    assert (tmp_path / 'bot.log').read_text(encoding='utf-8') == (
+        'супервизор\n'
+    )
+    assert (tmp_path / 'bot.shard-1.log').read_text(encoding='utf-8') == (
+        'шард\n'
+    ), 'После перенастройки записи идут в файл шарда, по одной'
@@ -0,0 +1,34 @@
+import tracemalloc
+
+import pytest
+
+import engine
+from memory import GROWTH, MemoryTracker
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+def test_tracker_reports_growing_site():
+    tracker = MemoryTracker(top=5, frames=1).start()
+    leak = [bytes(1024) for _ in range(2000)]
+    growth = tracker.check(polls=10)
+    assert growth, 'Рост памяти должен попасть в отчёт'
+    assert growth[0].traceback[0].filename == __file__, (
+        'Первым в отчёте идёт место, где память выросла сильнее всего'
+    )
+    site = f'{__file__}:{growth[0].traceback[0].lineno}'
+    assert GROWTH.value(site=site) >= 2000 * 1024
+    assert len(leak) == 2000
+
+
+def test_heap_dump_is_loadable(tmp_path):
+    polling = engine.PollingEngine(None, [engine.Account('a', 1)])
+    polling.memory = MemoryTracker(dump_dir=str(tmp_path))
+    path = polling.dump_heap()
+    assert tracemalloc.is_tracing(), 'Снимок по запросу включает трассировку'
+    snapshot = tracemalloc.Snapshot.load(path)
+    assert isinstance(snapshot, tracemalloc.Snapshot)
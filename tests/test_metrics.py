@@ -0,0 +1,98 @@
+import time
+import urllib.request
+
+import pytest
+
+import engine
+import metrics
+from utils import FakeClient
+
+
+def test_counter_and_gauge_render():
+    registry = metrics.Registry()
+    counter = registry.counter('polls_total', 'Опросы', ['outcome'])
+    gauge = registry.gauge('queue', 'Очередь')
+    counter.inc(outcome='ok')
+    counter.inc(2, outcome='ok')
+    gauge.set_function(lambda: 7)
+    text = registry.render()
+    assert '# TYPE polls_total counter' in text
+    assert 'polls_total{outcome="ok"} 3' in text
+    assert 'queue 7' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('latency', 'Задержка', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    lines = histogram.samples()
+    assert lines[:3] == [
+        'latency_bucket{le="0.1"} 1',
+        'latency_bucket{le="1"} 2',
+        'latency_bucket{le="+Inf"} 3',
+    ]
+    assert lines[-1] == 'latency_count 3'
+
+
+def test_stage_records_outcome_and_exception():
+    before = metrics.STAGE_ERRORS.value(
+        stage='test_stage', exception='ValueError'
+    )
+    with metrics.stage('test_stage'):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage('test_stage'):
+            raise ValueError
+    assert metrics.STAGE_SECONDS.value(stage='test_stage', outcome='ok') == 1
+    assert metrics.STAGE_ERRORS.value(
+        stage='test_stage', exception='ValueError'
+    ) == before + 1
+
+
+def test_http_endpoint():
+    server = metrics.start_http_server(0)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/metrics'
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+        assert 'homework_stage_seconds' in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stage_timer_sums_interleaved_parts():
+    timer = metrics.StageTimer()
+    for _ in range(3):
+        with timer.stage('test_read'):
+            time.sleep(0.01)
+        with timer.stage('test_check'):
+            pass
+    assert timer.seconds['test_read'] >= 0.03 > timer.seconds['test_check']
+    timer.observe()
+    assert metrics.STAGE_SECONDS.value(
+        stage='test_read', outcome='ok'
+    ) == 1, 'Время стадии записывается одним наблюдением за цикл'
+
+
+def test_stream_check_response_excludes_download_and_send(monkeypatch):
+    timers = []
+
+    class RecordingTimer(metrics.StageTimer):
+        def __init__(self):
+            super().__init__()
+            timers.append(self)
+
+    monkeypatch.setattr(engine, 'StageTimer', RecordingTimer)
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(None, [account], client=FakeClient({
+        'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 100,
+    }), stream=True)
+    polling.send = lambda chat_id, message: time.sleep(0.2)
+    polling.poll_account(account)
+    [timer] = timers
+    assert timer.seconds['check_response'] < 0.1, (
+        'Отправка уведомления не считается временем проверки ответа'
+    )
+    assert set(timer.seconds) == {'get_api_answer', 'check_response'}
@@ -0,0 +1,165 @@
+import threading
+
+import pytest
+
+import engine
+from exceptions import (APIResponseStatusCodeError, DeadlineExceeded,
+                        ServerResponseError)
+from homework import request_api_answer
+from policy import Deadline, RequestPolicy, retryable
+from utils import FakeClient, FakeClock, FakeResponse
+
+
+def test_deadline_clips_timeouts_and_expires():
+    clock = FakeClock(100.0)
+    deadline = Deadline(10, clock)
+    assert deadline.timeout(5, 30) == (5, 10), (
+        'Тайм-аут чтения не должен превышать остаток срока'
+    )
+    clock.now += 8
+    assert deadline.timeout(5, 30) == (2, 2)
+    clock.now += 2
+    with pytest.raises(DeadlineExceeded):
+        deadline.check('check_response')
+
+
+def test_retryable_errors():
+    assert retryable(ConnectionError('down'))
+    assert retryable(APIResponseStatusCodeError('500', 500))
+    assert retryable(APIResponseStatusCodeError('429', 429))
+    assert not retryable(APIResponseStatusCodeError('401', 401)), (
+        'Ошибки авторизации повторять бессмысленно'
+    )
+    assert retryable(ServerResponseError('stub_error', 500)), (
+        'Ответ 5xx повторяется и с JSON-ошибкой в теле'
+    )
+    assert not retryable(ServerResponseError('not_authenticated', 401))
+    assert not retryable(ValueError('bad json'))
+
+
+def test_retries_with_backoff_within_deadline():
+    clock = FakeClock(100.0)
+    policy = RequestPolicy(
+        attempts=3, backoff=1, clock=clock, sleep=clock.sleep,
+        rand=lambda: 1.0
+    )
+    calls = []
+
+    def flaky(timeout=None):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise ConnectionError('down')
+        return 'ok'
+
+    assert policy.call(flaky, policy.deadline()) == 'ok'
+    assert len(calls) == 3
+    assert clock.now == 103.0, 'Задержки между попытками растут: 1 и 2 с'
+
+
+def test_no_retry_on_client_error_or_past_deadline():
+    clock = FakeClock(100.0)
+    policy = RequestPolicy(
+        attempts=5, backoff=1, clock=clock, sleep=clock.sleep,
+        rand=lambda: 1.0
+    )
+    calls = []
+
+    def unauthorized(timeout=None):
+        calls.append(timeout)
+        raise APIResponseStatusCodeError('401', 401)
+
+    with pytest.raises(APIResponseStatusCodeError):
+        policy.call(unauthorized, policy.deadline())
+    assert len(calls) == 1, 'Ответ 401 не повторяется'
+
+    def down(timeout=None):
+        calls.append(timeout)
+        raise ConnectionError('down')
+
+    calls.clear()
+    with pytest.raises(ConnectionError):
+        policy.call(down, Deadline(2.5, clock))
+    assert len(calls) == 2, (
+        'Повтор, который не успевает до конца срока, не выполняется'
+    )
+
+
+class RecoveringClient(FakeClient):
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        response = super().get(url, headers, params, **kwargs)
+        if len(self.calls) < 3:
+            return FakeResponse('<html>503 Service Unavailable</html>', 503)
+        return response
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_html_error_pages_are_retried(stream):
+    clock = FakeClock(100.0)
+    client = RecoveringClient()
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(
+        None, [account], client=client, stream=stream,
+        policy=RequestPolicy(
+            attempts=3, backoff=1, clock=clock, sleep=clock.sleep
+        )
+    )
+    polling.send = lambda chat_id, message: None
+    polling.states[account].timestamp = 1
+    polling.poll_account(account)
+    assert len(client.calls) == 3, (
+        'Ответ 503 с HTML вместо JSON повторяется, как и любой 5xx'
+    )
+    assert polling.states[account].errors == 0
+
+
+def test_server_errors_with_json_body_are_retried():
+    clock = FakeClock(100.0)
+    client = FakeClient({'code': 'stub_error'}, status_code=500)
+    policy = RequestPolicy(
+        attempts=3, backoff=1, clock=clock, sleep=clock.sleep
+    )
+    with pytest.raises(ServerResponseError):
+        policy.call(
+            request_api_answer, policy.deadline(), client, 'token', 0
+        )
+    assert len(client.calls) == 3, (
+        'Ответ 500 с кодом ошибки в JSON повторяется REQUEST_ATTEMPTS раз'
+    )
+
+
+def test_hedge_wins_when_first_attempt_is_slow():
+    policy = RequestPolicy(hedge=True)
+    policy.latencies.extend([0.01] * 50)
+    release = threading.Event()
+    calls = []
+
+    def request(timeout=None):
+        calls.append(timeout)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'slow'
+        return 'fast'
+
+    try:
+        assert policy.call(request, policy.deadline()) == 'fast', (
+            'Берётся первый пришедший ответ'
+        )
+    finally:
+        release.set()
+        policy.close()
+    assert len(calls) == 2
+
+
+def test_engine_passes_timeouts_to_client():
+    client = FakeClient()
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(
+        None, [account], client=client,
+        policy=RequestPolicy(connect_timeout=3, read_timeout=7)
+    )
+    polling.states[account].timestamp = 1
+    polling.poll_account(account)
+    assert client.timeouts == [(3, 7)], (
+        'Запрос к API выполняется с тайм-аутами соединения и чтения'
+    )
@@ -0,0 +1,62 @@
+import os
+import pstats
+import time
+
+import pytest
+
+from profiler import PollProfiler
+
+
+def slow_poll(value):
+    time.sleep(0.05)
+    return value
+
+
+def test_profiler_is_off_by_default(tmp_path):
+    profiler = PollProfiler(directory=str(tmp_path))
+    assert profiler.call(slow_poll, 1) == 1
+    assert list(tmp_path.iterdir()) == [], 'Без команды профиль не пишется'
+
+
+def test_collapsed_stacks_for_next_polls(tmp_path):
+    profiler = PollProfiler(directory=str(tmp_path), interval=0.002)
+    path = profiler.start(2)
+    for value in range(3):
+        assert profiler.call(slow_poll, value) == value
+    assert not profiler.active, 'После N опросов профилировщик выключается'
+    lines = open(path, encoding='utf-8').read().splitlines()
+    assert lines, 'Профиль должен содержать снятые стеки'
+    stack, count = lines[0].rsplit(' ', 1)
+    assert stack.startswith('test_profiler.py:slow_poll'), (
+        'Стек начинается с функции опроса, без кадров профилировщика'
+    )
+    assert int(count) > 0
+
+
+def test_pstats_profile(tmp_path):
+    profiler = PollProfiler(directory=str(tmp_path))
+    path = profiler.start('1', 'pstats')
+    profiler.call(slow_poll, 1)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'slow_poll' in functions
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        PollProfiler(directory=str(tmp_path)).start(1, 'svg')
+
+
+@pytest.mark.parametrize('kind', ['collapsed', 'pstats'])
+def test_unwritable_directory_does_not_break_polls(tmp_path, kind):
+    profiler = PollProfiler(directory=str(tmp_path / 'missing'))
+    profiler.start(1, kind)
+    assert profiler.call(slow_poll, 1) == 1, (
+        'Ошибка записи профиля не должна прерывать опрос'
+    )
+    assert not profiler.active, 'Профилировщик выключается и после ошибки'
+    profiler.directory = str(tmp_path)
+    path = profiler.start(1, kind)
+    profiler.call(slow_poll, 2)
+    assert os.path.exists(path), (
+        'После ошибки профилирование можно запустить снова'
+    )
@@ -0,0 +1,99 @@
+from http import HTTPStatus
+
+import pytest
+import telegram
+
+import engine
+from recording import (RecordingBot, RecordingClient, ReplayBot, ReplayClient,
+                       TrafficRecorder, load_traffic, pseudonym,
+                       recorded_accounts)
+from utils import FakeClient, FakeClock
+
+ANSWER = {
+    'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 100,
+}
+
+
+class HeadersClient(FakeClient):
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        response = super().get(url, headers, params, **kwargs)
+        response.headers = {'ETag': '"1"', 'Set-Cookie': 'secret'}
+        return response
+
+
+class FloodBot:
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        raise telegram.error.RetryAfter(3)
+
+
+def record(path):
+    recorder = TrafficRecorder(path)
+    recorder.accounts([engine.Account('secret-token', 7)])
+    client = RecordingClient(HeadersClient(ANSWER), recorder)
+    client.get(
+        'http://api/', headers={'Authorization': 'OAuth secret-token'},
+        params={'from_date': 0}
+    )
+    with pytest.raises(telegram.error.RetryAfter):
+        RecordingBot(FloodBot(), recorder).send_message(7, 'text')
+    recorder.close()
+
+
+@pytest.mark.parametrize('name', ['traffic.jsonl', 'traffic.jsonl.gz'])
+def test_recording_redacts_tokens(tmp_path, name):
+    path = tmp_path / name
+    record(path)
+    if name.endswith('.jsonl'):
+        assert 'secret' not in path.read_text(), (
+            'Токены и лишние заголовки не должны попадать в журнал'
+        )
+    traffic = load_traffic(path)
+    assert recorded_accounts(traffic) == [
+        engine.Account(pseudonym('secret-token'), 7)
+    ]
+    [api] = traffic['api']
+    assert api['token'] == pseudonym('secret-token')
+    assert api['json'] == ANSWER
+    assert api['headers'] == {'ETag': '"1"'}
+    [sent] = traffic['telegram']
+    assert sent['error'] == 'RetryAfter' and sent['retry_after'] == 3
+
+
+def test_replay_serves_answers_when_they_happened():
+    clock = FakeClock()
+    traffic = {'api': [
+        {'t': 0, 'token': 'rec-a', 'status': 200, 'elapsed': 0.5,
+         'json': {'homeworks': [], 'current_date': 1}},
+        {'t': 10, 'token': 'rec-a', 'status': 200, 'elapsed': 0.5,
+         'json': ANSWER},
+    ]}
+    client = ReplayClient(traffic, speed=10, clock=clock, sleep=clock.sleep)
+    headers = {'Authorization': 'OAuth rec-a'}
+    assert client.get('url', headers=headers).json()['current_date'] == 1
+    assert clock.now == 0.05, 'Задержка ответа делится на speed'
+    assert client.get('url', headers=headers).status_code == (
+        HTTPStatus.NOT_MODIFIED
+    ), 'Ответ, который ещё не случился, не отдаётся'
+    clock.now = 1
+    assert client.get('url', headers=headers).json() == ANSWER
+    assert client.remaining() == 0
+
+
+def test_replay_drives_engine_without_network(tmp_path):
+    path = tmp_path / 'traffic.jsonl'
+    record(path)
+    traffic = load_traffic(path)
+    bot = ReplayBot(traffic, sleep=lambda seconds: None)
+    with pytest.raises(telegram.error.RetryAfter):
+        bot.send_message(7, 'text')
+    accounts = recorded_accounts(traffic)
+    sent = []
+    polling = engine.PollingEngine(
+        None, accounts, client=ReplayClient(traffic)
+    )
+    polling.send = lambda chat_id, message: sent.append(chat_id)
+    polling.poll_account(accounts[0])
+    assert sent == [7], 'Записанное изменение статуса доходит до чата'
@@ -0,0 +1,34 @@
+import pytest
+
+import homework
+
+
+def test_homework_from_api_is_compact():
+    record = homework.Homework.from_api({
+        'id': 1, 'homework_name': 'hw', 'status': 'approved',
+        'date_updated': '2020-02-13T14:40:57Z', 'lesson_name': 'lesson',
+    })
+    assert (record.name, record.status) == ('hw', 'approved')
+    assert not hasattr(record, '__dict__'), (
+        'У записи Homework не должно быть __dict__'
+    )
+
+
+def test_homework_from_api_requires_name_and_status():
+    with pytest.raises(KeyError):
+        homework.Homework.from_api({'status': 'approved'})
+
+
+def test_parse_status_accepts_record_and_dict():
+    raw = {'homework_name': 'hw', 'status': 'rejected'}
+    record = homework.Homework.from_api(raw)
+    assert homework.parse_status(record) == homework.parse_status(raw)
+
+
+def test_render_status_is_cached():
+    homework.render_status.cache_clear()
+    homework.render_status('hw', 'approved')
+    homework.render_status('hw', 'approved')
+    assert homework.render_status.cache_info().hits == 1
+    with pytest.raises(ValueError):
+        homework.render_status('hw', 'unknown')
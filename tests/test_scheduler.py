@@ -0,0 +1,77 @@
+from engine import AccountState
+from scheduler import PollScheduler, next_interval
+
+NOW = 1_000_000_000
+BASE = 600
+
+
+def no_jitter():
+    return 0.5
+
+
+def test_reviewing_is_polled_more_often_than_approved():
+    reviewing = next_interval(
+        AccountState(0, 'reviewing', NOW - 7200), NOW, BASE, no_jitter
+    )
+    approved = next_interval(
+        AccountState(0, 'approved', NOW - 7200), NOW, BASE, no_jitter
+    )
+    assert reviewing < approved, (
+        'Работу на ревью нужно опрашивать чаще, чем принятую'
+    )
+
+
+def test_idle_account_is_polled_rarely():
+    idle = next_interval(
+        AccountState(0, 'approved', NOW - 30 * 24 * 3600), NOW, BASE,
+        no_jitter
+    )
+    assert idle > BASE, (
+        'Аккаунт без активности неделями нужно опрашивать реже RETRY_TIME'
+    )
+
+
+def test_errors_back_off_up_to_limit():
+    intervals = [
+        next_interval(AccountState(0, errors=errors), NOW, BASE, no_jitter)
+        for errors in range(10)
+    ]
+    assert intervals == sorted(intervals), (
+        'Интервал должен расти с числом ошибок подряд'
+    )
+    assert intervals[-1] <= BASE * 12, 'Интервал ограничен сверху'
+    assert next_interval(
+        AccountState(0, 'reviewing', errors=5000), NOW, BASE, no_jitter
+    ) == BASE * 12, (
+        'Тысячи ошибок подряд (отозванный токен) не переполняют интервал'
+    )
+
+
+def test_jitter_spreads_intervals():
+    intervals = {
+        next_interval(AccountState(0), NOW, BASE, lambda: rand)
+        for rand in (0, 0.5, 1)
+    }
+    assert min(intervals) < BASE < max(intervals), (
+        'Случайный разброс должен сдвигать интервал в обе стороны'
+    )
+
+
+def test_scheduler_pops_due_in_order():
+    scheduler = PollScheduler()
+    scheduler.schedule('c', 30)
+    scheduler.schedule('a', 10)
+    scheduler.schedule('b', 20)
+    assert scheduler.pop_due(25) == ['a', 'b']
+    assert scheduler.delay(25) == 5
+    assert scheduler.pop_due(25) == []
+
+
+def test_advance_makes_everything_due():
+    scheduler = PollScheduler()
+    scheduler.schedule('a', 100)
+    scheduler.schedule('b', 50)
+    scheduler.advance(10)
+    assert sorted(scheduler.pop_due(10)) == ['a', 'b'], (
+        'После advance все аккаунты должны быть готовы к опросу'
+    )
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+import engine
+from singleflight import SingleFlight
+from utils import FakeClient, FakeClock
+
+
+def test_concurrent_calls_share_one_request():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'homeworks': []}
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(flights.do('key', 'a', fetch))
+    )
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(
+            target=lambda caller=caller: results.append(
+                flights.do('key', caller, fetch)
+            )
+        )
+        for caller in 'bc'
+    ]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert len(calls) == 1, 'Одновременные запросы с одним ключом объединяются'
+    assert len(results) == 3 and all(
+        result is results[0] for result in results
+    ), 'Все ожидающие получают один и тот же ответ'
+
+
+def test_result_lingers_for_other_callers_only():
+    clock = FakeClock(100.0)
+    flights = SingleFlight(linger=5, clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert flights.do('key', 'a', fetch) == 1
+    assert flights.do('key', 'b', fetch) == 1, (
+        'Почти одновременный запрос другого чата получает готовый ответ'
+    )
+    assert flights.do('key', 'a', fetch) == 2, (
+        'Повторный запрос того же чата выполняется заново'
+    )
+    clock.now += 6
+    assert flights.do('key', 'c', fetch) == 3, (
+        'По истечении окна результат не переиспользуется'
+    )
+    assert len(flights) == 1, 'Устаревшие запросы не накапливаются'
+
+
+def test_errors_are_shared():
+    flights = SingleFlight()
+
+    def fail():
+        raise ConnectionError('down')
+
+    for caller in 'ab':
+        with pytest.raises(ConnectionError):
+            flights.do('key', caller, fail)
+
+
+ANSWER = {
+    'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 100,
+}
+
+
+def test_engine_fans_out_one_request_to_every_chat():
+    client = FakeClient(ANSWER)
+    accounts = [engine.Account('token', chat_id) for chat_id in (1, 2, 3)]
+    polling = engine.PollingEngine(None, accounts, client=client)
+    sent = []
+    polling.send = lambda chat_id, message: sent.append(chat_id)
+    for account in accounts:
+        polling.poll_account(account)
+    assert len(client.calls) == 1, 'Чаты одного токена опрашиваются одним запросом'
+    assert sent == [1, 2, 3], 'Изменение статуса доходит до каждого чата'
+    assert len({
+        polling._next_due(account, 1000.0) for account in accounts
+    }) == 1, 'Следующий опрос чатов одного токена планируется одновременно'
@@ -0,0 +1,43 @@
+import sys
+
+import startup
+
+
+def test_lazy_import_loads_on_first_use():
+    sys.modules.pop('colorsys', None)
+    colorsys = startup.lazy_import('colorsys')
+    assert 'colorsys' not in sys.modules, (
+        'Модуль не должен импортироваться до первого обращения'
+    )
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert 'colorsys' in sys.modules
+    assert 'import colorsys' in startup.TIMINGS, (
+        'Время отложенного импорта попадает в отчёт о запуске'
+    )
+
+
+def test_lazy_object_is_created_once():
+    created = []
+
+    def factory():
+        created.append(1)
+        return 'bot'
+
+    bot = startup.LazyObject(factory, 'test.bot')
+    assert not created, 'Объект создаётся только при первом обращении'
+    assert bot.upper() == 'BOT' and bot.lower() == 'bot'
+    assert created == [1], 'Объект создаётся один раз'
+
+
+def test_mark_and_report():
+    assert startup.mark('test_event') is True
+    assert startup.mark('test_event') is False, (
+        'Событие отмечается только при первом наступлении'
+    )
+    with startup.timed('test_component'):
+        pass
+    report = startup.report()
+    assert 'test_event' in report and 'test_component' in report
+    assert startup.TIMINGS['test_event'] > 0, (
+        'Время события считается от запуска процесса'
+    )
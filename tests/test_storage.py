@@ -0,0 +1,214 @@
+import asyncio
+import sqlite3
+import threading
+
+from delivery import TelegramDelivery
+import engine
+from storage import CheckpointStore, account_key
+from utils import FakeBot, FakeClient
+
+ANSWER = {
+    'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved',
+                   'date_updated': '2022-01-01T00:00:00Z'}],
+    'current_date': 100,
+}
+
+
+def test_store_roundtrip(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    store = CheckpointStore(path)
+    store.save([
+        ('a', 10, 'approved', 5.0, 0, None), ('b', 20, None, None, 2, None)
+    ])
+    store.save([('a', 11, 'reviewing', 6.0, 0, '{}')])
+    store.close()
+    assert CheckpointStore(path).load() == {
+        'a': (11, 'reviewing', 6.0, 0, '{}'),
+        'b': (20, None, None, 2, None),
+    }, 'Хранилище должно возвращать последнее сохранённое состояние'
+
+
+def test_store_adds_notified_to_old_databases(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE checkpoints (account TEXT PRIMARY KEY, '
+            'timestamp INTEGER NOT NULL, status TEXT, active_at REAL, '
+            'errors INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID'
+        )
+        connection.execute(
+            "INSERT INTO checkpoints VALUES ('a', 10, 'approved', 5.0, 0)"
+        )
+    connection.close()
+    assert CheckpointStore(path).load() == {
+        'a': (10, 'approved', 5.0, 0, None)
+    }, 'База старого формата открывается и получает колонку notified'
+
+
+def test_account_key_hides_token():
+    key = account_key(engine.Account('secret-token', 1))
+    assert 'secret-token' not in key, 'Токен не должен попадать в ключ'
+
+
+def test_engine_restores_and_checkpoints(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    account = engine.Account('token', 1)
+    store = CheckpointStore(path)
+    store.save([(account_key(account), 123, 'reviewing', 100.0, 0, None)])
+    polling = engine.PollingEngine(FakeBot(), [account], store=store)
+    state = polling.states[account]
+    assert (state.timestamp, state.status) == (123, 'reviewing'), (
+        'Движок должен восстанавливать курсор и статус из хранилища'
+    )
+    state.timestamp = 456
+    polling._dirty.add(account)
+    asyncio.run(polling.checkpoint())
+    assert store.load()[account_key(account)][0] == 456, (
+        'checkpoint() должен сохранять изменившиеся состояния'
+    )
+
+
+def test_notified_status_is_not_sent_again(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    account = engine.Account('token', 1)
+    bot = FakeBot()
+    client = FakeClient(ANSWER)
+    polling = engine.PollingEngine(
+        bot, [account], client=client, store=CheckpointStore(path)
+    )
+    polling.states[account].timestamp = 100
+    polling.poll_account(account)
+    polling.poll_account(account)
+    assert len(bot.sent) == 1, (
+        'Работа, изменившаяся в секунду current_date, не объявляется дважды'
+    )
+    polling._dirty.add(account)
+    asyncio.run(polling.checkpoint())
+    restarted = engine.PollingEngine(
+        bot, [account], client=client, store=CheckpointStore(path)
+    )
+    restarted.states[account].timestamp = 1
+    restarted.poll_account(account)
+    assert len(bot.sent) == 1, (
+        'После перезапуска отправленный статус не повторяется'
+    )
+    client.data = {**ANSWER, 'homeworks': [
+        {**ANSWER['homeworks'][0], 'status': 'rejected',
+         'date_updated': '2022-01-02T00:00:00Z'}
+    ]}
+    restarted.poll_account(account)
+    assert len(bot.sent) == 2, 'Новый статус той же работы отправляется'
+
+
+def test_state_is_saved_before_the_queue_is_flushed(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+    account = engine.Account('token', 1)
+    saved = []
+
+    class Delivery:
+        def start(self):
+            pass
+
+        def submit(self, chat_id, message):
+            pass
+
+        def close(self, timeout):
+            saved.append(store.load().get(account_key(account)))
+            return 0
+
+    polling = engine.PollingEngine(
+        None, [account], retry_time=1000,
+        client=FakeClient(), store=store, delivery=Delivery()
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.2, polling.stop)
+        await polling.run()
+
+    asyncio.run(run())
+    timestamp = polling.states[account].timestamp
+    assert saved and saved[0][0] == timestamp, (
+        'Состояние сохраняется до досылки очереди: SIGKILL во время '
+        'досылки не теряет курсор'
+    )
+
+
+def test_messages_not_sent_by_shutdown_are_not_marked_notified(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+    account = engine.Account('token', 1, (2,))
+    release = threading.Event()
+
+    class StuckBot(FakeBot):
+        def send_message(self, chat_id=None, text=None, **kwargs):
+            release.wait(5)
+            super().send_message(chat_id, text, **kwargs)
+
+    bot = StuckBot()
+    polling = engine.PollingEngine(
+        bot, [account], retry_time=1000, client=FakeClient(ANSWER),
+        store=store, shutdown_timeout=0.1,
+        delivery=TelegramDelivery(bot, workers=1, sleep=lambda _: None)
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.2, polling.stop)
+        await polling.run()
+
+    try:
+        asyncio.run(run())
+        row = store.load()[account_key(account)]
+    finally:
+        release.set()
+    assert row[0] != 100 and row[-1] is None, (
+        'Недосланные при остановке статусы не сохраняются доставленными, '
+        'и курсор остаётся на месте: после перезапуска они уйдут снова'
+    )
+
+
+def test_messages_flushed_on_shutdown_are_saved_as_notified(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+    account = engine.Account('token', 1)
+
+    class SlowBot(FakeBot):
+        def send_message(self, chat_id=None, text=None, **kwargs):
+            threading.Event().wait(0.3)
+            super().send_message(chat_id, text, **kwargs)
+
+    bot = SlowBot()
+    polling = engine.PollingEngine(
+        bot, [account], retry_time=1000, client=FakeClient(ANSWER),
+        store=store, delivery=TelegramDelivery(bot, sleep=lambda _: None)
+    )
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.1, polling.stop)
+        await polling.run()
+
+    asyncio.run(run())
+    row = store.load()[account_key(account)]
+    assert bot.sent and row[0] == 100 and row[-1] is not None, (
+        'Доставка, подтверждённая при досылке очереди, сохраняется'
+    )
+
+
+def test_failed_checkpoint_keeps_states_for_the_next_one(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(FakeBot(), [account], store=store)
+    save = store.save
+    failures = [RuntimeError('dictionary changed size during iteration')]
+
+    def flaky_save(rows):
+        if failures:
+            raise failures.pop()
+        save(rows)
+
+    store.save = flaky_save
+    polling.states[account].notified['1'] = ['approved', None]
+    polling._dirty.add(account)
+    asyncio.run(polling.checkpoint())
+    assert account in polling._dirty, (
+        'Сбой контрольной точки не теряет изменения и не прерывает цикл'
+    )
+    asyncio.run(polling.checkpoint())
+    assert store.load()[account_key(account)][-1] is not None
@@ -0,0 +1,116 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+import engine
+from streaming import JSONStream, stream_api_answer
+from utils import FakeBot
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode()
+    return [raw[index:index + size] for index in range(0, len(raw), size)]
+
+
+class StreamResponse:
+
+    def __init__(self, data, status_code=HTTPStatus.OK, size=7):
+        self.data = data
+        self.status_code = status_code
+        self.size = size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.data, self.size))
+
+    def json(self):
+        return self.data
+
+    def close(self):
+        self.closed = True
+
+
+class StreamClient:
+
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, headers=None, params=None, stream=False, **kwargs):
+        assert stream, 'Потоковый запрос должен передавать stream=True'
+        return self.response
+
+
+@pytest.mark.parametrize('size', [1, 3, 1024])
+def test_stream_yields_items_and_fields(size):
+    data = {
+        'current_date': 1234567890,
+        'homeworks': [
+            {'homework_name': 'Проект ё', 'status': 'approved', 'id': 1},
+            {'homework_name': 'hw2', 'status': 'rejected', 'id': 22},
+        ],
+        'tail': [1.5, None, True],
+    }
+    stream = JSONStream(chunked(data, size))
+    assert list(stream) == data['homeworks'], (
+        'Элементы homeworks должны разбираться по одному'
+    )
+    assert stream.fields['current_date'] == 1234567890
+    assert stream.fields['tail'] == [1.5, None, True]
+
+
+def test_stream_yields_before_payload_is_read():
+    read = []
+
+    def chunks():
+        for chunk in chunked({'homeworks': [{'a': 1}, {'b': 2}]}, 4):
+            read.append(chunk)
+            yield chunk
+
+    stream = iter(JSONStream(chunks()))
+    assert next(stream) == {'a': 1}
+    assert len(read) < len(chunked({'homeworks': [{'a': 1}, {'b': 2}]}, 4)), (
+        'Первый элемент должен отдаваться до получения всего ответа'
+    )
+
+
+def test_stream_api_answer_checks_top_level():
+    answer = stream_api_answer(
+        StreamClient(StreamResponse({'current_date': 1})), 'token', 0
+    )
+    with pytest.raises(KeyError):
+        list(answer)
+    answer = stream_api_answer(
+        StreamClient(StreamResponse({'homeworks': {}})), 'token', 0
+    )
+    with pytest.raises(TypeError):
+        list(answer)
+
+
+def test_stream_api_answer_raises_on_bad_status():
+    response = StreamResponse({}, HTTPStatus.INTERNAL_SERVER_ERROR)
+    with pytest.raises(Exception):
+        stream_api_answer(StreamClient(response), 'token', 0)
+
+
+def test_engine_streams_backfill():
+    data = {
+        'homeworks': [
+            {'homework_name': 'new', 'status': 'approved'},
+            {'homework_name': 'old', 'status': 'rejected'},
+        ],
+        'current_date': 99,
+    }
+    response = StreamResponse(data)
+    bot = FakeBot()
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(
+        bot, [account], client=StreamClient(response)
+    )
+    polling.states[account].timestamp = 0
+    polling.poll_account(account)
+    assert len(bot.sent) == 1 and '"new"' in bot.sent[0][1], (
+        'При потоковом разборе уведомление отправляется о самой свежей работе'
+    )
+    assert polling.states[account].timestamp == 99
+    assert response.closed, 'Потоковый ответ должен закрываться'
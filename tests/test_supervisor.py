@@ -0,0 +1,164 @@
+import os
+import signal
+import threading
+import time
+
+import engine
+import supervisor
+from supervisor import HashRing, Supervisor, shard_accounts
+from utils import FakeClock
+
+
+class FakeProcess:
+
+    started = []
+
+    def __init__(self, target=None, args=(), name=None):
+        self.args = args
+        self.name = name
+        self.pid = len(self.started) + 1
+        self.exitcode = None
+        self.alive = False
+        self.sentinel, self._writer = os.pipe()
+
+    def start(self):
+        self.alive = True
+        self.started.append(self)
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+        self.exitcode = -15
+
+    def join(self, timeout=None):
+        pass
+
+    def crash(self):
+        self.alive = False
+        self.exitcode = 1
+
+
+class FakeContext:
+
+    Process = FakeProcess
+
+
+def make_accounts(count):
+    return [engine.Account(f'token-{index}', index) for index in range(count)]
+
+
+def test_hash_ring_moves_few_keys_when_resized():
+    keys = [f'token-{index}' for index in range(2000)]
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+    moved = sum(before.node(key) != after.node(key) for key in keys)
+    assert moved < len(keys) * 0.3, (
+        'При добавлении шарда должна переезжать примерно 1/N аккаунтов'
+    )
+    assert all(
+        after.node(key) == 4 for key in keys
+        if before.node(key) != after.node(key)
+    ), 'Аккаунты переезжают только на новый шард'
+
+
+def test_chats_of_one_token_share_a_shard():
+    accounts = make_accounts(50) + [engine.Account('token-7', 100)]
+    shards = shard_accounts(accounts, range(4))
+    assert sum(len(shard) for shard in shards.values()) == len(accounts)
+    owners = [
+        node for node, shard in shards.items()
+        if any(account.token == 'token-7' for account in shard)
+    ]
+    assert len(owners) == 1, 'Чаты одного токена должны быть в одном шарде'
+
+
+def test_crashed_shard_is_restarted_then_excluded():
+    FakeProcess.started = []
+    clock = FakeClock(1000.0)
+    supervisor_ = Supervisor(
+        make_accounts(40), 3, context=FakeContext, restart_delay=1,
+        max_restarts=2, window=60, clock=clock
+    )
+    supervisor_.rebalance()
+    assert len(FakeProcess.started) == 3, 'Каждый шард запускается один раз'
+    crashed = supervisor_.workers[0]
+    crashed.crash()
+    assert supervisor_.step() == 1
+    assert 0 not in supervisor_.workers, 'Упавший шард ждёт перезапуска'
+    clock.now += 1
+    supervisor_.step()
+    assert supervisor_.workers[0] is not crashed, 'Упавший шард перезапущен'
+    assert supervisor_.workers[0].args == crashed.args, (
+        'Перезапущенный шард получает те же аккаунты'
+    )
+    for _ in range(2):
+        supervisor_.workers[0].crash()
+        supervisor_.step()
+        clock.now += 2
+        supervisor_.step()
+    assert supervisor_.nodes == [1, 2], (
+        'Шард, который постоянно падает, исключается из кольца'
+    )
+    shards = [process.args[0] for process in supervisor_.workers.values()]
+    assert sorted(
+        account.chat_id for shard in shards for account in shard
+    ) == list(range(40)), 'Его аккаунты распределены по остальным шардам'
+
+
+def test_resize_restarts_only_changed_shards():
+    FakeProcess.started = []
+    supervisor_ = Supervisor(make_accounts(200), 4, context=FakeContext)
+    supervisor_.rebalance()
+    before = dict(supervisor_.workers)
+    supervisor_.resize(5)
+    kept = [
+        node for node in before if supervisor_.workers[node] is before[node]
+    ]
+    assert len(supervisor_.workers) == 5
+    assert len(kept) < 4 and all(
+        not before[node].alive for node in before if node not in kept
+    ), 'Перезапускаются только шарды, потерявшие аккаунты'
+
+
+def test_sigterm_stops_supervisor_and_shards():
+    FakeProcess.started = []
+    supervisor_ = Supervisor(make_accounts(10), 2, context=FakeContext)
+    timer = threading.Timer(
+        0.1, os.kill, (os.getpid(), signal.SIGTERM)
+    )
+    timer.start()
+    started = time.monotonic()
+    supervisor_.run()
+    assert time.monotonic() - started < supervisor.TICK, (
+        'Супервизор должен реагировать на SIGTERM, не дожидаясь тика'
+    )
+    assert not any(process.alive for process in FakeProcess.started), (
+        'При остановке супервизор завершает все шарды'
+    )
+
+
+def test_first_shard_serves_commands_for_all_accounts():
+    FakeProcess.started = []
+    accounts = make_accounts(40)
+    supervisor_ = Supervisor(
+        accounts, 3, context=FakeContext, commands=True
+    )
+    supervisor_.rebalance()
+    assert [
+        process.args[1:] for process in supervisor_.workers.values()
+    ] == [(0, accounts), (1, None), (2, None)], (
+        'Команды всех аккаунтов обслуживает только первый шард'
+    )
+    supervisor_.nodes.remove(0)
+    supervisor_.rebalance()
+    assert supervisor_.workers[1].args[2] == accounts, (
+        'Без первого шарда команды переходят к следующему'
+    )
+
+
+def test_shard_metrics_ports_follow_the_supervisor_port():
+    assert [
+        supervisor.shard_metrics_port(9000, node) for node in range(3)
+    ] == [9001, 9002, 9003]
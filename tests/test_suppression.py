@@ -0,0 +1,55 @@
+import engine
+from breaker import CircuitBreaker
+from policy import RequestPolicy
+from suppression import ErrorSuppressor, error_key
+from utils import FakeBot, FakeClient, FakeClock
+
+
+def test_error_key_ignores_numbers():
+    assert (
+        error_key(ValueError('port 8080 at 1650000000'))
+        == error_key(ValueError('port 443 at 1650000600'))
+    ), 'Ошибки, отличающиеся только числами, считаются одинаковыми'
+
+
+def test_repeats_are_aggregated_per_window():
+    clock = FakeClock(1_000_000)
+    suppressor = ErrorSuppressor(window=60, clock=clock)
+    messages = []
+    for _ in range(10):
+        messages.append(suppressor.on_error('a', ValueError('down')))
+        clock.now += 10
+    sent = [message for message in messages if message]
+    assert len(sent) == 2, (
+        'За 100 секунд при окне 60 секунд ожидается первая ошибка '
+        'и одна сводка'
+    )
+    assert '7 раз' in sent[1], 'Сводка должна содержать число повторов'
+    assert suppressor.on_error('b', ValueError('down')), (
+        'Разные области подавляются независимо'
+    )
+    assert suppressor.on_error('a', KeyError('other')), (
+        'Новая ошибка сообщается сразу'
+    )
+
+
+def test_engine_sends_one_error_and_one_recovery():
+    client = FakeClient(error=ConnectionError('timeout'))
+    bot = FakeBot()
+    account = engine.Account('token', 1)
+    polling = engine.PollingEngine(
+        bot, [account], client=client,
+        breaker=CircuitBreaker(threshold=10),
+        policy=RequestPolicy(attempts=1)
+    )
+    for _ in range(5):
+        polling.poll_account(account)
+    client.error = None
+    polling.poll_account(account)
+    polling.poll_account(account)
+    assert len(bot.sent) == 2, (
+        'Ожидается одно сообщение об ошибке и одно о восстановлении'
+    )
+    assert bot.sent[1][1].startswith('Работа бота восстановлена'), (
+        'После успешного опроса отправляется сообщение о восстановлении'
+    )
@@ -0,0 +1,93 @@
+import pytest
+
+import engine
+from homework import Homework
+from utils import FakeClient
+from validation import validate_homework, validate_response
+
+
+def test_batch_keeps_valid_items_and_reports_the_rest():
+    response = {'homeworks': [
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+         'date_updated': '2022-01-01T00:00:00Z'},
+        {'homework_name': 'hw2'},
+        {'homework_name': 'hw3', 'status': 'lost'},
+        {'homework_name': 3, 'status': 'approved'},
+        'hw5',
+        {'homework_name': 'hw6', 'status': 'reviewing'},
+    ]}
+    homeworks, errors = validate_response(response)
+    assert homeworks == [
+        Homework(1, 'hw1', 'approved', '2022-01-01T00:00:00Z'),
+        Homework(None, 'hw6', 'reviewing', None),
+    ], 'Корректные работы должны пройти проверку'
+    assert all(isinstance(homework, Homework) for homework in homeworks)
+    assert [error.split(':')[0] for error in errors] == [
+        'homeworks[1]', 'homeworks[2]', 'homeworks[3]', 'homeworks[4]',
+    ], 'Для каждой некорректной работы должна быть своя ошибка'
+
+
+def test_top_level_errors_still_raise():
+    with pytest.raises(KeyError):
+        validate_response({})
+    with pytest.raises(TypeError):
+        validate_response({'homeworks': {}})
+
+
+def test_single_item_validator():
+    assert validate_homework(
+        {'homework_name': 'hw', 'status': 'rejected'}
+    ) == (Homework(None, 'hw', 'rejected', None), None)
+    homework, error = validate_homework({'status': 'approved'}, 7)
+    assert homework is None and 'homeworks[7]' in error
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_malformed_item_does_not_abort_the_batch(stream):
+    account = engine.Account('token', 1)
+    client = FakeClient({
+        'homeworks': [
+            {'homework_name': 'hw', 'status': 'approved'},
+            {'homework_name': 'broken'},
+        ],
+        'current_date': 100,
+    })
+    polling = engine.PollingEngine(
+        None, [account], client=client, stream=stream
+    )
+    sent = []
+    polling.send = lambda chat_id, message: sent.append(message)
+    polling.states[account].timestamp = 1
+    polling.poll_account(account)
+    assert len(sent) == 1 and '"hw"' in sent[0], (
+        'Некорректная работа пропускается, корректная отправляется'
+    )
+    assert polling.states[account].timestamp == 100
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_malformed_newest_item_is_reported_not_skipped(stream):
+    account = engine.Account('token', 1)
+    client = FakeClient({
+        'homeworks': [
+            {'homework_name': 'new', 'status': 'pending'},
+            {'homework_name': 'old', 'status': 'approved'},
+        ],
+        'current_date': 100,
+    })
+    polling = engine.PollingEngine(
+        None, [account], client=client, stream=stream
+    )
+    sent = []
+    polling.send = lambda chat_id, message: sent.append(message)
+    polling.states[account].timestamp = 1
+    polling.poll_account(account)
+    assert not any('"old"' in message for message in sent), (
+        'Более старая работа не объявляется вместо некорректной свежей'
+    )
+    assert len(sent) == 1 and 'homeworks[0]' in sent[0], (
+        'Некорректная свежая работа сообщается как ошибка'
+    )
+    assert polling.states[account].timestamp == 1, (
+        'from_date не сдвигается, пока свежая работа не разобрана'
+    )
@@ -1,4 +1,7 @@
+from http import HTTPStatus
 from inspect import signature
+import json
+import threading
 from types import ModuleType
 
 
@@ -37,3 +40,85 @@ def check_default_var_exists(scope: ModuleType, var_name: str) -> None:
         f'{var_name} должна быть переменной, а не функцией.'
     )
 
+
+EMPTY_ANSWER = {'homeworks': [], 'current_date': 1}
+
+
+class FakeClock:
+    """Часы для тестов: время меняется только вручную или через sleep()."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    """Ответ API с интерфейсом requests.Response.
+
+    Строка в data отдаётся как есть (например, HTML-страница ошибки),
+    и json() для неё падает так же, как у requests.
+    """
+
+    def __init__(self, data=EMPTY_ANSWER, status_code=HTTPStatus.OK,
+                 headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+        if isinstance(data, str):
+            self.content = data.encode()
+        else:
+            self.content = json.dumps(data).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    """Клиент API: на каждый запрос отвечает data (или бросает error)."""
+
+    def __init__(self, data=EMPTY_ANSWER, status_code=HTTPStatus.OK,
+                 error=None, delay=0.0):
+        self.data = data
+        self.status_code = status_code
+        self.error = error
+        self.delay = delay
+        self.calls = []
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, timeout=None, **kwargs):
+        with self.lock:
+            self.calls.append((headers['Authorization'], params['from_date']))
+            self.timeouts.append(timeout)
+        if self.delay:
+            threading.Event().wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self.data, self.status_code)
+
+
+class FakeBot:
+    """Бот Telegram, запоминающий отправки; failures бросаются по очереди."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        with self.lock:
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append((chat_id, text))
@@ -0,0 +1,113 @@
+from collections import namedtuple
+
+from homework import HOMEWORK_VERDICTS, Homework, check_response
+
+ITEM_NOT_DICT = 'homeworks[{index}]: ожидался словарь, получен {type}'
+MISSING_KEY = 'homeworks[{index}]: нет ключа {key}'
+WRONG_TYPE = 'homeworks[{index}]: {key} имеет тип {type}'
+UNKNOWN_CHOICE = 'homeworks[{index}]: недопустимое значение {key}: {value!r}'
+
+Field = namedtuple('Field', ['key', 'types', 'required', 'choices'])
+
+# Поля Homework в порядке namedtuple и их описание в ответе API.
+HOMEWORK_SCHEMA = (
+    Field('id', (int,), False, None),
+    Field('homework_name', (str,), True, None),
+    Field('status', (str,), True, frozenset(HOMEWORK_VERDICTS)),
+    Field('date_updated', (str,), False, None),
+)
+
+Validated = namedtuple('Validated', ['homeworks', 'errors'])
+
+
+def _checks(schema, namespace, fail, indent):
+    """Строки проверок полей; fail - шаблон действия при ошибке."""
+    lines = [
+        'if item.__class__ is not dict:',
+        *fail('ITEM_NOT_DICT.format(index=index, type=type(item).__name__)'),
+    ]
+    for number, field in enumerate(schema):
+        value = f'v{number}'
+        if len(field.types) == 1:
+            namespace[f'T{number}'] = field.types[0]
+            wrong = f'{value}.__class__ is not T{number}'
+        else:
+            namespace[f'T{number}'] = frozenset(field.types)
+            wrong = f'{value}.__class__ not in T{number}'
+        wrong_type = (f'WRONG_TYPE.format(index=index, key={field.key!r}, '
+                      f'type=type({value}).__name__)')
+        lines.append(f'{value} = item.get({field.key!r})')
+        if field.required:
+            lines += [
+                f'if {value} is None:',
+                *fail(f'MISSING_KEY.format(index=index, key={field.key!r})'),
+                f'if {wrong}:',
+            ]
+        else:
+            lines.append(f'if {value} is not None and {wrong}:')
+        lines += fail(wrong_type)
+        if field.choices is not None:
+            namespace[f'C{number}'] = field.choices
+            lines += [
+                f'if {value} not in C{number}:',
+                *fail(f'UNKNOWN_CHOICE.format(index=index, key={field.key!r}, '
+                      f'value={value})'),
+            ]
+    values = ', '.join(f'v{number}' for number in range(len(schema)))
+    return [' ' * indent + line for line in lines], f'new(record, ({values},))'
+
+
+def compile_validator(schema, record):
+    """Собрать из схемы функции проверки элементов homeworks.
+
+    Проверки разворачиваются в код без циклов по полям и без вызова
+    функции на элемент, запись создаётся сразу через tuple.__new__.
+    Возвращает пару функций: validate_item(item, index) -> (запись или
+    None, ошибка или None) и validate_items(items) -> (записи, ошибки).
+    """
+    namespace = {
+        'record': record, 'dict': dict, 'type': type, 'new': tuple.__new__,
+        'ITEM_NOT_DICT': ITEM_NOT_DICT, 'MISSING_KEY': MISSING_KEY,
+        'WRONG_TYPE': WRONG_TYPE, 'UNKNOWN_CHOICE': UNKNOWN_CHOICE,
+    }
+    item_checks, item_record = _checks(
+        schema, namespace, lambda error: [f'    return None, {error}'], 4
+    )
+    batch_checks, batch_record = _checks(
+        schema, namespace,
+        lambda error: [f'    errors.append({error})', '    continue'], 8
+    )
+    source = '\n'.join([
+        'def validate_item(item, index=0):',
+        *item_checks,
+        f'    return {item_record}, None',
+        '',
+        'def validate_items(items):',
+        '    records = []',
+        '    errors = []',
+        '    append = records.append',
+        '    for index, item in enumerate(items):',
+        *batch_checks,
+        f'        append({batch_record})',
+        '    return records, errors',
+    ])
+    # exec допустим только потому, что исходный код собирается из
+    # схемы в самом модуле (HOMEWORK_SCHEMA), а не из данных API:
+    # значения из ответа попадают в функции аргументами, не в код.
+    exec(compile(source, f'<validator {record.__name__}>', 'exec'), namespace)
+    return namespace['validate_item'], namespace['validate_items']
+
+
+validate_homework, validate_homeworks = compile_validator(
+    HOMEWORK_SCHEMA, Homework
+)
+
+
+def validate_response(response):
+    """Проверить весь ответ API за один проход.
+
+    Ошибки верхнего уровня (не словарь, нет списка homeworks)
+    по-прежнему исключения check_response; некорректные элементы
+    списка не прерывают разбор, а попадают в errors.
+    """
+    return Validated(*validate_homeworks(check_response(response)))